@@ -1,804 +1,1741 @@
-# Copyright (c) 2025, Ahmed Yousef and contributors
-# For license information, please see license.txt
-
-import frappe
-from frappe import _
-from frappe.utils import flt, nowdate, get_datetime, now_datetime
-
-
-@frappe.whitelist()
-def get_customer_measurements(customer):
-    """
-    Fetch measurements from Customer Measurement Doctype
-    if reservation_measurements table is empty.
-    """
-    if not customer:
-        frappe.throw(_("Please select a Customer first"))
-
-    # Get latest Customer Measurement for this customer
-    cm_doc = frappe.get_all(
-        "Customer Measurement",
-        filters={"customer": customer},
-        fields=["name"],
-        order_by="creation desc",
-        limit=1,
-    )
-
-    if not cm_doc:
-        frappe.throw(_("No Customer Measurement found for this customer"))
-
-    cm_doc = frappe.get_doc("Customer Measurement", cm_doc[0].name)
-
-    data = [
-        {"measurement_type": row.measurement_type, "value": row.value, "uom": row.uom}
-        for row in cm_doc.measurements
-    ]
-
-    # Display success message
-    frappe.msgprint(
-        msg=_("Measurements for customer {0} fetched successfully.").format(customer),
-        title=_("Measurements Fetched"),
-        indicator="green",
-    )
-
-    return data
-
-
-@frappe.whitelist()
-def check_availability(
-    item_code, branch=None, warehouse=None, start_date=None, end_date=None
-):
-    """
-    Returns total stock, reserved quantity, available stock, and last 10 reservations that include this item.
-    """
-    if not item_code:
-        frappe.throw(_("Item Code is required"))
-    if not warehouse:
-        frappe.throw(_("Warehouse is required"))
-    if not start_date or not end_date:
-        frappe.throw(_("Start Date and End Date are required"))
-
-    # Total stock in the specified warehouse
-    total_stock = (
-        frappe.db.get_value(
-            "Bin", {"item_code": item_code, "warehouse": warehouse}, "actual_qty"
-        )
-        or 0.0
-    )
-
-    # Count reserved items during the specified period
-    reserved_qty = (
-        frappe.db.sql(
-            """
-        SELECT SUM(ri.qty)
-        FROM `tabSuit Reservation` sr
-        JOIN `tabReservation Item` ri ON ri.parent = sr.name
-        WHERE ri.item_code = %s
-          AND sr.docstatus = 1
-          AND sr.reservation_status NOT IN ('Cancelled', 'Returned')
-          AND (
-              (sr.reservation_from <= %s AND sr.reservation_to >= %s)
-              OR (sr.reservation_from <= %s AND sr.reservation_to >= %s)
-              OR (sr.reservation_from >= %s AND sr.reservation_to <= %s)
-          )
-    """,
-            (
-                item_code,
-                start_date,
-                start_date,
-                end_date,
-                end_date,
-                start_date,
-                end_date,
-            ),
-        )[0][0]
-        or 0
-    )
-
-    available_stock = flt(total_stock) - flt(reserved_qty)
-
-    # Last 10 reservations that include this item (most recent)
-    last_10_reservations = (
-        frappe.db.sql(
-            """
-        SELECT sr.name as reservation_id, sr.customer, sr.reservation_from, sr.reservation_to, sr.reservation_status
-        FROM `tabSuit Reservation` sr
-        JOIN `tabReservation Item` ri ON ri.parent = sr.name
-        WHERE ri.item_code = %s
-          AND sr.docstatus = 1
-          AND sr.reservation_status NOT IN ('Cancelled', 'Returned')
-        ORDER BY sr.reservation_from DESC
-        LIMIT 10
-    """,
-            (item_code,),
-            as_dict=1,
-        )
-        or []
-    )
-
-    return {
-        "total_stock": flt(total_stock),
-        "reserved_qty": flt(reserved_qty),
-        "available_stock": available_stock,
-        "last_10_reservations": last_10_reservations,
-    }
-
-# Deliver Items
-@frappe.whitelist()
-def deliver_reservation(name, delivery_date, mode_of_payment):
-
-    doc = frappe.get_doc("Suit Reservation", name)
-
-    # -----------------------------
-    # Basic Validations
-    # -----------------------------
-    if doc.docstatus != 1:
-        frappe.throw(_("Reservation must be Submitted to deliver"))
-
-    if doc.reservation_status != "Reserved":
-        frappe.throw(_("Reservation must be in 'Reserved' status to deliver"))
-
-    if not doc.source_warehouse:
-        frappe.throw(_("Source Warehouse is required for delivery"))
-
-    if not doc.reservation_items:
-        frappe.throw(_("Reservation Items are required for delivery"))
-
-    if not doc.company:
-        frappe.throw(_("Company is required for delivery"))
-
-    if not doc.currency:
-        frappe.throw(_("Currency is required for delivery"))
-
-    if not delivery_date:
-        frappe.throw(_("Delivery Date is required for delivery"))
-
-    delivery_dt = get_datetime(delivery_date)
-    delivery_date_only = delivery_dt.date()
-    delivery_time_only = delivery_dt.time()
-
-    reservation_dt = get_datetime(doc.reservation_date)
-
-    if delivery_dt <= reservation_dt:
-        frappe.throw(_("Delivery date & time must be after reservation date & time"))
-
-    if not mode_of_payment:
-        frappe.throw(_("Mode of Payment is required for delivery"))
-
-    if not doc.customer_stock_warehouse:
-        frappe.throw(_("Customer Stock Warehouse must be set before delivery"))
-
-    if not doc.branch:
-        frappe.throw(_("Branch is required for delivery"))
-
-    # -----------------------------
-    # Load Branch & Posting Settings
-    # -----------------------------
-    branch = frappe.get_doc("Branch", doc.branch)
-
-    income_posting_type = (branch.custom_post_income_as or "Journal Entry").strip()
-    si_status = (branch.custom_sales_invoice_status or "Submit").strip()
-    je_status = (branch.custom_journal_entry_status or "Submit").strip()
-
-    # -----------------------------
-    # Resolve Mode of Payment Account
-    # -----------------------------
-    mop_account = frappe.db.get_value(
-        "Mode of Payment Account",
-        {"parent": mode_of_payment, "company": doc.company},
-        "default_account",
-    )
-
-    if not mop_account:
-        frappe.throw(
-            _("No account found for Mode of Payment: {0}").format(mode_of_payment)
-        )
-
-    # -----------------------------
-    # Validate Items + Calculate Rent
-    # -----------------------------
-    total_rent = 0
-
-    for item in doc.reservation_items:
-        if not item.item_code:
-            frappe.throw(_("Item Code is missing in row {0}").format(item.idx))
-
-        if flt(item.qty) != 1:
-            frappe.throw(_("Quantity must be 1 in row {0}.").format(item.idx))
-
-        if item.has_serial_no and not item.serial_no:
-            frappe.throw(
-                _("Serial No is required for item {0} in row {1}").format(
-                    item.item_code, item.idx
-                )
-            )
-
-        if item.has_batch_no and not item.batch_no:
-            frappe.throw(
-                _("Batch No is required for item {0} in row {1}").format(
-                    item.item_code, item.idx
-                )
-            )
-
-        total_rent += flt(item.rate)
-
-    deposit_paid = flt(doc.deposit_amount)
-    already_paid = flt(doc.paid_amount)
-    doc.total_estimated_rent = total_rent
-    doc.outstanding_amount = total_rent - (deposit_paid + already_paid)
-
-    # -----------------------------
-    # STOCK TRANSFER (Branch -> Customer Stock)
-    # -----------------------------
-    se = frappe.new_doc("Stock Entry")
-    se.stock_entry_type = "Material Transfer"
-    se.company = doc.company
-    se.posting_date = delivery_date_only
-    se.posting_time = delivery_time_only
-    se.set_posting_time = 1
-
-    for item in doc.reservation_items:
-        row = {
-            "item_code": item.item_code,
-            "qty": 1,
-            "uom": item.uom or "Nos",
-            "s_warehouse": doc.source_warehouse,
-            "t_warehouse": doc.customer_stock_warehouse,
-            "use_serial_batch_fields": 1,
-        }
-
-        if item.serial_no:
-            row["serial_no"] = item.serial_no
-        if item.batch_no:
-            row["batch_no"] = item.batch_no
-
-        se.append("items", row)
-
-    se.flags.ignore_mandatory = True
-    se.insert()
-    se.submit()
-
-    for item in doc.reservation_items:
-        item.is_delivered = 1
-
-    # Track Stock Entry in child table
-    doc.append(
-        "reservation_stock_entries",
-        {
-            "stock_entry": se.name,
-            "entry_type": "Delivery",
-            "posting_date": delivery_dt,
-            "remark": "Stock moved to customer stock warehouse",
-        },
-    )
-    
-
-    # -----------------------------
-    # SECURITY PAYMENT
-    # -----------------------------
-    security_amount = flt(doc.security_amount)
-    force_collect_security = bool(doc.force_collect_security_amount)
-
-    if force_collect_security and security_amount <= 0:
-        frappe.throw(_("Security Amount is required when forced."))
-
-    if force_collect_security and security_amount > 0:
-        pe_sec = frappe.new_doc("Payment Entry")
-        pe_sec.payment_type = "Receive"
-        pe_sec.party_type = "Customer"
-        pe_sec.party = doc.customer
-        pe_sec.company = doc.company
-        pe_sec.posting_date = delivery_date_only
-        pe_sec.currency = doc.currency
-        pe_sec.paid_to = mop_account
-        pe_sec.mode_of_payment = mode_of_payment
-        pe_sec.paid_amount = security_amount
-        pe_sec.received_amount = security_amount
-        pe_sec.reference_no = doc.name
-        pe_sec.reference_date = delivery_date_only
-        
-        pe_sec.flags.ignore_mandatory = True
-
-        pe_sec.insert()
-        pe_sec.submit()
-
-        doc.append(
-            "reservation_payments",
-            {
-                "payment_entry": pe_sec.name,
-                "payment_mode": mode_of_payment,
-                "amount": security_amount,
-                "description": "Security Payment",
-                "type": "Receive",
-            },
-        )
-
-    # -----------------------------
-    # RENT INCOME POSTING
-    # -----------------------------
-    rent_invoice_doc = None
-
-    # Journal Entry Method
-    if income_posting_type == "Journal Entry":
-        je = frappe.new_doc("Journal Entry")
-        je.company = doc.company
-        je.posting_date = delivery_date_only
-        je.voucher_type = "Journal Entry"
-        je.user_remark = "Suit Reservation"
-        je.cheque_no = doc.name
-
-        je.append(
-            "accounts",
-            {
-                "account": branch.custom_receivable_account,
-                "party_type": "Customer",
-                "party": doc.customer,
-                "debit_in_account_currency": total_rent,
-            },
-        )
-
-        je.append(
-            "accounts",
-            {
-                "account": branch.custom_income_account,
-                "credit_in_account_currency": total_rent,
-            },
-        )
-
-        je.flags.ignore_mandatory = True
-        je.insert()
-
-        if je_status == "Submit":
-            je.submit()
-
-        doc.append(
-            "reservation_journal_entry",
-            {
-                "journal_entry": je.name,
-                "date": delivery_dt,
-                "purpose": "Rent",
-                "amount": total_rent,
-            },
-        )
-
-    # Sales Invoice Method
-    else:
-        if not branch.custom_rent_invoice_item:
-            frappe.throw(_("Rent Invoice Item must be defined in Branch"))
-
-        si = frappe.new_doc("Sales Invoice")
-        si.customer = doc.customer
-        si.company = doc.company
-        si.posting_date = delivery_date_only
-        si.posting_time = delivery_time_only
-        si.due_date = delivery_date_only
-        si.currency = doc.currency
-        si.ignore_pricing_rule = 1
-        si.set_posting_time = 1
-
-        si.append(
-            "items",
-            {
-                "item_code": branch.custom_rent_invoice_item,
-                "qty": 1,
-                "rate": total_rent,
-            },
-        )
-
-        si.flags.ignore_mandatory = True
-        si.insert()  # draft first
-
-        # Add Deposit Payment as advance (if exists)
-        for pay in doc.reservation_payments:
-            if pay.description == "Deposit Payment" and pay.payment_entry:
-                pe_remarks = (
-                    frappe.db.get_value("Payment Entry", pay.payment_entry, "remarks")
-                    or ""
-                )
-                pe_paid_amount = flt(
-                    frappe.db.get_value(
-                        "Payment Entry", pay.payment_entry, "paid_amount"
-                    )
-                    or 0
-                )
-
-                if pe_paid_amount:
-                    si.append(
-                        "advances",
-                        {
-                            "reference_type": "Payment Entry",
-                            "reference_name": pay.payment_entry,
-                            "advance_amount": pe_paid_amount,
-                            "allocated_amount": pe_paid_amount,
-                            "remarks": pe_remarks,
-                            "difference_posting_date": si.posting_date,
-                        },
-                    )
-
-        si.save()
-        rent_invoice_doc = si
-
-    # -----------------------------
-    # REMAINING RENT PAYMENT
-    # -----------------------------
-    remaining_rent = total_rent - deposit_paid
-
-    if remaining_rent > 0:
-        pe_rent = frappe.new_doc("Payment Entry")
-        pe_rent.payment_type = "Receive"
-        pe_rent.party_type = "Customer"
-        pe_rent.party = doc.customer
-        pe_rent.company = doc.company
-        pe_rent.posting_date = delivery_date_only
-        pe_rent.currency = doc.currency
-        pe_rent.mode_of_payment = mode_of_payment
-        pe_rent.paid_to = mop_account
-        pe_rent.paid_amount = remaining_rent
-        pe_rent.received_amount = remaining_rent
-        pe_rent.reference_no = doc.name
-        pe_rent.reference_date = delivery_date_only
-        
-        pe_rent.flags.ignore_mandatory = True
-
-        pe_rent.insert()
-        pe_rent.submit()
-
-        doc.append(
-            "reservation_payments",
-            {
-                "payment_entry": pe_rent.name,
-                "payment_mode": mode_of_payment,
-                "amount": remaining_rent,
-                "description": "Remaining Rent Payment",
-                "type": "Receive",
-            },
-        )
-
-        # If we used Sales Invoice, add Remaining Rent as advance too
-        if rent_invoice_doc:
-            pe_remarks = pe_rent.remarks or ""
-            rent_invoice_doc.append(
-                "advances",
-                {
-                    "reference_type": "Payment Entry",
-                    "reference_name": pe_rent.name,
-                    "advance_amount": remaining_rent,
-                    "allocated_amount": remaining_rent,
-                    "remarks": pe_remarks,
-                    "difference_posting_date": rent_invoice_doc.posting_date,
-                },
-            )
-            rent_invoice_doc.save()
-
-        doc.paid_amount = total_rent
-    else:
-        doc.paid_amount = deposit_paid
-
-    doc.outstanding_amount = 0
-
-    # -----------------------------
-    # FINALIZE SALES INVOICE (if used)
-    # -----------------------------
-    if rent_invoice_doc:
-        if si_status == "Submit":
-            rent_invoice_doc.submit()
-
-        doc.append(
-            "reservation_sales_invoice",
-            {
-                "sales_invoice": rent_invoice_doc.name,
-                "date": delivery_dt,
-                "purpose": "Rent",
-                "amount": total_rent,
-            },
-        )
-
-    # -----------------------------
-    # FINAL UPDATE
-    # -----------------------------
-    doc.reservation_status = "Delivered"
-    doc.actual_delivery_date = delivery_dt
-
-    doc.save(ignore_permissions=True)
-
-    frappe.msgprint(
-        msg=_("Reservation {0} has been successfully delivered.").format(name),
-        title=_("Delivery Successful"),
-        indicator="green",
-    )
-
-    return True
-
-
-## Return API
-
-
-@frappe.whitelist()
-def return_reservation(name, actual_return_datetime):
-
-    doc = frappe.get_doc("Suit Reservation", name)
-
-    # -----------------------------
-    # Load Branch & Posting Settings
-    # -----------------------------
-    branch = frappe.get_doc("Branch", doc.branch)
-
-    income_posting_type = (branch.custom_post_income_as or "Journal Entry").strip()
-    si_status = (branch.custom_sales_invoice_status or "Submit").strip()
-    je_status = (branch.custom_journal_entry_status or "Submit").strip()
-
-    # -------------------------------------------------
-    # BASIC VALIDATIONS
-    # -------------------------------------------------
-    if doc.docstatus != 1:
-        frappe.throw(_("Reservation must be Submitted"))
-
-    if doc.reservation_status != "Delivered":
-        frappe.throw(_("Reservation must be in Delivered status"))
-
-    if not actual_return_datetime:
-        frappe.throw(_("Return Date & Time is required"))
-
-    if not doc.actual_delivery_date:
-        frappe.throw(_("Delivery Date & Time is missing"))
-
-    return_dt = get_datetime(actual_return_datetime)
-    delivery_dt = get_datetime(doc.actual_delivery_date)
-
-    if return_dt <= delivery_dt:
-        frappe.throw(_("Return date & time must be after delivery date & time"))
-
-    if not doc.reservation_items:
-        frappe.throw(_("No reservation items found"))
-
-    # -------------------------------------------------
-    # VALIDATE ITEMS
-    # -------------------------------------------------
-    total_penalty = 0
-    penalty_items = []
-
-    for item in doc.reservation_items:
-
-        if not item.return_status:
-            frappe.throw(_("Return Status is required for all items"))
-
-        if not item.return_type:
-            frappe.throw(_("Return Type is missing in row {0}").format(item.idx))
-
-        penalty_amount = flt(item.penalty_amount)
-
-        if item.return_type in ("Damage", "Lost") and penalty_amount > 0:
-            total_penalty += penalty_amount
-            penalty_items.append(item)
-
-    # -------------------------------------------------
-    # STOCK ENTRIES
-    # -------------------------------------------------
-    # 1) GOOD - Transfer back to Branch Store
-    # 2) DAMAGE - Transfer to Damage Warehouse
-    # 3) LOST - Material Issue from Customer Stock
-
-    for item in doc.reservation_items:
-
-        # -------- GOOD --------
-        if item.return_type == "Good":
-
-            se = frappe.new_doc("Stock Entry")
-            se.stock_entry_type = "Material Transfer"
-            se.company = doc.company
-            se.posting_date = return_dt.date()
-            se.posting_time = return_dt.time()
-            se.set_posting_time = 1
-
-            se.append(
-                "items",
-                {
-                    "item_code": item.item_code,
-                    "qty": 1,
-                    "uom": item.uom or "Nos",
-                    "s_warehouse": doc.customer_stock_warehouse,
-                    "t_warehouse": doc.source_warehouse,
-                    "use_serial_batch_fields": 1,
-                    "serial_no": item.serial_no or "",
-                    "batch_no": item.batch_no or "",
-                },
-            )
-
-            se.flags.ignore_mandatory = True
-            se.insert()
-            se.submit()
-
-            doc.append(
-                "reservation_stock_entries",
-                {
-                    "stock_entry": se.name,
-                    "entry_type": "Return - Good",
-                    "posting_date": return_dt,
-                    "remark": "Returned to branch warehouse",
-                },
-            )
-
-        # -------- DAMAGE --------
-        elif item.return_type == "Damage":
-
-            status = frappe.get_doc("Suit Return Status", item.return_status)
-
-            se = frappe.new_doc("Stock Entry")
-            se.stock_entry_type = "Material Transfer"
-            se.company = doc.company
-            se.posting_date = return_dt.date()
-            se.posting_time = return_dt.time()
-            se.set_posting_time = 1
-
-            se.append(
-                "items",
-                {
-                    "item_code": item.item_code,
-                    "qty": 1,
-                    "uom": item.uom or "Nos",
-                    "s_warehouse": doc.customer_stock_warehouse,
-                    "t_warehouse": status.damage_warehouse,
-                    "use_serial_batch_fields": 1,
-                    "serial_no": item.serial_no or "",
-                    "batch_no": item.batch_no or "",
-                },
-            )
-
-            se.flags.ignore_mandatory = True
-            se.insert()
-            se.submit()
-
-            doc.append(
-                "reservation_stock_entries",
-                {
-                    "stock_entry": se.name,
-                    "entry_type": "Return - Damage",
-                    "posting_date": return_dt,
-                    "remark": "Moved to damage warehouse",
-                },
-            )
-
-        # -------- LOST --------
-        elif item.return_type == "Lost":
-
-            se = frappe.new_doc("Stock Entry")
-            se.stock_entry_type = "Material Issue"
-            se.company = doc.company
-            se.posting_date = return_dt.date()
-            se.posting_time = return_dt.time()
-            se.set_posting_time = 1
-
-            se.append(
-                "items",
-                {
-                    "item_code": item.item_code,
-                    "qty": 1,
-                    "uom": item.uom or "Nos",
-                    "s_warehouse": doc.customer_stock_warehouse,
-                    "use_serial_batch_fields": 1,
-                    "serial_no": item.serial_no or "",
-                    "batch_no": item.batch_no or "",
-                },
-            )
-
-            se.flags.ignore_mandatory = True
-            se.insert()
-            se.submit()
-
-            doc.append(
-                "reservation_stock_entries",
-                {
-                    "stock_entry": se.name,
-                    "entry_type": "Return - Lost",
-                    "posting_date": return_dt,
-                    "remark": "Item lost by customer",
-                },
-            )
-
-    for item in doc.reservation_items:
-        item.is_returned = 1
-
-    # -------------------------------------------------
-    # PENALTY ACCOUNTING (ONLY IF > 0)
-    # -------------------------------------------------
-    if total_penalty > 0:
-
-        # -------- JOURNAL ENTRY --------
-        if income_posting_type == "Journal Entry":
-            je = frappe.new_doc("Journal Entry")
-            je.company = doc.company
-            je.posting_date = return_dt.date()
-            je.posting_time = return_dt.time()
-            je.set_posting_time = 1
-            je.voucher_type = "Journal Entry"
-            je.user_remark = "Suit Return Penalty"
-            je.cheque_no = doc.name
-
-            je.append(
-                "accounts",
-                {
-                    "account": branch.custom_receivable_account,
-                    "party_type": "Customer",
-                    "party": doc.customer,
-                    "debit_in_account_currency": total_penalty,
-                },
-            )
-
-            je.append(
-                "accounts",
-                {
-                    "account": branch.custom_income_account,
-                    "credit_in_account_currency": total_penalty,
-                },
-            )
-
-            je.flags.ignore_mandatory = True
-            je.insert()
-
-            if je_status == "Submit":
-                je.submit()
-
-            doc.append(
-                "reservation_journal_entry",
-                {
-                    "journal_entry": je.name,
-                    "date": return_dt,
-                    "purpose": "Return Penalty",
-                    "amount": total_penalty,
-                },
-            )
-
-        # -------- SALES INVOICE --------
-        else:
-
-            si = frappe.new_doc("Sales Invoice")
-            si.customer = doc.customer
-            si.company = doc.company
-            si.posting_date = return_dt.date()
-            si.posting_time = return_dt.time()
-            si.set_posting_time = 1
-            si.ignore_pricing_rule = 1
-            si.currency = doc.currency
-
-            for item in penalty_items:
-                status = frappe.get_doc("Suit Return Status", item.return_status)
-
-                si.append(
-                    "items",
-                    {
-                        "item_code": status.income_item,
-                        "qty": 1,
-                        "rate": item.penalty_amount,
-                    },
-                )
-
-            si.flags.ignore_mandatory = True
-            si.insert()
-
-            if si_status == "Submit":
-                si.submit()
-
-            doc.append(
-                "reservation_sales_invoice",
-                {
-                    "sales_invoice": si.name,
-                    "date": return_dt,
-                    "purpose": "Return Penalty",
-                    "amount": total_penalty,
-                },
-            )
-
-    # -------------------------------------------------
-    # FINAL UPDATE
-    # -------------------------------------------------
-    doc.reservation_status = "Returned"
-    doc.actual_return_date = return_dt
-
-    doc.save(ignore_permissions=True)
-
-    frappe.msgprint(
-        _("Reservation {0} has been successfully returned").format(doc.name),
-        indicator="green",
-    )
-
-    return True
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.utils import (
+    cint,
+    date_diff,
+    flt,
+    get_datetime,
+    now_datetime,
+    nowdate,
+    strip_html,
+)
+from werkzeug.wrappers import Response
+
+from suit_rental.availability import (
+    MAX_CALENDAR_DAYS,
+    find_available_items,
+    get_availability,
+    get_availability_matrix,
+    get_availability_version,
+    get_cache_stats,
+    get_calendar_item_codes,
+    get_daily_free_totals,
+    get_warehouse_rental_items,
+    normalize_availability_rows,
+    reset_cache_stats,
+)
+from suit_rental.consolidation import add_pending_income
+from suit_rental.posting import get_posting_profile
+from suit_rental.suit_rental.doctype.suit_return_status.suit_return_status import (
+    get_return_status_map,
+)
+from suit_rental.workflow import check_no_unfinished_workflow, run_step, run_workflow
+
+CALENDAR_CACHE_TTL = 60 * 60
+
+
+@frappe.whitelist()
+def get_customer_measurements(customer):
+    """
+    Fetch measurements from Customer Measurement Doctype
+    if reservation_measurements table is empty.
+    """
+    if not customer:
+        frappe.throw(_("Please select a Customer first"))
+
+    # Get latest Customer Measurement for this customer
+    cm_doc = frappe.get_all(
+        "Customer Measurement",
+        filters={"customer": customer},
+        fields=["name"],
+        order_by="creation desc",
+        limit=1,
+    )
+
+    if not cm_doc:
+        frappe.throw(_("No Customer Measurement found for this customer"))
+
+    cm_doc = frappe.get_doc("Customer Measurement", cm_doc[0].name)
+
+    data = [
+        {"measurement_type": row.measurement_type, "value": row.value, "uom": row.uom}
+        for row in cm_doc.measurements
+    ]
+
+    # Display success message
+    frappe.msgprint(
+        msg=_("Measurements for customer {0} fetched successfully.").format(customer),
+        title=_("Measurements Fetched"),
+        indicator="green",
+    )
+
+    return data
+
+
+@frappe.whitelist()
+def check_availability(
+    item_code,
+    branch=None,
+    warehouse=None,
+    start_date=None,
+    end_date=None,
+    serial_no=None,
+):
+    """
+    Returns total stock, reserved quantity, available stock, and last 10 reservations that include this item.
+    When a serial_no is given, availability is computed for that exact serial.
+    """
+    if not item_code:
+        frappe.throw(_("Item Code is required"))
+    if not warehouse:
+        frappe.throw(_("Warehouse is required"))
+    if not start_date or not end_date:
+        frappe.throw(_("Start Date and End Date are required"))
+
+    rows = normalize_availability_rows(
+        [{"item_code": item_code, "serial_no": serial_no}], warehouse, start_date, end_date
+    )
+    availability = get_availability(rows)[0]
+
+    total_stock = availability["total_stock"]
+    reserved_qty = availability["reserved_qty"]
+    available_stock = availability["available_stock"]
+
+    # Last 10 reservations that include this item (most recent)
+    last_10_reservations = (
+        frappe.db.sql(
+            """
+        SELECT sr.name as reservation_id, sr.customer, sr.reservation_from, sr.reservation_to, sr.reservation_status
+        FROM `tabSuit Reservation` sr
+        JOIN `tabReservation Item` ri ON ri.parent = sr.name
+        WHERE ri.item_code = %s
+          AND sr.docstatus = 1
+          AND sr.reservation_status NOT IN ('Cancelled', 'Returned')
+        ORDER BY sr.reservation_from DESC
+        LIMIT 10
+    """,
+            (item_code,),
+            as_dict=1,
+        )
+        or []
+    )
+
+    return {
+        "total_stock": flt(total_stock),
+        "reserved_qty": flt(reserved_qty),
+        "available_stock": available_stock,
+        "last_10_reservations": last_10_reservations,
+        "conflicts": availability["conflicts"],
+    }
+
+
+@frappe.whitelist()
+def check_availability_bulk(items, warehouse=None, start_date=None, end_date=None):
+    """
+    Returns availability for every reservation item row in a single call.
+    Each row may carry its own warehouse and start/end dates, otherwise the shared ones are used.
+    """
+    rows = normalize_availability_rows(
+        frappe.parse_json(items), warehouse, start_date, end_date
+    )
+
+    if not rows:
+        frappe.throw(_("At least one Reservation Item is required"))
+
+    return get_availability(rows)
+
+
+def get_calendar_etag(item_codes, warehouse, from_date, to_date):
+    request_key = hashlib.sha256(
+        frappe.as_json([item_codes, warehouse, str(from_date), str(to_date)]).encode()
+    ).hexdigest()
+    return f"{get_availability_version(item_codes)}-{request_key[:16]}"
+
+
+def get_cached_availability_matrix(item_codes, warehouse, from_date, to_date, etag):
+    """The availability matrix, kept in Redis under its etag until availability changes."""
+    cache_key = f"suit_rental:availability_calendar:{etag}"
+    data = frappe.cache.get_value(cache_key)
+
+    if not data:
+        data = get_availability_matrix(item_codes, warehouse, from_date, to_date)
+        frappe.cache.set_value(cache_key, data, expires_in_sec=CALENDAR_CACHE_TTL)
+
+    return data
+
+
+def make_etag_response(etag, get_data):
+    """
+    JSON response with an ETag that browsers must revalidate. A request whose
+    If-None-Match still matches is answered with 304 and get_data is not called.
+    """
+    if frappe.request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(
+            frappe.as_json({"message": get_data()}), mimetype="application/json"
+        )
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@frappe.whitelist(methods=["GET"])
+def get_availability_calendar(
+    from_date, to_date, warehouse, items=None, item_group=None
+):
+    """
+    Returns a dense item x date matrix of free quantity for a calendar view.
+    The response carries an ETag header; browsers revalidate it with
+    If-None-Match and an unchanged matrix is answered with 304 Not Modified.
+    """
+    if not warehouse:
+        frappe.throw(_("Warehouse is required"))
+    if not from_date or not to_date:
+        frappe.throw(_("From Date and To Date are required"))
+
+    item_codes = get_calendar_item_codes(
+        frappe.parse_json(items) if items else None, item_group
+    )
+    etag = get_calendar_etag(item_codes, warehouse, from_date, to_date)
+
+    return make_etag_response(
+        etag,
+        lambda: get_cached_availability_matrix(
+            item_codes, warehouse, from_date, to_date, etag
+        ),
+    )
+
+
+@frappe.whitelist()
+def get_reservation_calendar_events(
+    doctype, start, end, field_map=None, filters=None, fields=None
+):
+    """
+    Events of the Suit Reservation calendar: the reservations, plus one
+    background event per day with the free units of the filtered branch,
+    taken from the availability matrix.
+    """
+    from frappe.desk.calendar import get_events
+
+    events = get_events(doctype, start, end, field_map, filters=filters, fields=fields)
+
+    branch = get_filter_value(filters, "branch")
+    warehouse = branch and frappe.db.get_value(
+        "Branch", branch, "custom_default_warehouse"
+    )
+    if not warehouse:
+        return events
+
+    item_codes = get_warehouse_rental_items(warehouse)
+    if not item_codes:
+        return events
+
+    from_date, to_date = get_datetime(start).date(), get_datetime(end).date()
+    if date_diff(to_date, from_date) >= MAX_CALENDAR_DAYS:
+        return events
+
+    etag = get_calendar_etag(item_codes, warehouse, from_date, to_date)
+    data = get_cached_availability_matrix(
+        item_codes, warehouse, from_date, to_date, etag
+    )
+
+    for day, free, total in get_daily_free_totals(data):
+        if free <= 0:
+            color = "red"
+        elif free * 2 < total:
+            color = "orange"
+        else:
+            color = "green"
+
+        events.append(
+            {
+                "name": f"availability-{day}",
+                "docstatus": 1,
+                "reservation_from": day,
+                "reservation_to": day,
+                "customer_name": _("{0} of {1} free").format(cint(free), cint(total)),
+                "display": "background",
+                "color": color,
+            }
+        )
+
+    return events
+
+
+def get_filter_value(filters, fieldname):
+    """Value of an equality filter in the list / dict filters a list view sends."""
+    filters = frappe.parse_json(filters) if isinstance(filters, str) else filters
+
+    if isinstance(filters, dict):
+        return filters.get(fieldname)
+
+    for f in filters or []:
+        # [doctype, fieldname, operator, value] or [fieldname, operator, value]
+        if len(f) == 4:
+            f = f[1:]
+        if f[0] == fieldname and f[1] == "=":
+            return f[2]
+
+
+@frappe.whitelist()
+def search_available_items(
+    warehouse,
+    from_date,
+    to_date,
+    item_group=None,
+    brand=None,
+    size=None,
+    txt=None,
+    after=None,
+    page_length=20,
+):
+    """
+    Returns rental items with free stock in the warehouse for the whole window,
+    with rate, image and free quantity. Pass next_after back as `after` for the next page.
+    """
+    if not warehouse:
+        frappe.throw(_("Warehouse is required"))
+    if not from_date or not to_date:
+        frappe.throw(_("From Date and To Date are required"))
+
+    return find_available_items(
+        warehouse,
+        from_date,
+        to_date,
+        item_group=item_group,
+        brand=brand,
+        size=size,
+        txt=txt,
+        after=after,
+        page_length=page_length,
+    )
+
+
+@frappe.whitelist()
+def get_availability_cache_stats(reset=False):
+    """
+    Returns hit / miss counters of the availability cache.
+    Pass reset=1 to start counting again.
+    """
+    frappe.only_for(["System Manager", "Suit Rental Manager"])
+
+    stats = get_cache_stats()
+    if cint(reset):
+        reset_cache_stats()
+
+    return stats
+
+
+# Deliver Items
+DELIVERY_JOB_TTL = 24 * 60 * 60
+
+
+def validate_delivery(doc, delivery_date, mode_of_payment):
+    """
+    Run every delivery check that does not post anything and return the
+    resolved posting context (dates, branch settings, account and rent).
+    """
+
+    # -----------------------------
+    # Basic Validations
+    # -----------------------------
+    if doc.docstatus != 1:
+        frappe.throw(_("Reservation must be Submitted to deliver"))
+
+    if doc.reservation_status != "Reserved":
+        frappe.throw(_("Reservation must be in 'Reserved' status to deliver"))
+
+    if not doc.source_warehouse:
+        frappe.throw(_("Source Warehouse is required for delivery"))
+
+    if not doc.reservation_items:
+        frappe.throw(_("Reservation Items are required for delivery"))
+
+    if not doc.company:
+        frappe.throw(_("Company is required for delivery"))
+
+    if not doc.currency:
+        frappe.throw(_("Currency is required for delivery"))
+
+    if not delivery_date:
+        frappe.throw(_("Delivery Date is required for delivery"))
+
+    delivery_dt = get_datetime(delivery_date)
+
+    reservation_dt = get_datetime(doc.reservation_date)
+
+    if delivery_dt <= reservation_dt:
+        frappe.throw(_("Delivery date & time must be after reservation date & time"))
+
+    if not mode_of_payment:
+        frappe.throw(_("Mode of Payment is required for delivery"))
+
+    if not doc.customer_stock_warehouse:
+        frappe.throw(_("Customer Stock Warehouse must be set before delivery"))
+
+    if not doc.branch:
+        frappe.throw(_("Branch is required for delivery"))
+
+    # -----------------------------
+    # Load Branch & Posting Settings
+    # -----------------------------
+    profile = get_posting_profile(doc.branch)
+
+    if profile.income_voucher_type == "Sales Invoice" and not profile.rent_invoice_item:
+        frappe.throw(_("Rent Invoice Item must be defined in Branch"))
+
+    # -----------------------------
+    # Resolve Mode of Payment Account
+    # -----------------------------
+    mop_account = profile.get_mop_account(mode_of_payment, doc.company)
+
+    if not mop_account:
+        frappe.throw(
+            _("No account found for Mode of Payment: {0}").format(mode_of_payment)
+        )
+
+    # -----------------------------
+    # Validate Items + Calculate Rent
+    # -----------------------------
+    total_rent = 0
+
+    for item in doc.reservation_items:
+        if not item.item_code:
+            frappe.throw(_("Item Code is missing in row {0}").format(item.idx))
+
+        if flt(item.qty) != 1:
+            frappe.throw(_("Quantity must be 1 in row {0}.").format(item.idx))
+
+        if item.has_serial_no and not item.serial_no:
+            frappe.throw(
+                _("Serial No is required for item {0} in row {1}").format(
+                    item.item_code, item.idx
+                )
+            )
+
+        if item.has_batch_no and not item.batch_no:
+            frappe.throw(
+                _("Batch No is required for item {0} in row {1}").format(
+                    item.item_code, item.idx
+                )
+            )
+
+        total_rent += flt(item.rate)
+
+    if doc.force_collect_security_amount and flt(doc.security_amount) <= 0:
+        frappe.throw(_("Security Amount is required when forced."))
+
+    return frappe._dict(
+        delivery_dt=delivery_dt,
+        delivery_date=delivery_dt.date(),
+        delivery_time=delivery_dt.time(),
+        mode_of_payment=mode_of_payment,
+        mop_account=mop_account,
+        profile=profile,
+        total_rent=total_rent,
+    )
+
+
+def make_delivery_stock_entry(company, ctx):
+    se = frappe.new_doc("Stock Entry")
+    se.stock_entry_type = "Material Transfer"
+    se.company = company
+    se.posting_date = ctx.delivery_date
+    se.posting_time = ctx.delivery_time
+    se.set_posting_time = 1
+    return se
+
+
+def append_delivery_stock_rows(se, doc):
+    for item in doc.reservation_items:
+        row = {
+            "item_code": item.item_code,
+            "qty": 1,
+            "uom": item.uom or "Nos",
+            "s_warehouse": doc.source_warehouse,
+            "t_warehouse": doc.customer_stock_warehouse,
+            "use_serial_batch_fields": 1,
+        }
+
+        if item.serial_no:
+            row["serial_no"] = item.serial_no
+        if item.batch_no:
+            row["batch_no"] = item.batch_no
+
+        se.append("items", row)
+
+
+def post_delivery_stock(doc, ctx):
+    """STOCK TRANSFER (Branch -> Customer Stock)"""
+    se = make_delivery_stock_entry(doc.company, ctx)
+    append_delivery_stock_rows(se, doc)
+
+    se.flags.ignore_mandatory = True
+    se.insert()
+    se.submit()
+
+    link_delivery_stock_entry(doc, ctx, se)
+
+
+def link_delivery_stock_entry(doc, ctx, se):
+    for item in doc.reservation_items:
+        item.is_delivered = 1
+
+    # Track Stock Entry in child table
+    doc.append(
+        "reservation_stock_entries",
+        {
+            "stock_entry": se.name,
+            "entry_type": "Delivery",
+            "posting_date": ctx.delivery_dt,
+            "remark": "Stock moved to customer stock warehouse",
+        },
+    )
+
+
+def make_receive_payment(doc, ctx, amount, description):
+    pe = frappe.new_doc("Payment Entry")
+    pe.payment_type = "Receive"
+    pe.party_type = "Customer"
+    pe.party = doc.customer
+    pe.company = doc.company
+    pe.posting_date = ctx.delivery_date
+    pe.currency = doc.currency
+    pe.paid_to = ctx.mop_account
+    pe.mode_of_payment = ctx.mode_of_payment
+    pe.paid_amount = amount
+    pe.received_amount = amount
+    pe.reference_no = doc.name
+    pe.reference_date = ctx.delivery_date
+
+    pe.flags.ignore_mandatory = True
+
+    pe.insert()
+    pe.submit()
+
+    doc.append(
+        "reservation_payments",
+        {
+            "payment_entry": pe.name,
+            "payment_mode": ctx.mode_of_payment,
+            "amount": amount,
+            "description": description,
+            "type": "Receive",
+        },
+    )
+
+    return pe
+
+
+def post_delivery_security(doc, ctx):
+    """SECURITY PAYMENT"""
+    security_amount = flt(doc.security_amount)
+
+    if doc.force_collect_security_amount and security_amount > 0:
+        make_receive_payment(doc, ctx, security_amount, "Security Payment")
+
+
+def get_invoice_advances(doc, posting_date):
+    """
+    Advance rows for the rent invoice: the reservation's deposit and
+    remaining rent Payment Entries, read in one query.
+    """
+    payment_entries = [
+        pay.payment_entry
+        for pay in doc.reservation_payments
+        if pay.description in ("Deposit Payment", "Remaining Rent Payment")
+        and pay.payment_entry
+    ]
+    if not payment_entries:
+        return []
+
+    entries = frappe.get_all(
+        "Payment Entry",
+        filters={"name": ["in", payment_entries]},
+        fields=["name", "remarks", "paid_amount"],
+    )
+    # Keep the order of reservation_payments
+    entries.sort(key=lambda pe: payment_entries.index(pe.name))
+
+    return [
+        {
+            "reference_type": "Payment Entry",
+            "reference_name": pe.name,
+            "advance_amount": flt(pe.paid_amount),
+            "allocated_amount": flt(pe.paid_amount),
+            "remarks": pe.remarks or "",
+            "difference_posting_date": posting_date,
+        }
+        for pe in entries
+        if flt(pe.paid_amount)
+    ]
+
+
+def post_delivery_rent_payment(doc, ctx):
+    """REMAINING RENT PAYMENT"""
+    deposit_paid = flt(doc.deposit_amount)
+    remaining_rent = ctx.total_rent - deposit_paid
+
+    if remaining_rent > 0:
+        make_receive_payment(doc, ctx, remaining_rent, "Remaining Rent Payment")
+        doc.paid_amount = ctx.total_rent
+    else:
+        doc.paid_amount = deposit_paid
+
+    doc.outstanding_amount = 0
+
+
+def post_delivery_income(doc, ctx):
+    """
+    RENT INCOME POSTING
+
+    The Sales Invoice is built completely in memory, with the deposit and
+    the remaining rent payment as advances, and inserted once. Daily
+    Consolidated branches only record the rent for the nightly posting.
+    """
+    profile = ctx.profile
+    total_rent = ctx.total_rent
+
+    if profile.is_daily_consolidated:
+        add_pending_income(
+            doc, ctx.delivery_date, "Rent", [(profile.rent_invoice_item, total_rent)]
+        )
+        return
+
+    # Journal Entry Method
+    if profile.post_income_as == "Journal Entry":
+        je = frappe.new_doc("Journal Entry")
+        je.company = doc.company
+        je.posting_date = ctx.delivery_date
+        je.voucher_type = "Journal Entry"
+        je.user_remark = "Suit Reservation"
+        je.cheque_no = doc.name
+
+        je.append(
+            "accounts",
+            {
+                "account": profile.receivable_account,
+                "party_type": "Customer",
+                "party": doc.customer,
+                "debit_in_account_currency": total_rent,
+            },
+        )
+
+        je.append(
+            "accounts",
+            {
+                "account": profile.income_account,
+                "credit_in_account_currency": total_rent,
+            },
+        )
+
+        je.flags.ignore_mandatory = True
+        je.insert()
+
+        if profile.journal_entry_status == "Submit":
+            je.submit()
+
+        doc.append(
+            "reservation_journal_entry",
+            {
+                "journal_entry": je.name,
+                "date": ctx.delivery_dt,
+                "purpose": "Rent",
+                "amount": total_rent,
+            },
+        )
+        return
+
+    # Sales Invoice Method
+    si = frappe.new_doc("Sales Invoice")
+    si.customer = doc.customer
+    si.company = doc.company
+    si.posting_date = ctx.delivery_date
+    si.posting_time = ctx.delivery_time
+    si.due_date = ctx.delivery_date
+    si.currency = doc.currency
+    si.ignore_pricing_rule = 1
+    si.set_posting_time = 1
+
+    si.append(
+        "items",
+        {
+            "item_code": profile.rent_invoice_item,
+            "qty": 1,
+            "rate": total_rent,
+        },
+    )
+
+    for advance in get_invoice_advances(doc, ctx.delivery_date):
+        si.append("advances", advance)
+
+    si.flags.ignore_mandatory = True
+    si.insert()
+
+    if profile.sales_invoice_status == "Submit":
+        si.submit()
+
+    doc.append(
+        "reservation_sales_invoice",
+        {
+            "sales_invoice": si.name,
+            "date": ctx.delivery_dt,
+            "purpose": "Rent",
+            "amount": total_rent,
+        },
+    )
+
+
+def post_delivery(doc, ctx, progress=None, workflow=None):
+    """
+    Post the delivery validated by validate_delivery: stock transfer,
+    security and rent payments, rent income, then mark the reservation
+    Delivered. `progress(percent, message)` is called after every step.
+    """
+    progress = progress or (lambda percent, message: None)
+
+    run_step(workflow, "stock", lambda: post_delivery_stock(doc, ctx))
+    progress(25, _("Stock transferred to customer stock"))
+
+    post_delivery_accounting(doc, ctx, progress, workflow)
+
+
+def finalize_delivery(doc, ctx):
+    doc.reservation_status = "Delivered"
+    doc.actual_delivery_date = ctx.delivery_dt
+
+
+def post_delivery_accounting(doc, ctx, progress=None, workflow=None):
+    """Everything after the stock transfer, ending with the reservation saved as Delivered."""
+    progress = progress or (lambda percent, message: None)
+
+    doc.total_estimated_rent = ctx.total_rent
+
+    run_step(workflow, "security", lambda: post_delivery_security(doc, ctx))
+    progress(40, _("Security payment posted"))
+
+    run_step(workflow, "rent_payment", lambda: post_delivery_rent_payment(doc, ctx))
+    progress(60, _("Remaining rent payment posted"))
+
+    run_step(workflow, "income", lambda: post_delivery_income(doc, ctx))
+    progress(80, _("Rent income posted"))
+
+    # -----------------------------
+    # FINAL UPDATE
+    # -----------------------------
+    run_step(workflow, "finalize", lambda: finalize_delivery(doc, ctx))
+
+    if not workflow or not workflow.journal:
+        doc.save(ignore_permissions=True)
+
+    progress(100, _("Reservation delivered"))
+
+
+def run_delivery_workflow(doc, params, workflow, progress=None):
+    ctx = validate_delivery(doc, params.delivery_date, params.mode_of_payment)
+    post_delivery(doc, ctx, progress, workflow)
+
+
+@frappe.whitelist()
+def deliver_reservation(name, delivery_date, mode_of_payment):
+
+    run_workflow(
+        "Delivery",
+        name,
+        {"delivery_date": delivery_date, "mode_of_payment": mode_of_payment},
+    )
+
+    frappe.msgprint(
+        msg=_("Reservation {0} has been successfully delivered.").format(name),
+        title=_("Delivery Successful"),
+        indicator="green",
+    )
+
+    return True
+
+
+# ----------------------------------------------------
+# Bulk Delivery
+# ----------------------------------------------------
+BULK_DELIVERY_BATCH_SIZE = 25
+
+
+def get_error_message(e):
+    frappe.clear_last_message()
+    return strip_html(str(e)) or e.__class__.__name__
+
+
+def load_delivery(name, delivery_date, mode_of_payment):
+    # Serialize against a concurrent delivery of the same reservation
+    frappe.db.get_value("Suit Reservation", name, "name", for_update=True)
+    doc = frappe.get_doc("Suit Reservation", name)
+    doc.check_permission("write")
+
+    return doc, validate_delivery(doc, delivery_date, mode_of_payment)
+
+
+def post_delivery_group(entries, delivery_date, mode_of_payment, results):
+    """
+    Post one shared Stock Entry for reservations with the same warehouse pair,
+    then the accounting of each reservation in its own savepoint.
+
+    A reservation whose accounting fails would leave its stock moved by the
+    shared entry, so the whole group is rolled back and posted again without
+    it. If the shared Stock Entry itself fails, the group is split up so only
+    the reservation that caused it is reported.
+    """
+    savepoint = "bulk_delivery_" + frappe.generate_hash(length=8)
+    frappe.db.savepoint(savepoint)
+
+    try:
+        ctx = entries[0][1]
+        se = make_delivery_stock_entry(entries[0][0].company, ctx)
+        for doc, _ctx in entries:
+            append_delivery_stock_rows(se, doc)
+
+        se.remarks = _("Suit Reservation delivery: {0}").format(
+            ", ".join(doc.name for doc, _ctx in entries)
+        )
+        se.flags.ignore_mandatory = True
+        se.insert()
+        se.submit()
+    except Exception as e:
+        frappe.db.rollback(save_point=savepoint)
+
+        if len(entries) == 1:
+            results[entries[0][0].name] = {"status": "Failed", "message": get_error_message(e)}
+            return
+
+        frappe.clear_last_message()
+        for entry in entries:
+            post_delivery_group([entry], delivery_date, mode_of_payment, results)
+        return
+
+    failed = []
+    for doc, ctx in entries:
+        row_savepoint = "bulk_delivery_row_" + frappe.generate_hash(length=8)
+        frappe.db.savepoint(row_savepoint)
+
+        try:
+            link_delivery_stock_entry(doc, ctx, se)
+            post_delivery_accounting(doc, ctx)
+        except Exception as e:
+            frappe.db.rollback(save_point=row_savepoint)
+            results[doc.name] = {"status": "Failed", "message": get_error_message(e)}
+            failed.append(doc.name)
+
+    if failed:
+        frappe.db.rollback(save_point=savepoint)
+
+        remaining = [
+            load_delivery(doc.name, delivery_date, mode_of_payment)
+            for doc, _ctx in entries
+            if doc.name not in failed
+        ]
+        if remaining:
+            post_delivery_group(remaining, delivery_date, mode_of_payment, results)
+        return
+
+    for doc, _ctx in entries:
+        results[doc.name] = {"status": "Delivered", "stock_entry": se.name}
+
+
+def deliver_reservations(names, delivery_date, mode_of_payment, progress=None):
+    """
+    Deliver many reservations at once.
+
+    Every reservation is validated first; one with a delivery, return or
+    cancellation still running or failed halfway is reported as Failed.
+    Stock moves as one Stock Entry per company / source / customer stock
+    warehouse batch, and the accounting runs per reservation with a commit
+    after every batch, so a failure only loses its own batch. Returns
+    {name: {"status": "Delivered" | "Failed", ...}} for every reservation.
+    """
+    progress = progress or (lambda percent, message: None)
+
+    results = {}
+    groups = {}
+
+    for name in names:
+        try:
+            # A half-done single delivery must be resumed, not delivered again
+            check_no_unfinished_workflow(name)
+            doc, ctx = load_delivery(name, delivery_date, mode_of_payment)
+        except Exception as e:
+            results[name] = {"status": "Failed", "message": get_error_message(e)}
+            continue
+
+        key = (doc.company, doc.source_warehouse, doc.customer_stock_warehouse)
+        groups.setdefault(key, []).append((doc, ctx))
+
+    batches = [
+        entries[i : i + BULK_DELIVERY_BATCH_SIZE]
+        for entries in groups.values()
+        for i in range(0, len(entries), BULK_DELIVERY_BATCH_SIZE)
+    ]
+
+    for count, batch in enumerate(batches, start=1):
+        post_delivery_group(batch, delivery_date, mode_of_payment, results)
+        frappe.db.commit()
+        progress(
+            count * 100 / len(batches),
+            _("Batch {0} of {1}").format(count, len(batches)),
+        )
+
+    return {name: results[name] for name in names}
+
+
+@frappe.whitelist()
+def deliver_reservations_bulk(names, delivery_date, mode_of_payment):
+    """
+    Queue a bulk delivery on a background worker and return its job id.
+
+    Progress is published as `suit_rental_delivery_progress` realtime events
+    and can be polled with get_delivery_job_status; the final status carries
+    the result of every reservation. The same selection, date and mode of
+    payment is only queued once at a time.
+    """
+    frappe.has_permission("Suit Reservation", "write", throw=True)
+
+    names = list(dict.fromkeys(frappe.parse_json(names) if isinstance(names, str) else names))
+    if not names:
+        frappe.throw(_("Select at least one reservation to deliver"))
+
+    job_id = "suit-rental-bulk-delivery-" + hashlib.sha256(
+        f"{'|'.join(sorted(names))}|{delivery_date}|{mode_of_payment}".encode()
+    ).hexdigest()[:20]
+
+    status = get_delivery_job_status(job_id)
+    if status and status.get("status") in ("Queued", "Running"):
+        return {"job_id": job_id, "status": status}
+
+    set_delivery_job_status(
+        job_id,
+        status="Queued",
+        progress=0,
+        message=_("Waiting for a worker"),
+        user=frappe.session.user,
+        results=None,
+    )
+
+    frappe.enqueue(
+        "suit_rental.api.run_bulk_delivery_job",
+        queue="long",
+        timeout=3600,
+        job_id=job_id,
+        deduplicate=True,
+        enqueue_after_commit=True,
+        delivery_job_id=job_id,
+        names=names,
+        delivery_date=delivery_date,
+        mode_of_payment=mode_of_payment,
+        user=frappe.session.user,
+    )
+
+    return {"job_id": job_id, "status": get_delivery_job_status(job_id)}
+
+
+def run_bulk_delivery_job(delivery_job_id, names, delivery_date, mode_of_payment, user):
+    job_id = delivery_job_id
+    progress = lambda percent, message: publish_delivery_progress(  # noqa: E731
+        job_id, None, user, percent, message
+    )
+
+    try:
+        progress(0, _("Validating reservations"))
+        results = deliver_reservations(names, delivery_date, mode_of_payment, progress)
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(title="Suit Reservation bulk delivery failed")
+        publish_delivery_progress(job_id, None, user, 100, strip_html(str(e)), "Failed")
+        return
+
+    delivered = sum(1 for result in results.values() if result["status"] == "Delivered")
+    set_delivery_job_status(job_id, results=results)
+    publish_delivery_progress(
+        job_id,
+        None,
+        user,
+        100,
+        _("{0} of {1} reservations delivered").format(delivered, len(names)),
+        "Completed",
+        results=results,
+    )
+
+
+# ----------------------------------------------------
+# Background Delivery
+# ----------------------------------------------------
+
+
+def get_delivery_job_key(job_id):
+    return f"suit_rental:delivery_job:{job_id}"
+
+
+def get_delivery_idempotency_key(job_id):
+    return frappe.cache.make_key(f"suit_rental:delivery_idempotency:{job_id}")
+
+
+def set_delivery_job_status(job_id, **values):
+    status = frappe.cache.get_value(get_delivery_job_key(job_id)) or {}
+    status.update(values, modified=str(now_datetime()))
+    frappe.cache.set_value(
+        get_delivery_job_key(job_id), status, expires_in_sec=DELIVERY_JOB_TTL
+    )
+
+
+def publish_delivery_progress(
+    job_id, name, user, percent, message, status="Running", results=None
+):
+    set_delivery_job_status(job_id, status=status, progress=percent, message=message)
+    frappe.publish_realtime(
+        "suit_rental_delivery_progress",
+        {
+            "job_id": job_id,
+            "reservation": name,
+            "status": status,
+            "progress": percent,
+            "message": message,
+            "results": results,
+        },
+        user=user,
+        doctype="Suit Reservation" if name else None,
+        docname=name,
+    )
+
+
+@frappe.whitelist()
+def get_delivery_job_status(job_id):
+    return frappe.cache.get_value(get_delivery_job_key(job_id))
+
+
+@frappe.whitelist()
+def deliver_reservation_async(name, delivery_date, mode_of_payment, idempotency_key=None):
+    """
+    Validate the delivery now and post it on a background worker.
+
+    Returns the job id; progress is published as `suit_rental_delivery_progress`
+    realtime events and can be polled with get_delivery_job_status. Calling
+    again with the same idempotency key (or the same reservation, date and
+    mode of payment) returns the existing job instead of posting twice.
+    """
+    doc = frappe.get_doc("Suit Reservation", name)
+    doc.check_permission("write")
+
+    idempotency_key = idempotency_key or f"{name}|{delivery_date}|{mode_of_payment}"
+    job_id = "suit-rental-delivery-" + hashlib.sha256(
+        f"{name}|{idempotency_key}".encode()
+    ).hexdigest()[:20]
+
+    # Claim the key atomically so a double click or retry never enqueues twice
+    claimed = frappe.cache.set(
+        get_delivery_idempotency_key(job_id),
+        name,
+        ex=DELIVERY_JOB_TTL,
+        nx=True,
+    )
+    if not claimed:
+        return {"job_id": job_id, "status": get_delivery_job_status(job_id)}
+
+    try:
+        validate_delivery(doc, delivery_date, mode_of_payment)
+    except Exception:
+        # Let the user fix the problem and try again with the same key
+        frappe.cache.delete(get_delivery_idempotency_key(job_id))
+        raise
+
+    set_delivery_job_status(
+        job_id,
+        status="Queued",
+        progress=0,
+        message=_("Waiting for a worker"),
+        reservation=name,
+        user=frappe.session.user,
+    )
+
+    frappe.enqueue(
+        "suit_rental.api.run_delivery_job",
+        queue="short",
+        timeout=600,
+        job_id=job_id,
+        deduplicate=True,
+        enqueue_after_commit=True,
+        delivery_job_id=job_id,
+        name=name,
+        delivery_date=delivery_date,
+        mode_of_payment=mode_of_payment,
+        user=frappe.session.user,
+    )
+
+    return {"job_id": job_id, "status": get_delivery_job_status(job_id)}
+
+
+def run_delivery_job(delivery_job_id, name, delivery_date, mode_of_payment, user):
+    job_id = delivery_job_id
+    progress = lambda percent, message: publish_delivery_progress(  # noqa: E731
+        job_id, name, user, percent, message
+    )
+
+    try:
+        progress(5, _("Validating reservation"))
+
+        if frappe.db.get_value("Suit Reservation", name, "reservation_status") == "Delivered":
+            publish_delivery_progress(
+                job_id, name, user, 100, _("Reservation was already delivered"), "Completed"
+            )
+            return
+
+        # Resumes from the last committed step if an earlier attempt failed
+        run_workflow(
+            "Delivery",
+            name,
+            {"delivery_date": delivery_date, "mode_of_payment": mode_of_payment},
+            progress,
+        )
+        frappe.db.commit()
+
+        publish_delivery_progress(
+            job_id,
+            name,
+            user,
+            100,
+            _("Reservation {0} has been successfully delivered.").format(name),
+            "Completed",
+        )
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(title=f"Suit Reservation delivery failed: {name}")
+
+        publish_delivery_progress(
+            job_id, name, user, 100, strip_html(str(e)), "Failed"
+        )
+
+        # A failed job may be retried with the same key once the cause is fixed
+        frappe.cache.delete(get_delivery_idempotency_key(job_id))
+
+
+RETURN_ENTRY_TYPES = {
+    "Good": ("Return - Good", "Returned to branch warehouse"),
+    "Damage": ("Return - Damage", "Moved to damage warehouse"),
+    "Lost": ("Return - Lost", "Item lost by customer"),
+}
+
+
+def post_return_stock(doc, return_dt, statuses, workflow=None):
+    """
+    Post the return stock movement as at most one Material Transfer per
+    target warehouse plus one Material Issue for lost items, and add one
+    reservation_stock_entries row per returned item.
+
+    1) GOOD - Transfer back to Branch Store
+    2) DAMAGE - Transfer to the Damage Warehouse of its Return Status
+    3) LOST - Material Issue from Customer Stock
+
+    Items that already have a return stock row (from an earlier, failed
+    attempt) are skipped.
+    """
+    groups = get_return_stock_groups(doc, statuses)
+
+    for (stock_entry_type, target_warehouse), items in groups.items():
+        run_step(
+            workflow,
+            f"stock:{stock_entry_type}:{target_warehouse or ''}",
+            lambda: make_return_stock_entry(
+                doc, return_dt, stock_entry_type, target_warehouse, items
+            ),
+        )
+
+
+def get_return_stock_groups(doc, statuses):
+    """{(stock_entry_type, target_warehouse): [items]} for the items not returned yet."""
+    returned = {
+        row.reservation_item
+        for row in doc.reservation_stock_entries
+        if row.reservation_item and (row.entry_type or "").startswith("Return")
+    }
+    groups = {}
+
+    for item in doc.reservation_items:
+        if item.name in returned:
+            continue
+
+        if item.return_type == "Good":
+            key = ("Material Transfer", doc.source_warehouse)
+
+        elif item.return_type == "Damage":
+            damage_warehouse = statuses[item.return_status].damage_warehouse
+            if not damage_warehouse:
+                frappe.throw(
+                    _("Damage Warehouse is not set in Return Status {0}").format(
+                        item.return_status
+                    )
+                )
+            key = ("Material Transfer", damage_warehouse)
+
+        elif item.return_type == "Lost":
+            key = ("Material Issue", None)
+
+        else:
+            continue
+
+        groups.setdefault(key, []).append(item)
+
+    return groups
+
+
+def new_return_stock_entry(company, return_dt, stock_entry_type):
+    se = frappe.new_doc("Stock Entry")
+    se.stock_entry_type = stock_entry_type
+    se.company = company
+    se.posting_date = return_dt.date()
+    se.posting_time = return_dt.time()
+    se.set_posting_time = 1
+    return se
+
+
+def append_return_stock_rows(se, doc, target_warehouse, items):
+    for item in items:
+        row = {
+            "item_code": item.item_code,
+            "qty": 1,
+            "uom": item.uom or "Nos",
+            "s_warehouse": doc.customer_stock_warehouse,
+            "use_serial_batch_fields": 1,
+            "serial_no": item.serial_no or "",
+            "batch_no": item.batch_no or "",
+        }
+        if target_warehouse:
+            row["t_warehouse"] = target_warehouse
+
+        se.append("items", row)
+
+
+def link_return_stock_entry(doc, return_dt, se, items):
+    for item in items:
+        entry_type, remark = RETURN_ENTRY_TYPES[item.return_type]
+        doc.append(
+            "reservation_stock_entries",
+            {
+                "stock_entry": se.name,
+                "entry_type": entry_type,
+                "posting_date": return_dt,
+                "remark": remark,
+                "reservation_item": item.name,
+                "item_code": item.item_code,
+                "serial_no": item.serial_no,
+            },
+        )
+
+
+def make_return_stock_entry(doc, return_dt, stock_entry_type, target_warehouse, items):
+    se = new_return_stock_entry(doc.company, return_dt, stock_entry_type)
+    append_return_stock_rows(se, doc, target_warehouse, items)
+
+    se.flags.ignore_mandatory = True
+    se.insert()
+    se.submit()
+
+    link_return_stock_entry(doc, return_dt, se, items)
+
+
+## Return API
+
+
+def validate_return(doc, actual_return_datetime):
+    """
+    Run every return check that does not post anything and return the
+    posting context (return date, statuses, penalty rows, branch profile).
+    """
+
+    # -----------------------------
+    # Load Branch & Posting Settings
+    # -----------------------------
+    profile = get_posting_profile(doc.branch)
+
+    # -------------------------------------------------
+    # BASIC VALIDATIONS
+    # -------------------------------------------------
+    if doc.docstatus != 1:
+        frappe.throw(_("Reservation must be Submitted"))
+
+    if doc.reservation_status != "Delivered":
+        frappe.throw(_("Reservation must be in Delivered status"))
+
+    if not actual_return_datetime:
+        frappe.throw(_("Return Date & Time is required"))
+
+    if not doc.actual_delivery_date:
+        frappe.throw(_("Delivery Date & Time is missing"))
+
+    return_dt = get_datetime(actual_return_datetime)
+    delivery_dt = get_datetime(doc.actual_delivery_date)
+
+    if return_dt <= delivery_dt:
+        frappe.throw(_("Return date & time must be after delivery date & time"))
+
+    if not doc.reservation_items:
+        frappe.throw(_("No reservation items found"))
+
+    # -------------------------------------------------
+    # VALIDATE ITEMS
+    # -------------------------------------------------
+    total_penalty = 0
+    penalty_items = []
+
+    statuses = get_return_status_map(
+        [item.return_status for item in doc.reservation_items]
+    )
+
+    for item in doc.reservation_items:
+
+        if not item.return_status:
+            frappe.throw(_("Return Status is required for all items"))
+
+        if item.return_status not in statuses:
+            frappe.throw(
+                _("Return Status {0} in row {1} does not exist").format(
+                    item.return_status, item.idx
+                )
+            )
+
+        if not item.return_type:
+            frappe.throw(_("Return Type is missing in row {0}").format(item.idx))
+
+        penalty_amount = flt(item.penalty_amount)
+
+        if item.return_type in ("Damage", "Lost") and penalty_amount > 0:
+            total_penalty += penalty_amount
+            penalty_items.append(item)
+
+    return frappe._dict(
+        return_dt=return_dt,
+        statuses=statuses,
+        total_penalty=total_penalty,
+        penalty_items=penalty_items,
+        profile=profile,
+    )
+
+
+def post_return_penalty(doc, ctx):
+    """PENALTY ACCOUNTING (ONLY IF > 0)"""
+    profile = ctx.profile
+    return_dt = ctx.return_dt
+    total_penalty = ctx.total_penalty
+
+    if total_penalty > 0:
+
+        # -------- DAILY CONSOLIDATED --------
+        if profile.is_daily_consolidated:
+            add_pending_income(
+                doc,
+                return_dt.date(),
+                "Return Penalty",
+                [
+                    (ctx.statuses[item.return_status].income_item, item.penalty_amount)
+                    for item in ctx.penalty_items
+                ],
+            )
+
+        # -------- JOURNAL ENTRY --------
+        elif profile.post_income_as == "Journal Entry":
+            je = frappe.new_doc("Journal Entry")
+            je.company = doc.company
+            je.posting_date = return_dt.date()
+            je.posting_time = return_dt.time()
+            je.set_posting_time = 1
+            je.voucher_type = "Journal Entry"
+            je.user_remark = "Suit Return Penalty"
+            je.cheque_no = doc.name
+
+            je.append(
+                "accounts",
+                {
+                    "account": profile.receivable_account,
+                    "party_type": "Customer",
+                    "party": doc.customer,
+                    "debit_in_account_currency": total_penalty,
+                },
+            )
+
+            je.append(
+                "accounts",
+                {
+                    "account": profile.income_account,
+                    "credit_in_account_currency": total_penalty,
+                },
+            )
+
+            je.flags.ignore_mandatory = True
+            je.insert()
+
+            if profile.journal_entry_status == "Submit":
+                je.submit()
+
+            doc.append(
+                "reservation_journal_entry",
+                {
+                    "journal_entry": je.name,
+                    "date": return_dt,
+                    "purpose": "Return Penalty",
+                    "amount": total_penalty,
+                },
+            )
+
+        # -------- SALES INVOICE --------
+        else:
+
+            si = frappe.new_doc("Sales Invoice")
+            si.customer = doc.customer
+            si.company = doc.company
+            si.posting_date = return_dt.date()
+            si.posting_time = return_dt.time()
+            si.set_posting_time = 1
+            si.ignore_pricing_rule = 1
+            si.currency = doc.currency
+
+            for item in ctx.penalty_items:
+                status = ctx.statuses[item.return_status]
+
+                si.append(
+                    "items",
+                    {
+                        "item_code": status.income_item,
+                        "qty": 1,
+                        "rate": item.penalty_amount,
+                    },
+                )
+
+            si.flags.ignore_mandatory = True
+            si.insert()
+
+            if profile.sales_invoice_status == "Submit":
+                si.submit()
+
+            doc.append(
+                "reservation_sales_invoice",
+                {
+                    "sales_invoice": si.name,
+                    "date": return_dt,
+                    "purpose": "Return Penalty",
+                    "amount": total_penalty,
+                },
+            )
+
+
+def finalize_return(doc, ctx):
+    for item in doc.reservation_items:
+        item.is_returned = 1
+
+    doc.reservation_status = "Returned"
+    doc.actual_return_date = ctx.return_dt
+
+
+def post_return(doc, ctx, workflow=None):
+    """Post the return validated by validate_return as committed steps: stock, penalty, status."""
+
+    # -------------------------------------------------
+    # STOCK ENTRIES
+    # -------------------------------------------------
+    post_return_stock(doc, ctx.return_dt, ctx.statuses, workflow)
+
+    # -------------------------------------------------
+    # PENALTY ACCOUNTING
+    # -------------------------------------------------
+    run_step(workflow, "penalty", lambda: post_return_penalty(doc, ctx))
+
+    # -------------------------------------------------
+    # FINAL UPDATE
+    # -------------------------------------------------
+    run_step(workflow, "finalize", lambda: finalize_return(doc, ctx))
+
+    if not workflow or not workflow.journal:
+        doc.save(ignore_permissions=True)
+
+
+def run_return_workflow(doc, params, workflow, progress=None):
+    ctx = validate_return(doc, params.actual_return_datetime)
+    post_return(doc, ctx, workflow)
+
+
+@frappe.whitelist()
+def return_reservation(name, actual_return_datetime):
+
+    doc = run_workflow(
+        "Return", name, {"actual_return_datetime": actual_return_datetime}
+    )
+
+    frappe.msgprint(
+        _("Reservation {0} has been successfully returned").format(doc.name),
+        indicator="green",
+    )
+
+    return True
+
+
+# ----------------------------------------------------
+# Return Intake (barcode scanning)
+# ----------------------------------------------------
+BULK_RETURN_BATCH_SIZE = 25
+
+
+@frappe.whitelist()
+def resolve_return_scan(serial_no, branch=None):
+    """
+    Resolve a scanned serial number to the row of its open Delivered
+    reservation, together with every row of that reservation still to be
+    returned so the intake page knows when the reservation is complete.
+    """
+    frappe.has_permission("Suit Reservation", "write", throw=True)
+
+    serial_no = (serial_no or "").strip()
+    if not serial_no:
+        frappe.throw(_("Serial No is required"))
+
+    conditions = ""
+    if branch:
+        conditions = "AND sr.branch = %(branch)s"
+
+    # Reservation Item (serial_no, parent) index
+    rows = frappe.db.sql(
+        f"""
+        SELECT ri.parent AS reservation, ri.name AS row_name
+        FROM `tabReservation Item` ri
+        JOIN `tabSuit Reservation` sr ON sr.name = ri.parent
+        WHERE ri.serial_no = %(serial_no)s
+          AND ri.parenttype = 'Suit Reservation'
+          AND IFNULL(ri.is_returned, 0) = 0
+          AND sr.docstatus = 1
+          AND sr.reservation_status = 'Delivered'
+          {conditions}
+        """,
+        {"serial_no": serial_no, "branch": branch},
+        as_dict=True,
+    )
+
+    if not rows:
+        frappe.throw(
+            _("Serial No {0} is not out on any delivered reservation").format(serial_no),
+            frappe.DoesNotExistError,
+        )
+
+    reservation = frappe.db.get_value(
+        "Suit Reservation",
+        rows[0].reservation,
+        ["name", "customer", "customer_name", "branch", "currency", "reservation_to"],
+        as_dict=True,
+    )
+
+    reservation["items"] = frappe.db.sql(
+        """
+        SELECT ri.name, ri.idx, ri.item_code, ri.item_name, ri.serial_no,
+            item.custom_damage_penalty_amount AS damage_penalty_amount,
+            item.custom_lost_penalty_amount AS lost_penalty_amount
+        FROM `tabReservation Item` ri
+        LEFT JOIN `tabItem` item ON item.name = ri.item_code
+        WHERE ri.parent = %(reservation)s
+          AND ri.parenttype = 'Suit Reservation'
+          AND IFNULL(ri.is_returned, 0) = 0
+        ORDER BY ri.idx
+        """,
+        {"reservation": reservation.name},
+        as_dict=True,
+    )
+    reservation["row"] = rows[0].row_name
+
+    return reservation
+
+
+def apply_return_scans(doc, items):
+    """Set return status, type and penalty of the scanned rows, as the return dialog would."""
+    rows = {row.name: row for row in doc.reservation_items}
+    statuses = get_return_status_map([item.get("return_status") for item in items])
+
+    for item in items:
+        row = rows.get(item.get("name"))
+        if not row:
+            frappe.throw(
+                _("Row {0} does not belong to reservation {1}").format(
+                    item.get("name"), doc.name
+                )
+            )
+
+        status = statuses.get(item.get("return_status"))
+        if not status:
+            frappe.throw(
+                _("Return Status {0} does not exist").format(item.get("return_status"))
+            )
+
+        row.return_status = status.name
+        row.return_type = status.type
+
+        if status.type == "Good":
+            row.penalty_amount = 0
+        elif status.allow_edit_penalty and item.get("penalty_amount") is not None:
+            row.penalty_amount = flt(item.get("penalty_amount"))
+        else:
+            penalty_field = (
+                "custom_lost_penalty_amount"
+                if status.type == "Lost"
+                else "custom_damage_penalty_amount"
+            )
+            row.penalty_amount = flt(
+                frappe.db.get_value("Item", row.item_code, penalty_field)
+            )
+
+
+def load_return(name, items, actual_return_datetime):
+    # Serialize against a concurrent return of the same reservation
+    frappe.db.get_value("Suit Reservation", name, "name", for_update=True)
+    doc = frappe.get_doc("Suit Reservation", name)
+    doc.check_permission("write")
+
+    apply_return_scans(doc, items)
+
+    return doc, validate_return(doc, actual_return_datetime)
+
+
+def post_return_group(entries, actual_return_datetime, scans, results):
+    """
+    Post the returns of reservations sharing a customer stock warehouse with
+    one Stock Entry per stock entry type / target warehouse, then the
+    penalty and status of each reservation in its own savepoint.
+
+    Failures are handled as in post_delivery_group: the group is rolled back
+    and posted again without the failing reservation.
+    """
+    savepoint = "bulk_return_" + frappe.generate_hash(length=8)
+    frappe.db.savepoint(savepoint)
+
+    return_dt = entries[0][1].return_dt
+    stock = {}
+
+    try:
+        for doc, ctx in entries:
+            for key, items in get_return_stock_groups(doc, ctx.statuses).items():
+                if key not in stock:
+                    stock[key] = (new_return_stock_entry(doc.company, return_dt, key[0]), [])
+
+                se, members = stock[key]
+                append_return_stock_rows(se, doc, key[1], items)
+                members.append((doc.name, items))
+
+        for se, members in stock.values():
+            se.remarks = _("Suit Reservation return: {0}").format(
+                ", ".join(name for name, items in members)
+            )
+            se.flags.ignore_mandatory = True
+            se.insert()
+            se.submit()
+    except Exception as e:
+        frappe.db.rollback(save_point=savepoint)
+
+        if len(entries) == 1:
+            results[entries[0][0].name] = {"status": "Failed", "message": get_error_message(e)}
+            return
+
+        frappe.clear_last_message()
+        for entry in entries:
+            post_return_group([entry], actual_return_datetime, scans, results)
+        return
+
+    failed = []
+    for doc, ctx in entries:
+        row_savepoint = "bulk_return_row_" + frappe.generate_hash(length=8)
+        frappe.db.savepoint(row_savepoint)
+
+        try:
+            for se, members in stock.values():
+                for name, items in members:
+                    if name == doc.name:
+                        link_return_stock_entry(doc, return_dt, se, items)
+
+            post_return_penalty(doc, ctx)
+            finalize_return(doc, ctx)
+            doc.save(ignore_permissions=True)
+        except Exception as e:
+            frappe.db.rollback(save_point=row_savepoint)
+            results[doc.name] = {"status": "Failed", "message": get_error_message(e)}
+            failed.append(doc.name)
+
+    if failed:
+        frappe.db.rollback(save_point=savepoint)
+
+        remaining = [
+            load_return(doc.name, scans[doc.name], actual_return_datetime)
+            for doc, ctx in entries
+            if doc.name not in failed
+        ]
+        if remaining:
+            post_return_group(remaining, actual_return_datetime, scans, results)
+        return
+
+    for doc, ctx in entries:
+        results[doc.name] = {
+            "status": "Returned",
+            "stock_entries": [
+                se.name
+                for se, members in stock.values()
+                if any(name == doc.name for name, items in members)
+            ],
+            "penalty": ctx.total_penalty,
+        }
+
+
+@frappe.whitelist()
+def return_reservations_bulk(returns, actual_return_datetime=None):
+    """
+    Return many scanned reservations at once.
+
+    `returns` is [{"reservation": name, "items": [{"name": row, "return_status":
+    status, "penalty_amount": amount}]}], normally built by the Return Intake
+    page. A reservation with a delivery, return or cancellation still running
+    or failed halfway is reported as Failed. Stock moves as one Stock Entry
+    per type / target warehouse for each batch of reservations sharing a
+    customer stock warehouse, with a commit after every batch. Returns
+    {name: {"status": "Returned" | "Failed", ...}}.
+    """
+    returns = frappe.parse_json(returns) if isinstance(returns, str) else returns
+    actual_return_datetime = actual_return_datetime or str(now_datetime())
+
+    scans = {}
+    for entry in returns:
+        scans.setdefault(entry["reservation"], []).extend(entry.get("items") or [])
+
+    results = {}
+    groups = {}
+
+    for name, items in scans.items():
+        try:
+            # A half-done single return must be resumed, not posted again
+            check_no_unfinished_workflow(name)
+            doc, ctx = load_return(name, items, actual_return_datetime)
+        except Exception as e:
+            results[name] = {"status": "Failed", "message": get_error_message(e)}
+            continue
+
+        groups.setdefault((doc.company, doc.customer_stock_warehouse), []).append((doc, ctx))
+
+    batches = [
+        entries[i : i + BULK_RETURN_BATCH_SIZE]
+        for entries in groups.values()
+        for i in range(0, len(entries), BULK_RETURN_BATCH_SIZE)
+    ]
+
+    for count, batch in enumerate(batches, start=1):
+        frappe.publish_progress(
+            count * 100 / len(batches),
+            title=_("Returning Reservations"),
+            description=_("Batch {0} of {1}").format(count, len(batches)),
+        )
+        post_return_group(batch, actual_return_datetime, scans, results)
+        frappe.db.commit()
+
+    return {name: results[name] for name in scans}
@@ -0,0 +1,1056 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+import hashlib
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, date_diff, flt, getdate, now_datetime, nowdate
+
+# Reservation statuses that keep an item out of the rental pool
+OCCUPYING_STATUSES = ("Reserved", "Delivered")
+
+# Random epoch, replaced when the whole ledger is rebuilt, used to build calendar ETags
+AVAILABILITY_VERSION_KEY = "suit_rental:availability_version"
+# item_code -> counter bumped whenever the item's bookings or stock move
+AVAILABILITY_ITEM_VERSIONS_KEY = "suit_rental:availability_item_versions"
+
+MAX_CALENDAR_DAYS = 366
+
+# Per item/warehouse/window availability kept in the site's Redis
+AVAILABILITY_CACHE_TTL = 10 * 60
+# "item_code<US>window" -> last read time, for LRU eviction over all items
+AVAILABILITY_CACHE_LRU_KEY = "suit_rental:availability_cache:lru"
+AVAILABILITY_CACHE_MAX_ENTRIES = 20000
+AVAILABILITY_CACHE_HITS_KEY = "suit_rental:availability_cache:hits"
+AVAILABILITY_CACHE_MISSES_KEY = "suit_rental:availability_cache:misses"
+
+OCCUPANCY_FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"reservation",
+	"reservation_item",
+	"branch",
+	"reservation_status",
+	"item_code",
+	"serial_no",
+	"batch_no",
+	"warehouse",
+	"occupancy_date",
+	"qty",
+)
+
+
+class OverbookingError(frappe.ValidationError):
+	pass
+
+
+def normalize_availability_rows(rows, warehouse=None, start_date=None, end_date=None):
+	"""
+	Turn the raw rows sent by the form into plain dicts.
+	Every row falls back to the shared warehouse / window when it has none of its own.
+	"""
+	normalized = []
+
+	for idx, row in enumerate(rows or [], start=1):
+		row = frappe._dict(row)
+
+		if not row.item_code:
+			frappe.throw(_("Item Code is missing in row {0}").format(row.idx or idx))
+
+		row_warehouse = row.warehouse or warehouse
+		row_start = row.start_date or start_date
+		row_end = row.end_date or end_date
+
+		if not row_warehouse:
+			frappe.throw(_("Warehouse is required in row {0}").format(row.idx or idx))
+		if not row_start or not row_end:
+			frappe.throw(_("Start Date and End Date are required in row {0}").format(row.idx or idx))
+
+		normalized.append(
+			frappe._dict(
+				{
+					"name": row.name,
+					"idx": row.idx or idx,
+					"item_code": row.item_code,
+					"serial_no": row.serial_no or None,
+					"warehouse": row_warehouse,
+					"start_date": getdate(row_start),
+					"end_date": getdate(row_end),
+				}
+			)
+		)
+
+	return normalized
+
+
+def get_daily_booked_qty(item_codes, warehouses, start_date, end_date):
+	"""
+	Return {(item_code, warehouse): {date: booked_qty}} for [start_date, end_date],
+	read from the occupancy ledger with one indexed range query. Bookings only
+	count against the stock of the warehouse they are booked from.
+	"""
+	if not item_codes or not warehouses:
+		return {}
+
+	booked = frappe.db.sql(
+		"""
+		SELECT item_code, warehouse, occupancy_date, SUM(qty) AS qty
+		FROM `tabReservation Occupancy`
+		WHERE item_code IN %(item_codes)s
+		  AND occupancy_date BETWEEN %(start_date)s AND %(end_date)s
+		  AND warehouse IN %(warehouses)s
+		GROUP BY item_code, warehouse, occupancy_date
+	""",
+		{
+			"item_codes": tuple(item_codes),
+			"warehouses": tuple(warehouses),
+			"start_date": start_date,
+			"end_date": end_date,
+		},
+		as_dict=True,
+	)
+
+	daily = {}
+	for b in booked:
+		daily.setdefault((b.item_code, b.warehouse), {})[getdate(b.occupancy_date)] = flt(b.qty)
+
+	return daily
+
+
+def get_reserved_qty(daily_booked, start_date, end_date):
+	"""Peak quantity booked on any single day of [start_date, end_date]."""
+	return max(
+		(qty for day, qty in (daily_booked or {}).items() if start_date <= day <= end_date),
+		default=0,
+	)
+
+
+def get_serial_bookings(serial_nos, start_date, end_date):
+	"""Return {serial_no: [(date, reservation), ...]} from the occupancy ledger."""
+	if not serial_nos:
+		return {}
+
+	booked = frappe.db.sql(
+		"""
+		SELECT serial_no, occupancy_date, reservation
+		FROM `tabReservation Occupancy`
+		WHERE serial_no IN %(serial_nos)s
+		  AND occupancy_date BETWEEN %(start_date)s AND %(end_date)s
+	""",
+		{"serial_nos": tuple(serial_nos), "start_date": start_date, "end_date": end_date},
+		as_dict=True,
+	)
+
+	bookings = {}
+	for b in booked:
+		bookings.setdefault(b.serial_no, []).append((getdate(b.occupancy_date), b.reservation))
+
+	return bookings
+
+
+def get_rental_pool_warehouses(warehouses):
+	"""
+	{warehouse: {warehouses}} a branch's serials can be in: its store and the
+	customer stock warehouse its rentals sit in while they are out. Warehouses
+	that are no branch's store only pool with themselves.
+	"""
+	pools = {warehouse: {warehouse} for warehouse in warehouses if warehouse}
+	if not pools:
+		return pools
+
+	for branch in frappe.get_all(
+		"Branch",
+		filters={"custom_default_warehouse": ["in", list(pools)]},
+		fields=["custom_default_warehouse", "custom_customer_stock_warehouse"],
+	):
+		if branch.custom_customer_stock_warehouse:
+			pools[branch.custom_default_warehouse].add(branch.custom_customer_stock_warehouse)
+
+	return pools
+
+
+def get_reservation_pool(doc):
+	"""Warehouses the serials a reservation can be given may be in, its own customer stock included."""
+	pool = get_rental_pool_warehouses([doc.source_warehouse])[doc.source_warehouse]
+	if doc.customer_stock_warehouse:
+		pool.add(doc.customer_stock_warehouse)
+
+	return pool
+
+
+def get_owned_qty_map(rows, pools):
+	"""
+	Return {(item_code, warehouse): owned_qty} for all rows with a single Bin query.
+	A warehouse owns the units in its whole rental pool (see get_rental_pool_warehouses),
+	so units out on rental still count: the ledger takes them off for their windows only.
+	"""
+	if not rows:
+		return {}
+
+	bins = frappe.get_all(
+		"Bin",
+		filters={
+			"item_code": ["in", list({row.item_code for row in rows})],
+			"warehouse": ["in", list(set().union(*(pools[row.warehouse] for row in rows)))],
+		},
+		fields=["item_code", "warehouse", "actual_qty"],
+	)
+	bin_qty = {(b.item_code, b.warehouse): flt(b.actual_qty) for b in bins}
+
+	return {
+		(row.item_code, row.warehouse): sum(
+			bin_qty.get((row.item_code, warehouse), 0.0) for warehouse in pools[row.warehouse]
+		)
+		for row in rows
+	}
+
+
+def is_rentable_serial(serial, item_code, pool):
+	"""
+	A serial can be booked for any window if it is an Active serial of the item
+	kept by the branch, even while it is out on another rental: whether the
+	window clashes is decided by the occupancy ledger.
+	"""
+	return (
+		bool(serial)
+		and serial.item_code == item_code
+		and serial.status == "Active"
+		and serial.warehouse in pool
+	)
+
+
+def get_availability(rows, use_cache=True):
+	"""
+	Availability for many normalized rows, answered from the Redis cache where possible.
+	Only the rows that miss are computed, together, and written back.
+	"""
+	if not use_cache:
+		return compute_availability(rows)
+
+	cached = [get_cached_availability(row) for row in rows]
+	missing = [row for row, hit in zip(rows, cached, strict=True) if hit is None]
+
+	record_cache_stats(hits=len(rows) - len(missing), misses=len(missing))
+
+	computed = iter(compute_availability(missing))
+	result = []
+	for row, hit in zip(rows, cached, strict=True):
+		if hit is None:
+			hit = next(computed)
+			set_cached_availability(row, hit)
+		else:
+			hit = dict(hit, name=row.name, idx=row.idx)
+
+		result.append(hit)
+
+	touch_cache_entries(rows)
+	if missing:
+		trim_availability_cache()
+
+	return result
+
+
+def compute_availability(rows):
+	"""
+	Compute availability for many normalized rows at once:
+	one Bin lookup over the rental pools plus one grouped occupancy query over the
+	union of the windows. Rows with a Serial No are answered for that exact serial
+	instead of the item quantity.
+	"""
+	if not rows:
+		return []
+
+	start_date = min(row.start_date for row in rows)
+	end_date = max(row.end_date for row in rows)
+
+	pools = get_rental_pool_warehouses({row.warehouse for row in rows})
+	stock_map = get_owned_qty_map(rows, pools)
+	daily_booked = get_daily_booked_qty(
+		{row.item_code for row in rows}, {row.warehouse for row in rows}, start_date, end_date
+	)
+
+	serial_nos = {row.serial_no for row in rows if row.serial_no}
+	serial_bookings = get_serial_bookings(serial_nos, start_date, end_date)
+	serial_info = {}
+	if serial_nos:
+		for serial in frappe.get_all(
+			"Serial No",
+			filters={"name": ["in", list(serial_nos)]},
+			fields=["name", "item_code", "warehouse", "status"],
+		):
+			serial_info[serial.name] = serial
+
+	result = []
+	for row in rows:
+		conflicts = []
+
+		if row.serial_no:
+			in_stock = is_rentable_serial(serial_info.get(row.serial_no), row.item_code, pools[row.warehouse])
+			total_stock = 1.0 if in_stock else 0.0
+
+			conflicts = sorted(
+				{
+					reservation
+					for day, reservation in serial_bookings.get(row.serial_no, [])
+					if row.start_date <= day <= row.end_date
+				}
+			)
+			reserved_qty = 1.0 if conflicts else 0.0
+		else:
+			total_stock = stock_map.get((row.item_code, row.warehouse), 0.0)
+			reserved_qty = get_reserved_qty(
+				daily_booked.get((row.item_code, row.warehouse)), row.start_date, row.end_date
+			)
+
+		result.append(
+			{
+				"name": row.name,
+				"idx": row.idx,
+				"item_code": row.item_code,
+				"serial_no": row.serial_no,
+				"warehouse": row.warehouse,
+				"start_date": row.start_date,
+				"end_date": row.end_date,
+				"total_stock": flt(total_stock),
+				"reserved_qty": flt(reserved_qty),
+				"available_stock": flt(total_stock) - flt(reserved_qty),
+				"conflicts": conflicts,
+			}
+		)
+
+	return result
+
+
+# -------------------------------------------------
+# OVERBOOKING GUARD
+# -------------------------------------------------
+
+
+def lock_items(item_codes):
+	"""
+	Take row locks on the Item records, always in name order so concurrent
+	submits cannot deadlock. Bookings of unrelated items are never blocked.
+	"""
+	if item_codes:
+		frappe.db.sql(
+			"SELECT name FROM `tabItem` WHERE name IN %(item_codes)s ORDER BY name FOR UPDATE",
+			{"item_codes": tuple(sorted(item_codes))},
+		)
+
+
+def get_booking_conflicts(doc):
+	"""
+	Return [(item_code, serial_no, [reservations])] for every row of the reservation
+	that cannot be booked. The items must already be locked with lock_items, so no
+	other submit can book them before this one is committed; the locking read
+	sees the latest committed ledger rows.
+	"""
+	rows = [row for row in doc.reservation_items if row.item_code]
+	if not rows or not doc.source_warehouse or not doc.reservation_from or not doc.reservation_to:
+		return []
+
+	item_codes = sorted({row.item_code for row in rows})
+
+	occupancy = frappe.db.sql(
+		"""
+		SELECT item_code, serial_no, warehouse, occupancy_date, qty, reservation
+		FROM `tabReservation Occupancy`
+		WHERE item_code IN %(item_codes)s
+		  AND occupancy_date BETWEEN %(start_date)s AND %(end_date)s
+		  AND reservation != %(reservation)s
+		LOCK IN SHARE MODE
+	""",
+		{
+			"item_codes": tuple(item_codes),
+			"start_date": getdate(doc.reservation_from),
+			"end_date": getdate(doc.reservation_to),
+			"reservation": doc.name,
+		},
+		as_dict=True,
+	)
+
+	stock = dict(
+		frappe.db.sql(
+			"""
+			SELECT item_code, SUM(actual_qty) FROM `tabBin`
+			WHERE warehouse IN %(warehouses)s AND item_code IN %(item_codes)s
+			GROUP BY item_code
+		""",
+			{"warehouses": tuple(get_reservation_pool(doc)), "item_codes": tuple(item_codes)},
+		)
+	)
+
+	return find_booking_conflicts(rows, occupancy, stock, doc.source_warehouse)
+
+
+def find_booking_conflicts(rows, occupancy, stock, warehouse):
+	"""
+	Conflicts of the requested rows with the ledger rows of other reservations.
+	Quantities are checked against the units `warehouse` owns (`stock`, its whole
+	rental pool), so only bookings from that warehouse count. Rows with a Serial No
+	are only checked for clashes of that serial, wherever it is booked from.
+	"""
+	requested = {}
+	for row in rows:
+		if not row.serial_no:
+			requested[row.item_code] = requested.get(row.item_code, 0) + (flt(row.qty) or 1)
+
+	daily = {}
+	booked_by = {}
+	serial_booked_by = {}
+	for o in occupancy:
+		if o.serial_no:
+			serial_booked_by.setdefault(o.serial_no, set()).add(o.reservation)
+		if o.warehouse != warehouse:
+			continue
+
+		key = (o.item_code, o.occupancy_date)
+		daily[key] = daily.get(key, 0) + flt(o.qty)
+		booked_by.setdefault(o.item_code, set()).add(o.reservation)
+
+	conflicts = []
+	for item_code in sorted(requested):
+		peak = max((qty for (code, day), qty in daily.items() if code == item_code), default=0)
+		if peak + requested[item_code] > flt(stock.get(item_code)):
+			conflicts.append((item_code, None, sorted(booked_by.get(item_code, []))))
+
+	for row in rows:
+		if row.serial_no and row.serial_no in serial_booked_by:
+			conflicts.append((row.item_code, row.serial_no, sorted(serial_booked_by[row.serial_no])))
+
+	return conflicts
+
+
+def validate_no_overbooking(doc):
+	conflicts = get_booking_conflicts(doc)
+	if not conflicts:
+		return
+
+	lines = []
+	for item_code, serial_no, reservations in conflicts:
+		label = f"{item_code} ({serial_no})" if serial_no else item_code
+		booked = ", ".join(reservations) or _("no stock in {0}").format(doc.source_warehouse)
+		lines.append(f"<li><b>{label}</b>: {booked}</li>")
+
+	frappe.throw(
+		_("These items are already booked between {0} and {1}:").format(
+			doc.reservation_from, doc.reservation_to
+		)
+		+ f"<ul>{''.join(lines)}</ul>",
+		title=_("Reservation Conflict"),
+		exc=OverbookingError,
+	)
+
+
+# -------------------------------------------------
+# AVAILABILITY CACHE
+# -------------------------------------------------
+
+
+def get_availability_cache_key(item_code):
+	return f"suit_rental:availability:{item_code}"
+
+
+def get_availability_cache_field(row):
+	return f"{row.warehouse}|{row.serial_no or ''}|{row.start_date}|{row.end_date}"
+
+
+def get_cache_member(row):
+	return f"{row.item_code}\x1f{get_availability_cache_field(row)}"
+
+
+def get_cached_availability(row):
+	entry = frappe.cache.hget(get_availability_cache_key(row.item_code), get_availability_cache_field(row))
+
+	if not entry or time.time() - entry["at"] > AVAILABILITY_CACHE_TTL:
+		return None
+
+	return entry["data"]
+
+
+def set_cached_availability(row, data):
+	key = get_availability_cache_key(row.item_code)
+
+	frappe.cache.hset(key, get_availability_cache_field(row), {"at": time.time(), "data": data})
+	frappe.cache.expire(frappe.cache.make_key(key), AVAILABILITY_CACHE_TTL)
+
+
+def touch_cache_entries(rows):
+	"""Mark the windows of the rows as recently read, with one write."""
+	if rows:
+		now = time.time()
+		frappe.cache.zadd(
+			frappe.cache.make_key(AVAILABILITY_CACHE_LRU_KEY), {get_cache_member(row): now for row in rows}
+		)
+
+
+def trim_availability_cache():
+	"""Evict the least recently read windows, over all items, beyond AVAILABILITY_CACHE_MAX_ENTRIES."""
+	lru_key = frappe.cache.make_key(AVAILABILITY_CACHE_LRU_KEY)
+
+	excess = frappe.cache.zcard(lru_key) - AVAILABILITY_CACHE_MAX_ENTRIES
+	if excess <= 0:
+		return
+
+	members = [frappe.safe_decode(m) for m in frappe.cache.zrange(lru_key, 0, excess - 1)]
+
+	windows_by_item = {}
+	for member in members:
+		item_code, field = member.split("\x1f", 1)
+		windows_by_item.setdefault(item_code, []).append(field)
+
+	for item_code, fields in windows_by_item.items():
+		frappe.cache.hdel(get_availability_cache_key(item_code), fields)
+
+	frappe.cache.zrem(lru_key, *members)
+
+
+def invalidate_availability_cache(item_codes):
+	item_codes = [item_code for item_code in set(item_codes or []) if item_code]
+	if item_codes:
+		frappe.cache.delete_value([get_availability_cache_key(item_code) for item_code in item_codes])
+
+
+def invalidate_availability_after_commit(item_codes):
+	"""Drop cached availability of the items once the transaction that changed it is committed."""
+	item_codes = list(item_codes)
+
+	def invalidate():
+		invalidate_availability_cache(item_codes)
+		bump_item_versions(item_codes)
+
+	frappe.db.after_commit.add(invalidate)
+
+
+def record_cache_stats(hits=0, misses=0):
+	if hits:
+		frappe.cache.incrby(frappe.cache.make_key(AVAILABILITY_CACHE_HITS_KEY), hits)
+	if misses:
+		frappe.cache.incrby(frappe.cache.make_key(AVAILABILITY_CACHE_MISSES_KEY), misses)
+
+
+def get_cache_stats():
+	hits = cint(frappe.cache.get(frappe.cache.make_key(AVAILABILITY_CACHE_HITS_KEY)))
+	misses = cint(frappe.cache.get(frappe.cache.make_key(AVAILABILITY_CACHE_MISSES_KEY)))
+	total = hits + misses
+
+	return {
+		"hits": hits,
+		"misses": misses,
+		"hit_ratio": flt(hits / total, 4) if total else 0,
+	}
+
+
+def reset_cache_stats():
+	frappe.cache.delete(
+		frappe.cache.make_key(AVAILABILITY_CACHE_HITS_KEY),
+		frappe.cache.make_key(AVAILABILITY_CACHE_MISSES_KEY),
+	)
+
+
+# -------------------------------------------------
+# AVAILABILITY CALENDAR
+# -------------------------------------------------
+
+
+def get_availability_version(item_codes):
+	"""
+	Version of the availability of some items: the epoch plus a digest of
+	their counters, so bookings of other items leave it unchanged.
+	"""
+	epoch = frappe.cache.get_value(AVAILABILITY_VERSION_KEY)
+	if not epoch:
+		epoch = bump_availability_version()
+
+	item_codes = sorted(set(item_codes))
+	counters = (
+		frappe.cache.hmget(frappe.cache.make_key(AVAILABILITY_ITEM_VERSIONS_KEY), item_codes)
+		if item_codes
+		else []
+	)
+	digest = hashlib.sha256(
+		"\x1f".join(
+			f"{item_code}={cint(counter)}" for item_code, counter in zip(item_codes, counters, strict=True)
+		).encode()
+	).hexdigest()
+
+	return f"{epoch}-{digest[:12]}"
+
+
+def bump_item_versions(item_codes):
+	versions_key = frappe.cache.make_key(AVAILABILITY_ITEM_VERSIONS_KEY)
+	for item_code in {item_code for item_code in item_codes if item_code}:
+		frappe.cache.hincrby(versions_key, item_code, 1)
+
+
+def bump_availability_version():
+	"""Start a new epoch: every item's availability version changes."""
+	version = frappe.generate_hash(length=12)
+	frappe.cache.set_value(AVAILABILITY_VERSION_KEY, version)
+	return version
+
+
+def get_calendar_item_codes(items=None, item_group=None):
+	"""Rental items requested explicitly or every rental item under an Item Group."""
+	if items:
+		return sorted(set(items))
+
+	if not item_group:
+		frappe.throw(_("Select Items or an Item Group"))
+
+	lft, rgt = frappe.db.get_value("Item Group", item_group, ["lft", "rgt"])
+	return frappe.db.sql_list(
+		"""
+		SELECT i.name
+		FROM `tabItem` i
+		JOIN `tabItem Group` ig ON ig.name = i.item_group
+		WHERE ig.lft >= %(lft)s AND ig.rgt <= %(rgt)s
+		  AND i.custom_is_rental_item = 1
+		  AND i.disabled = 0
+		ORDER BY i.name
+	""",
+		{"lft": lft, "rgt": rgt},
+	)
+
+
+def get_availability_matrix(item_codes, warehouse, from_date, to_date):
+	"""
+	Free quantity of every item on every day of [from_date, to_date]: the units the
+	warehouse owns (see get_owned_qty_map) less those booked that day.
+	One Bin query and one grouped occupancy query; the matrix is filled in memory.
+	"""
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	if to_date < from_date:
+		frappe.throw(_("To Date cannot be before From Date"))
+
+	days = date_diff(to_date, from_date) + 1
+	if days > MAX_CALENDAR_DAYS:
+		frappe.throw(_("Date range cannot be longer than {0} days").format(MAX_CALENDAR_DAYS))
+
+	dates = [add_days(from_date, i) for i in range(days)]
+
+	rows = [frappe._dict(item_code=item_code, warehouse=warehouse) for item_code in item_codes]
+	stock_map = get_owned_qty_map(rows, get_rental_pool_warehouses([warehouse]))
+	daily_booked = get_daily_booked_qty(item_codes, [warehouse], from_date, to_date)
+
+	stock = [stock_map.get((item_code, warehouse), 0.0) for item_code in item_codes]
+	matrix = []
+	for item_code, item_stock in zip(item_codes, stock, strict=True):
+		booked = daily_booked.get((item_code, warehouse), {})
+		matrix.append([item_stock - booked.get(day, 0) for day in dates])
+
+	return {
+		"items": list(item_codes),
+		"dates": [str(day) for day in dates],
+		"stock": stock,
+		"matrix": matrix,
+	}
+
+
+def get_warehouse_rental_items(warehouse):
+	"""Every enabled rental item with a Bin in the warehouse's rental pool."""
+	return frappe.db.sql_list(
+		"""
+		SELECT DISTINCT b.item_code
+		FROM `tabBin` b
+		JOIN `tabItem` i ON i.name = b.item_code
+		WHERE b.warehouse IN %(warehouses)s
+		  AND i.custom_is_rental_item = 1
+		  AND i.disabled = 0
+		ORDER BY b.item_code
+	""",
+		{"warehouses": tuple(get_rental_pool_warehouses([warehouse])[warehouse])},
+	)
+
+
+def get_daily_free_totals(data):
+	"""[(date, free units, units in stock)] of an availability matrix, summed over its items."""
+	total_stock = sum(max(flt(qty), 0) for qty in data["stock"])
+
+	return [
+		(day, sum(max(flt(row[i]), 0) for row in data["matrix"]), total_stock)
+		for i, day in enumerate(data["dates"])
+	]
+
+
+# -------------------------------------------------
+# AVAILABLE ITEM SEARCH
+# -------------------------------------------------
+
+
+def find_available_items(
+	warehouse,
+	from_date,
+	to_date,
+	item_group=None,
+	brand=None,
+	size=None,
+	txt=None,
+	after=None,
+	page_length=20,
+):
+	"""
+	Rental items with free stock in a warehouse for a whole window, one query.
+	Stock is what the warehouse owns over its rental pool (see get_owned_qty_map).
+	Booked quantity is the per-day peak from the occupancy ledger, left-joined so
+	items with no bookings at all come straight from the Bin (the anti-join case).
+	Results are keyset-paginated on item code: pass the last code back as `after`.
+	"""
+	page_length = min(cint(page_length) or 20, 100)
+	params = {
+		"warehouse": warehouse,
+		"pool": tuple(get_rental_pool_warehouses([warehouse])[warehouse]),
+		"from_date": getdate(from_date),
+		"to_date": getdate(to_date),
+		"limit": page_length + 1,
+	}
+	conditions = []
+
+	if item_group:
+		params["lft"], params["rgt"] = frappe.db.get_value("Item Group", item_group, ["lft", "rgt"])
+		conditions.append(
+			"""i.item_group IN (
+				SELECT name FROM `tabItem Group` WHERE lft >= %(lft)s AND rgt <= %(rgt)s
+			)"""
+		)
+	if brand:
+		params["brand"] = brand
+		conditions.append("i.brand = %(brand)s")
+	if size:
+		params["size"] = size
+		conditions.append(
+			"""EXISTS (
+				SELECT 1 FROM `tabItem Variant Attribute` iva
+				WHERE iva.parent = i.name AND iva.attribute = 'Size' AND iva.attribute_value = %(size)s
+			)"""
+		)
+	if txt:
+		params["txt"] = f"%{txt}%"
+		conditions.append("(i.name LIKE %(txt)s OR i.item_name LIKE %(txt)s)")
+	if after:
+		params["after"] = after
+		conditions.append("i.name > %(after)s")
+
+	condition_str = "".join(f" AND {c}" for c in conditions)
+
+	items = frappe.db.sql(
+		f"""
+		SELECT
+			i.name AS item_code,
+			i.item_name,
+			i.image,
+			i.item_group,
+			i.brand,
+			i.custom_rental_price AS rate,
+			b.owned_qty - COALESCE(occ.peak_qty, 0) AS free_qty
+		FROM `tabItem` i
+		JOIN (
+			SELECT item_code, SUM(actual_qty) AS owned_qty
+			FROM `tabBin`
+			WHERE warehouse IN %(pool)s
+			GROUP BY item_code
+		) b ON b.item_code = i.name
+		LEFT JOIN (
+			SELECT daily.item_code, MAX(daily.qty) AS peak_qty
+			FROM (
+				SELECT item_code, occupancy_date, SUM(qty) AS qty
+				FROM `tabReservation Occupancy`
+				WHERE occupancy_date BETWEEN %(from_date)s AND %(to_date)s
+				  AND warehouse = %(warehouse)s
+				GROUP BY item_code, occupancy_date
+			) daily
+			GROUP BY daily.item_code
+		) occ ON occ.item_code = i.name
+		WHERE i.custom_is_rental_item = 1
+		  AND i.disabled = 0
+		  AND b.owned_qty - COALESCE(occ.peak_qty, 0) > 0
+		  {condition_str}
+		ORDER BY i.name
+		LIMIT %(limit)s
+	""",
+		params,
+		as_dict=True,
+	)
+
+	has_more = len(items) > page_length
+	items = items[:page_length]
+
+	return {
+		"items": items,
+		"next_after": items[-1].item_code if has_more else None,
+	}
+
+
+# -------------------------------------------------
+# SERIAL NO ASSIGNMENT
+# -------------------------------------------------
+
+
+def get_serial_fit(serial_nos, start_date, end_date):
+	"""
+	Return {serial_no: {"prev_day", "next_day", "clashes"}} for every serial,
+	i.e. the last booked day before the window, the first booked day after it
+	and how many booked days fall inside it. One grouped ledger query.
+	"""
+	if not serial_nos:
+		return {}
+
+	fits = frappe.db.sql(
+		"""
+		SELECT
+			serial_no,
+			MAX(CASE WHEN occupancy_date < %(start_date)s THEN occupancy_date END) AS prev_day,
+			MIN(CASE WHEN occupancy_date > %(end_date)s THEN occupancy_date END) AS next_day,
+			SUM(CASE WHEN occupancy_date BETWEEN %(start_date)s AND %(end_date)s THEN 1 ELSE 0 END) AS clashes
+		FROM `tabReservation Occupancy`
+		WHERE serial_no IN %(serial_nos)s
+		GROUP BY serial_no
+	""",
+		{"serial_nos": tuple(serial_nos), "start_date": start_date, "end_date": end_date},
+		as_dict=True,
+	)
+
+	return {f.serial_no: f for f in fits}
+
+
+def pick_best_fit_serial(candidates, fit_map, start_date, end_date):
+	"""
+	Best-fit choice: among the serials free for [start_date, end_date], take the one
+	whose neighbouring bookings leave the smallest idle gap around the window.
+	Serials with no bookings at all are used last so the fleet stays tightly packed.
+	"""
+	best = None
+	best_score = None
+
+	for serial_no in candidates:
+		fit = fit_map.get(serial_no) or {}
+
+		if fit.get("clashes"):
+			continue
+
+		prev_day = fit.get("prev_day")
+		next_day = fit.get("next_day")
+
+		gap_before = date_diff(start_date, prev_day) if prev_day else None
+		gap_after = date_diff(next_day, end_date) if next_day else None
+		gaps = [g for g in (gap_before, gap_after) if g is not None]
+
+		# (number of open sides, total idle days, name) -> smaller is tighter
+		score = (2 - len(gaps), sum(gaps), serial_no)
+
+		if best_score is None or score < best_score:
+			best, best_score = serial_no, score
+
+	return best
+
+
+def assign_serial_nos(doc):
+	"""
+	Fill serial_no on every serialized Reservation Item that has none,
+	picking a serial of the branch that is free for the window with a best-fit
+	search. Serials out on an earlier rental are candidates too.
+	"""
+	rows = [row for row in doc.reservation_items if row.has_serial_no and not row.serial_no]
+	if not rows or not doc.source_warehouse or not doc.reservation_from or not doc.reservation_to:
+		return
+
+	start_date = getdate(doc.reservation_from)
+	end_date = getdate(doc.reservation_to)
+	taken = {row.serial_no for row in doc.reservation_items if row.serial_no}
+
+	pool = get_reservation_pool(doc)
+
+	candidates_by_item = {}
+	for serial in frappe.get_all(
+		"Serial No",
+		filters={
+			"item_code": ["in", list({row.item_code for row in rows})],
+			"warehouse": ["in", list(pool)],
+			"status": "Active",
+		},
+		fields=["name", "item_code", "batch_no"],
+		order_by="name",
+	):
+		if serial.name not in taken:
+			candidates_by_item.setdefault(serial.item_code, []).append(serial)
+
+	all_candidates = [s.name for serials in candidates_by_item.values() for s in serials]
+	fit_map = get_serial_fit(all_candidates, start_date, end_date)
+
+	for row in rows:
+		serials = candidates_by_item.get(row.item_code, [])
+		serial_no = pick_best_fit_serial(
+			[s.name for s in serials if s.name not in taken], fit_map, start_date, end_date
+		)
+
+		if not serial_no:
+			frappe.throw(
+				_("No free Serial No for item {0} in row {1} between {2} and {3}").format(
+					row.item_code, row.idx, start_date, end_date
+				)
+			)
+
+		taken.add(serial_no)
+		row.serial_no = serial_no
+
+		if row.has_batch_no and not row.batch_no:
+			row.batch_no = next(s.batch_no for s in serials if s.name == serial_no)
+
+
+# -------------------------------------------------
+# OCCUPANCY LEDGER
+# -------------------------------------------------
+
+
+def get_occupancy_days(reservation_from, reservation_to, delivered_on=None, overdue_until=None):
+	"""
+	Every calendar day a reservation keeps its items, delivery included.
+	Items still out after reservation_to stay booked through overdue_until.
+	"""
+	if not reservation_from or not reservation_to:
+		return []
+
+	first_day = getdate(reservation_from)
+	last_day = getdate(reservation_to)
+
+	if delivered_on and getdate(delivered_on) < first_day:
+		first_day = getdate(delivered_on)
+	if overdue_until and getdate(overdue_until) > last_day:
+		last_day = getdate(overdue_until)
+
+	return [add_days(first_day, i) for i in range(date_diff(last_day, first_day) + 1)]
+
+
+def make_occupancy_values(reservation, items):
+	"""Build bulk insert tuples (see OCCUPANCY_FIELDS) for one reservation."""
+	days = get_occupancy_days(
+		reservation.reservation_from,
+		reservation.reservation_to,
+		reservation.actual_delivery_date,
+		# Delivered items are out until they are returned, however late
+		overdue_until=nowdate() if reservation.reservation_status == "Delivered" else None,
+	)
+	now = now_datetime()
+	user = frappe.session.user
+
+	values = []
+	for item in items:
+		if not item.item_code:
+			continue
+
+		for day in days:
+			values.append(
+				(
+					frappe.generate_hash(length=10),
+					now,
+					now,
+					user,
+					user,
+					reservation.name,
+					item.name,
+					reservation.branch,
+					reservation.reservation_status,
+					item.item_code,
+					item.serial_no or None,
+					item.batch_no or None,
+					reservation.source_warehouse,
+					day,
+					flt(item.qty) or 1,
+				)
+			)
+
+	return values
+
+
+def sync_reservation_occupancy(doc):
+	"""
+	Rewrite the occupancy ledger rows of a single reservation.
+	Only submitted reservations that are Reserved or Delivered occupy their items.
+	"""
+	frappe.db.delete("Reservation Occupancy", {"reservation": doc.name})
+
+	if doc.docstatus == 1 and doc.reservation_status in OCCUPYING_STATUSES:
+		values = make_occupancy_values(doc, doc.reservation_items)
+		if values:
+			frappe.db.bulk_insert("Reservation Occupancy", OCCUPANCY_FIELDS, values)
+
+	invalidate_availability_after_commit(row.item_code for row in doc.reservation_items)
+
+
+def rebuild_reservation_occupancy(chunk_size=1000):
+	"""
+	Rebuild the whole occupancy ledger from open reservations.
+	Returns the number of ledger rows written.
+	"""
+	frappe.db.delete("Reservation Occupancy")
+
+	reservations = frappe.get_all(
+		"Suit Reservation",
+		filters={"docstatus": 1, "reservation_status": ["in", OCCUPYING_STATUSES]},
+		fields=[
+			"name",
+			"branch",
+			"reservation_status",
+			"reservation_from",
+			"reservation_to",
+			"actual_delivery_date",
+			"source_warehouse",
+		],
+		order_by="name",
+	)
+
+	written = 0
+	for i in range(0, len(reservations), chunk_size):
+		chunk = reservations[i : i + chunk_size]
+
+		items_by_parent = {}
+		for item in frappe.get_all(
+			"Reservation Item",
+			filters={"parenttype": "Suit Reservation", "parent": ["in", [r.name for r in chunk]]},
+			fields=["name", "parent", "item_code", "serial_no", "batch_no", "qty"],
+		):
+			items_by_parent.setdefault(item.parent, []).append(item)
+
+		values = []
+		for reservation in chunk:
+			values.extend(make_occupancy_values(reservation, items_by_parent.get(reservation.name, [])))
+
+		if values:
+			frappe.db.bulk_insert("Reservation Occupancy", OCCUPANCY_FIELDS, values)
+			written += len(values)
+
+	def invalidate():
+		frappe.cache.delete_keys("suit_rental:availability:")
+		frappe.cache.delete(frappe.cache.make_key(AVAILABILITY_CACHE_LRU_KEY))
+		bump_availability_version()
+
+	frappe.db.after_commit.add(invalidate)
+	return written
+
+
+def extend_overdue_occupancy():
+	"""
+	Re-sync the ledger of Delivered reservations past their return date, so
+	their items stay booked through today. Returns how many were extended.
+	"""
+	names = frappe.get_all(
+		"Suit Reservation",
+		filters={"docstatus": 1, "reservation_status": "Delivered", "reservation_to": ["<", nowdate()]},
+		pluck="name",
+	)
+
+	for name in names:
+		sync_reservation_occupancy(frappe.get_doc("Suit Reservation", name))
+
+	return len(names)
+
+
+def on_stock_ledger_change(doc, method=None):
+	"""Stock Ledger Entry hook: stock of a rental item moved, so its cached availability is stale."""
+	if frappe.get_cached_value("Item", doc.item_code, "custom_is_rental_item"):
+		invalidate_availability_after_commit([doc.item_code])
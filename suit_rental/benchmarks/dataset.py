@@ -0,0 +1,443 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+"""
+Synthetic rental dataset for benchmarks.
+
+Masters (branches, warehouses, items, customers) go through the ORM because
+there are few of them. Serial Nos, Bins and the reservation history are bulk
+inserted straight into their tables so hundreds of thousands of reservations
+can be generated in minutes. Every generated record is prefixed with PREFIX
+so the dataset can be removed again with clear_dataset().
+"""
+
+import random
+from collections import defaultdict
+
+import frappe
+from frappe.utils import add_days, add_to_date, getdate, now_datetime, nowdate
+
+from suit_rental.availability import (
+	OCCUPANCY_FIELDS,
+	OCCUPYING_STATUSES,
+	invalidate_availability_after_commit,
+	make_occupancy_values,
+)
+from suit_rental.summary import apply_summary_rows, clear_totals_cache, get_contribution
+
+PREFIX = "BENCH"
+
+# Share of past reservations per final status
+PAST_STATUS_MIX = (("Returned", 0.88), ("Cancelled", 0.07), ("Delivered", 0.05))
+
+TXN_ITEM = f"{PREFIX}-TXN-ITEM"
+
+
+def get_company():
+	company = frappe.defaults.get_global_default("company") or frappe.db.get_value("Company", {}, "name")
+	if not company:
+		frappe.throw("Benchmarks need at least one Company on the site")
+	return frappe.get_cached_doc("Company", company)
+
+
+def make_warehouse(company, name):
+	warehouse = frappe.db.get_value("Warehouse", {"warehouse_name": name, "company": company.name})
+	if warehouse:
+		return warehouse
+
+	return (
+		frappe.get_doc({"doctype": "Warehouse", "warehouse_name": name, "company": company.name})
+		.insert(ignore_permissions=True)
+		.name
+	)
+
+
+def make_branches(company, count):
+	branches = []
+
+	for i in range(1, count + 1):
+		name = f"{PREFIX}-Branch-{i:02d}"
+		source = make_warehouse(company, f"{name} Store")
+		customer_stock = make_warehouse(company, f"{name} Customer Stock")
+
+		if not frappe.db.exists("Branch", name):
+			frappe.get_doc(
+				{
+					"doctype": "Branch",
+					"branch": name,
+					"custom_company": company.name,
+					"custom_default_warehouse": source,
+					"custom_customer_stock_warehouse": customer_stock,
+					"custom_post_income_as": "Journal Entry",
+					"custom_journal_entry_status": "Submit",
+					"custom_sales_invoice_status": "Submit",
+					"custom_income_account": company.default_income_account,
+					"custom_receivable_account": company.default_receivable_account,
+				}
+			).insert(ignore_permissions=True)
+
+		if not frappe.db.exists("Suit Return Status", f"{name}-GOOD"):
+			frappe.get_doc(
+				{
+					"doctype": "Suit Return Status",
+					"status_name": "Good",
+					"status_code": f"{name}-GOOD",
+					"type": "Good",
+					"branch": name,
+					"company": company.name,
+					"active": 1,
+				}
+			).insert(ignore_permissions=True)
+
+		branches.append(frappe._dict(name=name, source=source, customer_stock=customer_stock))
+
+	return branches
+
+
+def make_items(count):
+	item_codes = []
+
+	for i in range(1, count + 1):
+		item_code = f"{PREFIX}-SUIT-{i:05d}"
+		if not frappe.db.exists("Item", item_code):
+			frappe.get_doc(
+				{
+					"doctype": "Item",
+					"item_code": item_code,
+					"item_name": item_code,
+					"item_group": "All Item Groups",
+					"stock_uom": "Nos",
+					"is_stock_item": 1,
+					"has_serial_no": 1,
+					"custom_is_rental_item": 1,
+					"custom_rental_price": random.choice((150, 200, 250, 300, 400)),
+				}
+			).insert(ignore_permissions=True)
+		item_codes.append(item_code)
+
+	return item_codes
+
+
+def make_customers(count):
+	customers = []
+
+	for i in range(1, count + 1):
+		name = f"{PREFIX}-Customer-{i:04d}"
+		if not frappe.db.exists("Customer", name):
+			frappe.get_doc(
+				{"doctype": "Customer", "customer_name": name, "customer_type": "Individual"}
+			).insert(ignore_permissions=True)
+		customers.append(name)
+
+	return customers
+
+
+def make_serials_and_bins(item_codes, branches, serials_per_item):
+	"""One serial per unit, spread over the branch stores, plus the matching Bins."""
+	now = now_datetime()
+	user = frappe.session.user
+	serials = []
+	bins = {}
+
+	for i, item_code in enumerate(item_codes):
+		for n in range(1, serials_per_item + 1):
+			branch = branches[(i + n) % len(branches)]
+			serials.append((f"{item_code}-{n:02d}", now, now, user, user, item_code, branch.source, "Active"))
+			bins[(item_code, branch.source)] = bins.get((item_code, branch.source), 0) + 1
+
+	frappe.db.bulk_insert(
+		"Serial No",
+		("name", "creation", "modified", "owner", "modified_by", "item_code", "warehouse", "status"),
+		serials,
+		ignore_duplicates=True,
+	)
+	frappe.db.bulk_insert(
+		"Bin",
+		("name", "creation", "modified", "owner", "modified_by", "item_code", "warehouse", "actual_qty"),
+		[
+			(frappe.generate_hash(length=10), now, now, user, user, item_code, warehouse, qty)
+			for (item_code, warehouse), qty in bins.items()
+		],
+		ignore_duplicates=True,
+	)
+
+	return serials
+
+
+def pick_status(reservation_from, reservation_to, today):
+	if reservation_from > today:
+		return "Reserved", 1
+	if reservation_to >= today:
+		return random.choice(("Reserved", "Delivered")), 1
+
+	roll = random.random()
+	for status, share in PAST_STATUS_MIX:
+		if roll < share:
+			return status, 2 if status == "Cancelled" else 1
+		roll -= share
+
+	return "Returned", 1
+
+
+def sync_generated_reservations(reservation_fields, reservations, item_fields, items, summary_keys):
+	"""
+	Write the occupancy ledger and summary rows of a chunk of generated
+	reservations only, leaving the rest of the site's data alone.
+	Returns the number of ledger rows written.
+	"""
+	items_by_parent = defaultdict(list)
+	for values in items:
+		item = frappe._dict(zip(item_fields, values, strict=True))
+		items_by_parent[item.parent].append(item)
+
+	occupancy = []
+	summary = defaultdict(lambda: defaultdict(float))
+	for values in reservations:
+		reservation = frappe._dict(zip(reservation_fields, values, strict=True))
+
+		if reservation.docstatus == 1 and reservation.reservation_status in OCCUPYING_STATUSES:
+			occupancy.extend(make_occupancy_values(reservation, items_by_parent[reservation.name]))
+
+		for key, row in get_contribution(reservation).items():
+			for field, value in row.items():
+				summary[key][field] += value
+
+	if occupancy:
+		frappe.db.bulk_insert("Reservation Occupancy", OCCUPANCY_FIELDS, occupancy)
+	apply_summary_rows(summary)
+	summary_keys.update(summary)
+
+	return len(occupancy)
+
+
+def make_reservations(count, years, branches, serials, customers, company, chunk_size=5000):
+	"""
+	Bulk insert `count` submitted reservations spread over the last `years`
+	years, with their ledger and summary rows. Returns the number of ledger
+	and summary rows written.
+	"""
+	today = getdate(nowdate())
+	first_day = add_days(today, -365 * years)
+	span = (today - first_day).days + 60
+	user = frappe.session.user
+
+	reservation_fields = (
+		"name",
+		"creation",
+		"modified",
+		"owner",
+		"modified_by",
+		"docstatus",
+		"naming_series",
+		"customer",
+		"customer_name",
+		"branch",
+		"company",
+		"currency",
+		"source_warehouse",
+		"customer_stock_warehouse",
+		"sales_person",
+		"reservation_date",
+		"event_date",
+		"reservation_from",
+		"reservation_to",
+		"reservation_status",
+		"total_estimated_rent",
+		"deposit_amount",
+		"paid_amount",
+		"outstanding_amount",
+		"actual_delivery_date",
+		"actual_return_date",
+	)
+	item_fields = (
+		"name",
+		"creation",
+		"modified",
+		"owner",
+		"modified_by",
+		"docstatus",
+		"parent",
+		"parenttype",
+		"parentfield",
+		"idx",
+		"item_code",
+		"item_name",
+		"qty",
+		"rate",
+		"uom",
+		"has_serial_no",
+		"serial_no",
+		"is_delivered",
+		"is_returned",
+	)
+
+	occupancy_rows, summary_keys = 0, set()
+	reservations, items = [], []
+	for i in range(1, count + 1):
+		branch = random.choice(branches)
+		event_date = add_days(first_day, random.randrange(span))
+		reservation_from = add_days(event_date, -1)
+		reservation_to = add_days(event_date, 1)
+		booked_on = add_to_date(reservation_from, days=-random.randint(3, 60), as_datetime=True)
+		status, docstatus = pick_status(reservation_from, reservation_to, today)
+
+		pieces = random.sample(serials, random.choice((1, 1, 2, 3, 6)))
+		rent = sum(random.choice((150, 200, 250, 300)) for _ in pieces)
+		deposit = round(rent * 0.3)
+		delivered = status in ("Delivered", "Returned")
+
+		name = f"{PREFIX}-SR-{i:07d}"
+		customer = random.choice(customers)
+		reservations.append(
+			(
+				name,
+				booked_on,
+				booked_on,
+				user,
+				user,
+				docstatus,
+				"SR-.YYYY.-.MM.-",
+				customer,
+				customer,
+				branch.name,
+				company.name,
+				company.default_currency,
+				branch.source,
+				branch.customer_stock,
+				user,
+				booked_on,
+				event_date,
+				reservation_from,
+				reservation_to,
+				status,
+				rent,
+				deposit,
+				rent if delivered else deposit,
+				0 if delivered else rent - deposit,
+				add_to_date(reservation_from, hours=10, as_datetime=True) if delivered else None,
+				add_to_date(reservation_to, hours=18, as_datetime=True) if status == "Returned" else None,
+			)
+		)
+
+		for idx, serial in enumerate(pieces, start=1):
+			items.append(
+				(
+					frappe.generate_hash(length=10),
+					booked_on,
+					booked_on,
+					user,
+					user,
+					docstatus,
+					name,
+					"Suit Reservation",
+					"reservation_items",
+					idx,
+					serial[5],
+					serial[5],
+					1,
+					rent / len(pieces),
+					"Nos",
+					1,
+					serial[0],
+					int(delivered),
+					int(status == "Returned"),
+				)
+			)
+
+		if len(reservations) >= chunk_size:
+			frappe.db.bulk_insert("Suit Reservation", reservation_fields, reservations)
+			frappe.db.bulk_insert("Reservation Item", item_fields, items)
+			occupancy_rows += sync_generated_reservations(
+				reservation_fields, reservations, item_fields, items, summary_keys
+			)
+			frappe.db.commit()
+			reservations, items = [], []
+
+	if reservations:
+		frappe.db.bulk_insert("Suit Reservation", reservation_fields, reservations)
+		frappe.db.bulk_insert("Reservation Item", item_fields, items)
+		occupancy_rows += sync_generated_reservations(
+			reservation_fields, reservations, item_fields, items, summary_keys
+		)
+
+	return occupancy_rows, len(summary_keys)
+
+
+def make_transaction_stock(company, branches, qty=500):
+	"""A non-serialized item with real stock in every store, used to time deliver / return."""
+	if not frappe.db.exists("Item", TXN_ITEM):
+		frappe.get_doc(
+			{
+				"doctype": "Item",
+				"item_code": TXN_ITEM,
+				"item_name": TXN_ITEM,
+				"item_group": "All Item Groups",
+				"stock_uom": "Nos",
+				"is_stock_item": 1,
+				"custom_is_rental_item": 1,
+				"custom_rental_price": 200,
+				"valuation_rate": 100,
+			}
+		).insert(ignore_permissions=True)
+
+	se = frappe.new_doc("Stock Entry")
+	se.stock_entry_type = "Material Receipt"
+	se.company = company.name
+	for branch in branches:
+		se.append(
+			"items", {"item_code": TXN_ITEM, "qty": qty, "t_warehouse": branch.source, "basic_rate": 100}
+		)
+	se.insert(ignore_permissions=True)
+	se.submit()
+
+
+def generate_dataset(
+	branches=5, items=2000, serials_per_item=3, reservations=200000, years=3, customers=2000
+):
+	"""Create the whole synthetic dataset and return a summary of what was generated."""
+	random.seed(42)
+	frappe.flags.in_import = True
+
+	company = get_company()
+	branch_rows = make_branches(company, branches)
+	item_codes = make_items(items)
+	customer_names = make_customers(customers)
+	serials = make_serials_and_bins(item_codes, branch_rows, serials_per_item)
+	frappe.db.commit()
+
+	occupancy_rows, summary_rows = make_reservations(
+		reservations, years, branch_rows, serials, customer_names, company
+	)
+	make_transaction_stock(company, branch_rows)
+	invalidate_availability_after_commit(item_codes)
+	frappe.db.after_commit.add(clear_totals_cache)
+	frappe.db.commit()
+
+	frappe.flags.in_import = False
+
+	return {
+		"company": company.name,
+		"branches": branches,
+		"items": items,
+		"serial_nos": len(serials),
+		"reservations": reservations,
+		"years": years,
+		"customers": customers,
+		"occupancy_rows": occupancy_rows,
+		"summary_rows": summary_rows,
+	}
+
+
+def clear_dataset():
+	"""Remove everything generate_dataset created that is not a submitted voucher."""
+	like = f"{PREFIX}-%"
+
+	frappe.db.sql("DELETE FROM `tabSuit Return Status` WHERE branch LIKE %s", like)
+	frappe.db.sql("DELETE FROM `tabReservation Occupancy` WHERE reservation LIKE %s", like)
+	frappe.db.sql("DELETE FROM `tabBranch Daily Summary` WHERE branch LIKE %s", like)
+	frappe.db.sql("DELETE FROM `tabReservation Item` WHERE parent LIKE %s", like)
+	frappe.db.sql("DELETE FROM `tabSuit Reservation` WHERE name LIKE %s", like)
+	frappe.db.sql("DELETE FROM `tabSerial No` WHERE item_code LIKE %s", like)
+	frappe.db.sql("DELETE FROM `tabBin` WHERE item_code LIKE %s AND item_code != %s", (like, TXN_ITEM))
+	frappe.db.commit()
+	clear_totals_cache()
@@ -0,0 +1,234 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+"""
+Times the app's hot paths against whatever data is on the site
+(normally the synthetic dataset from suit_rental.benchmarks.dataset).
+
+Write operations (submit, cancel, deliver, return) run inside a savepoint
+that is rolled back after every run, so the dataset stays the same between
+runs and between releases.
+"""
+
+import json
+import platform
+import random
+import statistics
+import time
+
+import frappe
+from frappe.utils import add_days, getdate, now_datetime, nowdate
+
+from suit_rental.benchmarks.dataset import PREFIX, TXN_ITEM
+
+REPORTS = {
+	"Active Reservations": "suit_rental.suit_rental.report.active_reservations.active_reservations",
+	"Deliveries Pending": "suit_rental.suit_rental.report.deliveries_pending.deliveries_pending",
+	"Returns Pending": "suit_rental.suit_rental.report.returns_pending.returns_pending",
+	"Suit Reservation Statistics": "suit_rental.suit_rental.report.suit_reservation_statistics.suit_reservation_statistics",
+	"Totals from Suit Reservation": "suit_rental.suit_rental.report.totals_from_suit_reservation.totals_from_suit_reservation",
+}
+
+
+def timed(fn, runs, rollback=False):
+	"""Run fn `runs` times and return timing statistics in milliseconds."""
+	samples = []
+
+	for _ in range(runs):
+		if rollback:
+			frappe.db.savepoint("suit_rental_benchmark")
+
+		start = time.perf_counter()
+		try:
+			fn()
+		finally:
+			samples.append((time.perf_counter() - start) * 1000)
+			if rollback:
+				frappe.db.rollback(save_point="suit_rental_benchmark")
+
+	samples.sort()
+	return {
+		"runs": runs,
+		"min_ms": round(samples[0], 3),
+		"median_ms": round(statistics.median(samples), 3),
+		"p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+		"mean_ms": round(statistics.fmean(samples), 3),
+	}
+
+
+def get_fixtures():
+	branches = frappe.get_all(
+		"Branch",
+		filters={"name": ["like", f"{PREFIX}-%"]},
+		fields=["name", "custom_default_warehouse as warehouse", "custom_company as company"],
+	)
+	if not branches:
+		frappe.throw("No benchmark data found, run `bench suit-rental-benchmark --generate` first")
+
+	item_codes = frappe.get_all(
+		"Item", filters={"name": ["like", f"{PREFIX}-SUIT-%"]}, pluck="name", limit=500
+	)
+	customer = frappe.db.get_value("Customer", {"name": ["like", f"{PREFIX}-%"]})
+
+	return frappe._dict(branches=branches, item_codes=item_codes, customer=customer)
+
+
+def random_window():
+	start = add_days(nowdate(), random.randint(-30, 60))
+	return start, add_days(start, 2)
+
+
+def make_reservation(fixtures):
+	"""A draft reservation for the transactional item, ready to submit."""
+	branch = random.choice(fixtures.branches)
+	start = add_days(nowdate(), 3)
+
+	doc = frappe.get_doc(
+		{
+			"doctype": "Suit Reservation",
+			"customer": fixtures.customer,
+			"branch": branch.name,
+			"reservation_date": now_datetime(),
+			"event_date": add_days(start, 1),
+			"reservation_from": start,
+			"reservation_to": add_days(start, 2),
+			"sales_person": frappe.session.user,
+			"reservation_items": [{"item_code": TXN_ITEM, "qty": 1, "rate": 200}],
+		}
+	)
+	return doc.insert(ignore_permissions=True)
+
+
+def bench_check_availability(fixtures, runs):
+	from suit_rental.api import check_availability
+
+	def run():
+		branch = random.choice(fixtures.branches)
+		start, end = random_window()
+		check_availability(random.choice(fixtures.item_codes), branch.name, branch.warehouse, start, end)
+
+	return timed(run, runs)
+
+
+def bench_check_availability_bulk(fixtures, runs):
+	from suit_rental.api import check_availability_bulk
+
+	def run():
+		branch = random.choice(fixtures.branches)
+		start, end = random_window()
+		items = [{"item_code": code} for code in random.sample(fixtures.item_codes, 6)]
+		check_availability_bulk(json.dumps(items), branch.warehouse, start, end)
+
+	return timed(run, runs)
+
+
+def bench_reports(fixtures, runs):
+	today = getdate(nowdate())
+	filters = {
+		"branch": fixtures.branches[0].name,
+		"date": today,
+		"from_date": add_days(today, -30),
+		"to_date": today,
+	}
+
+	results = {}
+	for report, module in REPORTS.items():
+		execute = frappe.get_attr(f"{module}.execute")
+		results[f"report:{report}"] = timed(lambda execute=execute: execute(frappe._dict(filters)), runs)
+
+	return results
+
+
+def bench_submit(fixtures, runs):
+	return timed(lambda: make_reservation(fixtures).submit(), runs, rollback=True)
+
+
+def bench_cancel(fixtures, runs):
+	def run():
+		doc = make_reservation(fixtures)
+		doc.submit()
+		doc.cancel()
+
+	return timed(run, runs, rollback=True)
+
+
+def bench_deliver(fixtures, runs):
+	from suit_rental.api import deliver_reservation
+
+	def run():
+		doc = make_reservation(fixtures)
+		doc.submit()
+		deliver_reservation(doc.name, str(now_datetime()), "Cash")
+
+	return timed(run, runs, rollback=True)
+
+
+def bench_return(fixtures, runs):
+	from suit_rental.api import deliver_reservation, return_reservation
+
+	def run():
+		doc = make_reservation(fixtures)
+		doc.submit()
+		deliver_reservation(doc.name, str(now_datetime()), "Cash")
+
+		doc.reload()
+		good = f"{doc.branch}-GOOD"
+		for row in doc.reservation_items:
+			row.return_status = good
+			row.return_type = "Good"
+		doc.save(ignore_permissions=True)
+
+		return_reservation(doc.name, str(frappe.utils.add_to_date(now_datetime(), hours=1)))
+
+	return timed(run, runs, rollback=True)
+
+
+def run_benchmarks(runs=20, write_runs=5):
+	"""Run every benchmark and return the results as a JSON-serializable dict."""
+	random.seed(7)
+	frappe.flags.mute_messages = True
+	# Deliver / return must stay inside the rolled back savepoint
+	frappe.flags.suit_rental_no_step_commit = True
+	fixtures = get_fixtures()
+
+	results = {
+		"check_availability": bench_check_availability(fixtures, runs),
+		"check_availability_bulk": bench_check_availability_bulk(fixtures, runs),
+	}
+	results.update(bench_reports(fixtures, runs))
+	results["reservation_submit"] = bench_submit(fixtures, write_runs)
+	results["reservation_cancel"] = bench_cancel(fixtures, write_runs)
+	results["deliver_reservation"] = bench_deliver(fixtures, write_runs)
+	results["return_reservation"] = bench_return(fixtures, write_runs)
+
+	frappe.flags.mute_messages = False
+	frappe.flags.suit_rental_no_step_commit = False
+
+	return {
+		"meta": {
+			"site": frappe.local.site,
+			"app_version": frappe.get_attr("suit_rental.__version__"),
+			"frappe_version": frappe.__version__,
+			"python": platform.python_version(),
+			"timestamp": str(now_datetime()),
+			"reservations": frappe.db.count("Suit Reservation"),
+			"occupancy_rows": frappe.db.count("Reservation Occupancy"),
+		},
+		"results": results,
+	}
+
+
+def compare_results(current, baseline, threshold=0.2):
+	"""Return [(name, baseline_ms, current_ms, change)] for medians that regressed more than threshold."""
+	regressions = []
+
+	for name, result in current["results"].items():
+		before = baseline.get("results", {}).get(name)
+		if not before or not before["median_ms"]:
+			continue
+
+		change = (result["median_ms"] - before["median_ms"]) / before["median_ms"]
+		if change > threshold:
+			regressions.append((name, before["median_ms"], result["median_ms"], change))
+
+	return regressions
@@ -0,0 +1,142 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+import click
+from frappe.commands import get_site, pass_context
+
+
+def connect(context):
+	import frappe
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+
+
+@click.command("rebuild-reservation-occupancy")
+@pass_context
+def rebuild_reservation_occupancy(context):
+	"""Rebuild the Reservation Occupancy ledger from open Suit Reservations."""
+	import frappe
+
+	from suit_rental.availability import rebuild_reservation_occupancy as rebuild
+
+	connect(context)
+	try:
+		written = rebuild()
+		frappe.db.commit()
+		click.echo(f"Reservation Occupancy rebuilt: {written} rows")
+	finally:
+		frappe.destroy()
+
+
+@click.command("rebuild-branch-daily-summary")
+@pass_context
+def rebuild_branch_daily_summary(context):
+	"""Rebuild the Branch Daily Summary from the submitted Suit Reservations."""
+	import frappe
+
+	from suit_rental.summary import rebuild_branch_summary
+
+	connect(context)
+	try:
+		written = rebuild_branch_summary()
+		frappe.db.commit()
+		click.echo(f"Branch Daily Summary rebuilt: {written} rows")
+	finally:
+		frappe.destroy()
+
+
+@click.command("explain-suit-rental-queries")
+@pass_context
+def explain_suit_rental_queries(context):
+	"""Verify the Suit Rental indexes and print EXPLAIN plans for the hot queries."""
+	import frappe
+
+	from suit_rental.setup.indexes import print_hot_query_plans, verify_indexes
+
+	connect(context)
+	try:
+		for doctype, index_name, expected, found in verify_indexes():
+			click.echo(f"Index {index_name} on {doctype} is {found or 'missing'}, expected {expected}")
+		print_hot_query_plans()
+	finally:
+		frappe.destroy()
+
+
+@click.command("suit-rental-benchmark")
+@click.option("--generate", is_flag=True, help="Generate the synthetic dataset before running")
+@click.option("--branches", default=5, type=int, help="Branches to generate")
+@click.option("--items", default=2000, type=int, help="Rental items to generate")
+@click.option("--reservations", default=200000, type=int, help="Reservations to generate")
+@click.option("--years", default=3, type=int, help="Years of reservation history to generate")
+@click.option("--runs", default=20, type=int, help="Runs per read benchmark")
+@click.option("--write-runs", default=5, type=int, help="Runs per write benchmark")
+@click.option("--output", help="Write the results as JSON to this file")
+@click.option("--compare", help="Baseline JSON file to compare the results against")
+@click.option("--threshold", default=0.2, type=float, help="Median slowdown that counts as a regression")
+@pass_context
+def suit_rental_benchmark(
+	context, generate, branches, items, reservations, years, runs, write_runs, output, compare, threshold
+):
+	"""Time availability checks, reports and reservation workflows on a synthetic dataset."""
+	import json
+
+	import frappe
+
+	from suit_rental.benchmarks.dataset import generate_dataset
+	from suit_rental.benchmarks.run import compare_results, run_benchmarks
+
+	connect(context)
+	try:
+		if generate:
+			summary = generate_dataset(branches=branches, items=items, reservations=reservations, years=years)
+			click.echo(f"Dataset generated: {json.dumps(summary)}")
+
+		report = run_benchmarks(runs=runs, write_runs=write_runs)
+
+		for name, result in report["results"].items():
+			click.echo(f"{name:45} median {result['median_ms']:>10.2f} ms   p95 {result['p95_ms']:>10.2f} ms")
+
+		if output:
+			with open(output, "w") as f:
+				json.dump(report, f, indent=1, default=str)
+			click.echo(f"Results written to {output}")
+
+		if compare:
+			with open(compare) as f:
+				baseline = json.load(f)
+
+			regressions = compare_results(report, baseline, threshold)
+			for name, before, after, change in regressions:
+				click.echo(f"REGRESSION {name}: {before:.2f} ms -> {after:.2f} ms (+{change:.0%})")
+
+			if regressions:
+				raise SystemExit(1)
+			click.echo("No regressions against baseline")
+	finally:
+		frappe.destroy()
+
+
+@click.command("clear-suit-rental-benchmark-data")
+@pass_context
+def clear_suit_rental_benchmark_data(context):
+	"""Remove the synthetic benchmark reservations, serials and occupancy rows."""
+	import frappe
+
+	from suit_rental.benchmarks.dataset import clear_dataset
+
+	connect(context)
+	try:
+		clear_dataset()
+		click.echo("Benchmark data removed")
+	finally:
+		frappe.destroy()
+
+
+commands = [
+	rebuild_reservation_occupancy,
+	rebuild_branch_daily_summary,
+	explain_suit_rental_queries,
+	suit_rental_benchmark,
+	clear_suit_rental_benchmark_data,
+]
@@ -0,0 +1,390 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+"""
+Daily Consolidated income posting.
+
+Branches set to "Daily Consolidated" do not post a Journal Entry or Sales
+Invoice per delivery and per return penalty. The income is recorded as
+Pending Income Entry rows instead, and the daily scheduler job posts every
+closed day of a branch as one multi-line Journal Entry, or one Sales Invoice
+per customer, then links each reservation to the consolidated voucher.
+"""
+
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, nowdate
+
+from suit_rental.posting import get_posting_profile
+from suit_rental.workflow import get_unfinished_logs
+
+PENDING_DOCTYPE = "Pending Income Entry"
+
+# Voucher type -> (child doctype, Suit Reservation table, link field)
+VOUCHER_LINKS = {
+	"Journal Entry": ("Reservation Journal Entry", "reservation_journal_entry", "journal_entry"),
+	"Sales Invoice": ("Reservation Sales Invoice", "reservation_sales_invoice", "sales_invoice"),
+}
+
+
+def add_pending_income(doc, posting_date, purpose, lines):
+	"""Record income of a reservation for consolidated posting. `lines` is [(income_item, amount)]."""
+	for income_item, amount in lines:
+		if flt(amount) <= 0:
+			continue
+
+		frappe.get_doc(
+			{
+				"doctype": PENDING_DOCTYPE,
+				"posting_date": getdate(posting_date),
+				"branch": doc.branch,
+				"company": doc.company,
+				"status": "Pending",
+				"purpose": purpose,
+				"reservation": doc.name,
+				"customer": doc.customer,
+				"currency": doc.currency,
+				"income_item": income_item,
+				"amount": flt(amount),
+			}
+		).insert(ignore_permissions=True)
+
+
+def cancel_pending_income(reservation):
+	"""
+	Drop the income of a cancelled reservation that is not consolidated yet.
+	Posted entries keep their status and voucher: reverse_consolidated_income
+	reverses their share.
+	"""
+	frappe.db.set_value(
+		PENDING_DOCTYPE,
+		{"reservation": reservation, "status": "Pending"},
+		"status",
+		"Cancelled",
+	)
+
+
+# ----------------------------------------------------
+# Posting
+# ----------------------------------------------------
+
+
+def get_pending_batches(before_date):
+	"""(branch, company, posting_date) groups with pending income, oldest first."""
+	return frappe.db.sql(
+		"""
+		SELECT branch, company, posting_date
+		FROM `tabPending Income Entry`
+		WHERE status = 'Pending' AND posting_date < %(before_date)s
+		GROUP BY branch, company, posting_date
+		ORDER BY posting_date, branch
+		""",
+		{"before_date": before_date},
+		as_dict=True,
+	)
+
+
+def post_pending_income(before_date=None):
+	"""
+	Post every branch day before `before_date` (default today) that still has
+	pending income. Each branch day is committed on its own, so one failing
+	branch does not hold back the others. Returns the number of days posted.
+	"""
+	before_date = getdate(before_date or nowdate())
+	posted = 0
+
+	for batch in get_pending_batches(before_date):
+		try:
+			post_branch_day(batch.branch, batch.company, batch.posting_date)
+			frappe.db.commit()
+			posted += 1
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(
+				title=f"Suit Rental consolidated income failed: {batch.branch} {batch.posting_date}"
+			)
+
+	return posted
+
+
+def post_branch_day(branch, company, posting_date):
+	entries = frappe.get_all(
+		PENDING_DOCTYPE,
+		filters={"branch": branch, "company": company, "posting_date": posting_date, "status": "Pending"},
+		fields=["name", "purpose", "reservation", "customer", "currency", "income_item", "amount"],
+		order_by="creation",
+		for_update=True,
+	)
+
+	# A reservation with an unfinished workflow is only linked once it is resumed
+	unfinished = get_unfinished_logs({entry.reservation for entry in entries})
+	entries = [entry for entry in entries if entry.reservation not in unfinished]
+	if not entries:
+		return
+
+	profile = get_posting_profile(branch)
+
+	if profile.consolidated_voucher_type == "Sales Invoice":
+		by_customer = defaultdict(list)
+		for entry in entries:
+			by_customer[entry.customer].append(entry)
+
+		for customer, rows in by_customer.items():
+			si = make_consolidated_invoice(profile, company, posting_date, customer, rows)
+			mark_posted(rows, "Sales Invoice", si.name, posting_date)
+	else:
+		je = make_consolidated_journal(profile, company, posting_date, entries)
+		mark_posted(entries, "Journal Entry", je.name, posting_date)
+
+
+def make_consolidated_journal(profile, company, posting_date, entries):
+	"""One receivable line per customer against one income line for the whole day."""
+	by_customer = defaultdict(float)
+	for entry in entries:
+		by_customer[entry.customer] += flt(entry.amount)
+
+	total = sum(by_customer.values())
+
+	je = frappe.new_doc("Journal Entry")
+	je.company = company
+	je.posting_date = posting_date
+	je.voucher_type = "Journal Entry"
+	je.user_remark = _("Suit Reservation income of {0} on {1}").format(profile.branch, posting_date)
+
+	for customer, amount in by_customer.items():
+		je.append(
+			"accounts",
+			{
+				"account": profile.receivable_account,
+				"party_type": "Customer",
+				"party": customer,
+				"debit_in_account_currency": amount,
+			},
+		)
+
+	je.append(
+		"accounts",
+		{
+			"account": profile.income_account,
+			"credit_in_account_currency": total,
+		},
+	)
+
+	je.flags.ignore_mandatory = True
+	je.insert()
+
+	if profile.journal_entry_status == "Submit":
+		je.submit()
+
+	return je
+
+
+def make_consolidated_invoice(profile, company, posting_date, customer, entries):
+	"""One Sales Invoice line per pending entry, with the rent payments of the reservations as advances."""
+	si = frappe.new_doc("Sales Invoice")
+	si.customer = customer
+	si.company = company
+	si.posting_date = posting_date
+	si.due_date = posting_date
+	si.currency = entries[0].currency
+	si.ignore_pricing_rule = 1
+	si.set_posting_time = 1
+
+	for entry in entries:
+		si.append(
+			"items",
+			{
+				"item_code": entry.income_item,
+				"description": _("{0} of {1}").format(_(entry.purpose), entry.reservation),
+				"qty": 1,
+				"rate": entry.amount,
+			},
+		)
+
+	rented = [entry.reservation for entry in entries if entry.purpose == "Rent"]
+	for advance in get_rent_advances(rented, posting_date):
+		si.append("advances", advance)
+
+	si.flags.ignore_mandatory = True
+	si.insert()
+
+	if profile.sales_invoice_status == "Submit":
+		si.submit()
+
+	return si
+
+
+def get_rent_advances(reservations, posting_date):
+	"""Deposit and remaining rent Payment Entries of the reservations, read in one query."""
+	if not reservations:
+		return []
+
+	entries = frappe.db.sql(
+		"""
+		SELECT pe.name, pe.remarks, pe.paid_amount
+		FROM `tabReservation Payments` rp
+		JOIN `tabPayment Entry` pe ON pe.name = rp.payment_entry
+		WHERE rp.parenttype = 'Suit Reservation'
+		  AND rp.parent IN %(reservations)s
+		  AND rp.description IN ('Deposit Payment', 'Remaining Rent Payment')
+		  AND pe.docstatus = 1
+		ORDER BY rp.parent, rp.idx
+		""",
+		{"reservations": reservations},
+		as_dict=True,
+	)
+
+	return [
+		{
+			"reference_type": "Payment Entry",
+			"reference_name": pe.name,
+			"advance_amount": flt(pe.paid_amount),
+			"allocated_amount": flt(pe.paid_amount),
+			"remarks": pe.remarks or "",
+			"difference_posting_date": posting_date,
+		}
+		for pe in entries
+		if flt(pe.paid_amount)
+	]
+
+
+def mark_posted(entries, voucher_type, voucher_no, posting_date):
+	frappe.db.set_value(
+		PENDING_DOCTYPE,
+		{"name": ["in", [entry.name for entry in entries]]},
+		{"status": "Posted", "voucher_type": voucher_type, "voucher_no": voucher_no},
+	)
+
+	amounts = defaultdict(float)
+	for entry in entries:
+		amounts[(entry.reservation, entry.purpose)] += flt(entry.amount)
+
+	for (reservation, purpose), amount in amounts.items():
+		link_voucher(reservation, voucher_type, voucher_no, posting_date, purpose, amount)
+
+
+def link_voucher(reservation, voucher_type, voucher_no, posting_date, purpose, amount):
+	"""Add the consolidated voucher to the child table of a submitted reservation."""
+	child_doctype, table, fieldname = VOUCHER_LINKS[voucher_type]
+
+	idx = frappe.db.sql(
+		f"SELECT IFNULL(MAX(idx), 0) FROM `tab{child_doctype}` WHERE parent = %s AND parentfield = %s",
+		(reservation, table),
+	)[0][0]
+
+	frappe.get_doc(
+		{
+			"doctype": child_doctype,
+			"parent": reservation,
+			"parenttype": "Suit Reservation",
+			"parentfield": table,
+			"idx": idx + 1,
+			"docstatus": 1,
+			fieldname: voucher_no,
+			"date": posting_date,
+			"purpose": purpose,
+			"amount": amount,
+		}
+	).db_insert()
+
+
+# ----------------------------------------------------
+# Cancellation
+# ----------------------------------------------------
+
+
+def get_shared_income_vouchers(reservation):
+	"""Consolidated vouchers of a reservation that also carry income of other reservations."""
+	return set(
+		frappe.db.sql_list(
+			"""
+			SELECT DISTINCT mine.voucher_no
+			FROM `tabPending Income Entry` mine
+			JOIN `tabPending Income Entry` other
+			  ON other.voucher_no = mine.voucher_no
+			 AND other.voucher_type = mine.voucher_type
+			 AND other.reservation != mine.reservation
+			WHERE mine.reservation = %(reservation)s
+			  AND mine.voucher_no IS NOT NULL
+			""",
+			{"reservation": reservation},
+		)
+	)
+
+
+def reverse_consolidated_income(doc, voucher_type, voucher_no):
+	"""
+	Reverse this reservation's share of a consolidated voucher without touching the voucher.
+	The reversal is submitted or left as a draft like the branch's consolidated vouchers.
+	"""
+	entries = frappe.get_all(
+		PENDING_DOCTYPE,
+		filters={"reservation": doc.name, "voucher_type": voucher_type, "voucher_no": voucher_no},
+		fields=["purpose", "income_item", "amount"],
+	)
+	total = sum(flt(entry.amount) for entry in entries)
+	if total <= 0:
+		return
+
+	profile = get_posting_profile(doc.branch)
+	remark = _("Reverses {0} for cancelled reservation {1}").format(voucher_no, doc.name)
+
+	if voucher_type == "Journal Entry":
+		je = frappe.new_doc("Journal Entry")
+		je.company = doc.company
+		je.posting_date = nowdate()
+		je.voucher_type = "Journal Entry"
+		je.user_remark = remark
+		je.cheque_no = doc.name
+
+		je.append(
+			"accounts",
+			{
+				"account": profile.income_account,
+				"debit_in_account_currency": total,
+			},
+		)
+		je.append(
+			"accounts",
+			{
+				"account": profile.receivable_account,
+				"party_type": "Customer",
+				"party": doc.customer,
+				"credit_in_account_currency": total,
+			},
+		)
+
+		je.flags.ignore_mandatory = True
+		je.insert()
+
+		if profile.journal_entry_status == "Submit":
+			je.submit()
+		return
+
+	si = frappe.new_doc("Sales Invoice")
+	si.customer = doc.customer
+	si.company = doc.company
+	si.posting_date = nowdate()
+	si.currency = doc.currency
+	si.is_return = 1
+	si.return_against = voucher_no
+	si.ignore_pricing_rule = 1
+	si.remarks = remark
+
+	for entry in entries:
+		si.append(
+			"items",
+			{
+				"item_code": entry.income_item,
+				"qty": -1,
+				"rate": entry.amount,
+			},
+		)
+
+	si.flags.ignore_mandatory = True
+	si.insert()
+
+	if profile.sales_invoice_status == "Submit":
+		si.submit()
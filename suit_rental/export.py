@@ -0,0 +1,402 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+"""
+Streaming export of Suit Reservations with their items, payments and linked
+vouchers, one row per reservation item.
+
+Submitted reservations the user may read in the list view are fetched a page
+at a time (keyset pagination), with the items and vouchers of that page only,
+and each chunk is written to a file as it is built, so memory use does not
+grow with the date range. A direct download is written to a
+SpooledTemporaryFile (kept in memory while small, on disk beyond that) and
+sent as the response. It cannot be streamed into the response as it is read,
+because the database connection is closed as soon as the request returns, so
+only exports of up to DIRECT_EXPORT_MAX_RESERVATIONS are downloaded directly.
+Larger ones go to the background job, which writes a private File and
+notifies the user when it is ready.
+"""
+
+import codecs
+import csv
+import io
+import os
+from tempfile import SpooledTemporaryFile
+
+import frappe
+from frappe import _
+from frappe.model.db_query import DatabaseQuery
+from frappe.utils import cint, cstr, get_datetime, getdate, now_datetime
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+from suit_rental.suit_rental.report.utils import count_reservations, get_reservation_page
+
+EXPORT_FORMATS = {
+	"CSV": ("csv", "text/csv; charset=utf-8"),
+	"Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# (label, field) of the Suit Reservation columns, in order
+RESERVATION_COLUMNS = (
+	("Reservation", "name"),
+	("Status", "reservation_status"),
+	("Branch", "branch"),
+	("Company", "company"),
+	("Customer", "customer"),
+	("Customer Name", "customer_name"),
+	("Mobile Number", "mobile_number"),
+	("Reservation Date", "reservation_date"),
+	("Event Date", "event_date"),
+	("Reservation From", "reservation_from"),
+	("Reservation To", "reservation_to"),
+	("Actual Delivery", "actual_delivery_date"),
+	("Actual Return", "actual_return_date"),
+	("Currency", "currency"),
+	("Total Rent", "total_estimated_rent"),
+	("Deposit", "deposit_amount"),
+	("Paid", "paid_amount"),
+	("Outstanding", "outstanding_amount"),
+	("Security", "security_amount"),
+)
+
+# (label, field) of the Reservation Item columns, in order
+ITEM_COLUMNS = (
+	("Item Row", "idx"),
+	("Item Code", "item_code"),
+	("Item Name", "item_name"),
+	("Serial No", "serial_no"),
+	("Batch No", "batch_no"),
+	("Rate", "rate"),
+	("Return Status", "return_status"),
+	("Return Type", "return_type"),
+	("Penalty", "penalty_amount"),
+)
+
+# (label, child doctype, fields joined per row, distinct) of the per-reservation voucher lists
+VOUCHER_LISTS = (
+	("Payments", "Reservation Payments", ("payment_entry", "description", "amount"), False),
+	("Sales Invoices", "Reservation Sales Invoice", ("sales_invoice", "purpose", "amount"), False),
+	("Journal Entries", "Reservation Journal Entry", ("journal_entry", "purpose", "amount"), False),
+	("Stock Entries", "Reservation Stock Entry", ("stock_entry", "entry_type"), True),
+)
+
+EXPORT_COLUMNS = (
+	tuple(label for label, field in RESERVATION_COLUMNS)
+	+ tuple(label for label, field in ITEM_COLUMNS)
+	+ tuple(label for label, *rest in VOUCHER_LISTS)
+)
+
+EXPORT_CHUNK_SIZE = 1000
+
+# Direct downloads stay in memory up to this size, then spill to disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Larger exports are built on a worker, within the request they could hit its timeout
+DIRECT_EXPORT_MAX_RESERVATIONS = 2000
+
+
+def get_permission_conditions(user):
+	"""The list view's user permission and permission query conditions on Suit Reservation for `user`."""
+	conditions = DatabaseQuery("Suit Reservation", user=user).build_match_conditions()
+	# Literal % in the conditions must survive parameter substitution
+	return cstr(conditions).replace("%", "%%")
+
+
+def get_export_conditions(filters, user):
+	conditions = ["docstatus = 1"]
+
+	if filters.get("from_date"):
+		conditions.append("reservation_from >= %(from_date)s")
+	if filters.get("to_date"):
+		conditions.append("reservation_from <= %(to_date)s")
+	if filters.get("branch"):
+		conditions.append("branch = %(branch)s")
+	if filters.get("reservation_status"):
+		conditions.append("reservation_status = %(reservation_status)s")
+
+	if permission_conditions := get_permission_conditions(user):
+		conditions.append(f"({permission_conditions})")
+
+	return conditions
+
+
+def get_child_rows(doctype, fields, parents):
+	"""Rows of a Suit Reservation child table for `parents`, grouped by parent in idx order."""
+	rows_by_parent = {}
+	for row in frappe.get_all(
+		doctype,
+		filters={"parenttype": "Suit Reservation", "parent": ["in", parents]},
+		fields=["parent", *fields],
+		order_by="parent, idx",
+	):
+		rows_by_parent.setdefault(row.parent, []).append(row)
+
+	return rows_by_parent
+
+
+def get_voucher_lists(parents):
+	"""{parent: [voucher list per VOUCHER_LISTS entry]} for `parents`."""
+	voucher_lists = {parent: [] for parent in parents}
+
+	for _label, doctype, fields, distinct in VOUCHER_LISTS:
+		rows_by_parent = get_child_rows(doctype, fields, parents)
+
+		for parent in parents:
+			vouchers = [
+				" ".join(cstr(row.get(field)) for field in fields) for row in rows_by_parent.get(parent, [])
+			]
+			if distinct:
+				vouchers = list(dict.fromkeys(vouchers))
+			voucher_lists[parent].append(", ".join(vouchers))
+
+	return voucher_lists
+
+
+def get_export_rows(reservations):
+	"""Row tuples of `reservations`: one per item, or one with empty item columns if it has none."""
+	parents = [reservation.name for reservation in reservations]
+	items_by_parent = get_child_rows("Reservation Item", [field for label, field in ITEM_COLUMNS], parents)
+	voucher_lists = get_voucher_lists(parents)
+
+	rows = []
+	for reservation in reservations:
+		values = [reservation.get(field) for label, field in RESERVATION_COLUMNS]
+
+		for item in items_by_parent.get(reservation.name) or [frappe._dict()]:
+			rows.append(
+				(
+					*values,
+					*(item.get(field) for label, field in ITEM_COLUMNS),
+					*voucher_lists[reservation.name],
+				)
+			)
+
+	return rows
+
+
+def iter_export_chunks(filters, user):
+	"""Lists of row tuples for up to EXPORT_CHUNK_SIZE reservations at a time."""
+	conditions = get_export_conditions(filters, user)
+	page = {"page_size": EXPORT_CHUNK_SIZE, "cursor": None}
+	has_more = True
+
+	while has_more:
+		reservations, has_more = get_reservation_page(
+			page,
+			[field for label, field in RESERVATION_COLUMNS],
+			conditions,
+			filters,
+			"reservation_from",
+		)
+		if not reservations:
+			break
+
+		yield get_export_rows(reservations)
+		page["cursor"] = [reservations[-1].reservation_from, reservations[-1].name]
+
+
+def write_csv(filters, user, out):
+	# `out` is binary: each chunk is formatted into a text buffer and written encoded
+	text = io.StringIO(newline="")
+	writer = csv.writer(text)
+
+	def flush():
+		out.write(text.getvalue().encode("utf-8"))
+		text.seek(0)
+		text.truncate()
+
+	out.write(codecs.BOM_UTF8)
+	writer.writerow([_(label) for label in EXPORT_COLUMNS])
+	flush()
+
+	for chunk in iter_export_chunks(filters, user):
+		writer.writerows(chunk)
+		flush()
+
+
+def write_xlsx(filters, user, out):
+	from openpyxl import Workbook
+
+	# Write-only sheets are flushed to a temporary file row by row
+	workbook = Workbook(write_only=True)
+	sheet = workbook.create_sheet(_("Suit Reservations"))
+
+	sheet.append([_(label) for label in EXPORT_COLUMNS])
+	for chunk in iter_export_chunks(filters, user):
+		for row in chunk:
+			sheet.append(row)
+
+	workbook.save(out)
+
+
+def count_export_reservations(filters, user):
+	return count_reservations(get_export_conditions(filters, user), filters)
+
+
+def write_export(filters, file_format, user, out):
+	if file_format == "Excel":
+		write_xlsx(filters, user, out)
+	else:
+		write_csv(filters, user, out)
+
+
+def normalize_filters(from_date=None, to_date=None, branch=None, reservation_status=None):
+	filters = frappe._dict(
+		from_date=getdate(from_date) if from_date else None,
+		to_date=getdate(to_date) if to_date else None,
+		branch=branch or None,
+		reservation_status=reservation_status or None,
+	)
+
+	if filters.from_date and filters.to_date and filters.to_date < filters.from_date:
+		frappe.throw(_("To Date cannot be before From Date"))
+
+	return filters
+
+
+def validate_format(file_format):
+	if file_format not in EXPORT_FORMATS:
+		frappe.throw(_("Export format must be one of {0}").format(", ".join(EXPORT_FORMATS)))
+
+
+def get_export_filename(filters, file_format):
+	extension = EXPORT_FORMATS[file_format][0]
+	period = "-".join(str(d) for d in (filters.from_date, filters.to_date) if d) or "all"
+	stamp = get_datetime(now_datetime()).strftime("%Y%m%d%H%M%S")
+	return f"suit-reservations-{period}-{stamp}.{extension}"
+
+
+@frappe.whitelist()
+def export_reservations(
+	from_date=None, to_date=None, branch=None, reservation_status=None, file_format="CSV"
+):
+	"""
+	Download the export directly. The file is built before the response is sent,
+	so exports of more than DIRECT_EXPORT_MAX_RESERVATIONS are refused: use
+	enqueue_reservation_export (or start_reservation_export) for those.
+	"""
+	frappe.has_permission("Suit Reservation", "export", throw=True)
+	validate_format(file_format)
+	filters = normalize_filters(from_date, to_date, branch, reservation_status)
+
+	count = count_export_reservations(filters, frappe.session.user)
+	if count > DIRECT_EXPORT_MAX_RESERVATIONS:
+		frappe.throw(
+			_(
+				"{0} reservations are too many to download directly. Prepare the export in the background."
+			).format(count)
+		)
+
+	out = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+	write_export(filters, file_format, frappe.session.user, out)
+	size = out.tell()
+	out.seek(0)
+
+	response = Response(
+		wrap_file(frappe.local.request.environ, out),
+		mimetype=EXPORT_FORMATS[file_format][1],
+		direct_passthrough=True,
+	)
+	response.headers["Content-Disposition"] = (
+		f'attachment; filename="{get_export_filename(filters, file_format)}"'
+	)
+	response.headers["Content-Length"] = str(size)
+	return response
+
+
+@frappe.whitelist()
+def start_reservation_export(
+	from_date=None,
+	to_date=None,
+	branch=None,
+	reservation_status=None,
+	file_format="CSV",
+	in_background=0,
+):
+	"""
+	Queue the export when asked to, or when it is too large to download directly.
+	Returns {"queued": False} when the caller should download it with export_reservations.
+	"""
+	frappe.has_permission("Suit Reservation", "export", throw=True)
+	validate_format(file_format)
+	filters = normalize_filters(from_date, to_date, branch, reservation_status)
+
+	if (
+		not cint(in_background)
+		and count_export_reservations(filters, frappe.session.user) <= DIRECT_EXPORT_MAX_RESERVATIONS
+	):
+		return {"queued": False}
+
+	enqueue_reservation_export(from_date, to_date, branch, reservation_status, file_format)
+	return {"queued": True}
+
+
+@frappe.whitelist()
+def enqueue_reservation_export(
+	from_date=None, to_date=None, branch=None, reservation_status=None, file_format="CSV"
+):
+	"""Build the export on a worker. The user is notified with a link to the file when it is ready."""
+	frappe.has_permission("Suit Reservation", "export", throw=True)
+	validate_format(file_format)
+	filters = normalize_filters(from_date, to_date, branch, reservation_status)
+
+	frappe.enqueue(
+		"suit_rental.export.run_export_job",
+		queue="long",
+		timeout=3600,
+		filters=filters,
+		file_format=file_format,
+		user=frappe.session.user,
+	)
+
+
+def run_export_job(filters, file_format, user):
+	filters = frappe._dict(filters)
+	filename = get_export_filename(filters, file_format)
+	path = frappe.get_site_path("private", "files", filename)
+
+	try:
+		with open(path, "wb") as out:
+			write_export(filters, file_format, user, out)
+
+		file = frappe.get_doc(
+			{
+				"doctype": "File",
+				"file_name": filename,
+				"file_url": f"/private/files/{filename}",
+				"is_private": 1,
+				"file_size": os.path.getsize(path),
+				"owner": user,
+			}
+		).insert(ignore_permissions=True)
+		file.db_set("owner", user)
+
+		frappe.get_doc(
+			{
+				"doctype": "Notification Log",
+				"for_user": user,
+				"type": "Alert",
+				"subject": _("Suit Reservation export {0} is ready").format(filename),
+				"document_type": "File",
+				"document_name": file.name,
+			}
+		).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+		frappe.publish_realtime(
+			"suit_rental_export_ready",
+			{"file_url": file.file_url, "file_name": filename},
+			user=user,
+		)
+	except Exception:
+		frappe.db.rollback()
+		if os.path.exists(path):
+			os.remove(path)
+
+		frappe.log_error(title=f"Suit Reservation export failed: {filename}")
+		frappe.publish_realtime(
+			"suit_rental_export_ready",
+			{"error": _("Suit Reservation export {0} failed").format(filename)},
+			user=user,
+		)
@@ -19,6 +19,20 @@ before_uninstall = "suit_rental.install.before_uninstall"
 
 after_migrate = "suit_rental.install.after_migrate"
 
+doc_events = {
+	"Stock Ledger Entry": {
+		"on_submit": "suit_rental.availability.on_stock_ledger_change",
+	},
+	"Branch": {
+		"on_update": "suit_rental.posting.on_posting_settings_change",
+		"on_trash": "suit_rental.posting.on_posting_settings_change",
+	},
+	"Mode of Payment": {
+		"on_update": "suit_rental.posting.on_posting_settings_change",
+		"on_trash": "suit_rental.posting.on_posting_settings_change",
+	},
+}
+
 
 
 
@@ -42,7 +56,7 @@ after_migrate = "suit_rental.install.after_migrate"
 
 # include js, css files in header of desk.html
 # app_include_css = "/assets/suit_rental/css/suit_rental.css"
-# app_include_js = "/assets/suit_rental/js/suit_rental.js"
+app_include_js = "/assets/suit_rental/js/suit_rental.js"
 
 # include js, css files in header of web template
 # web_include_css = "/assets/suit_rental/css/suit_rental.css"
@@ -164,23 +178,13 @@ after_migrate = "suit_rental.install.after_migrate"
 # Scheduled Tasks
 # ---------------
 
-# scheduler_events = {
-# 	"all": [
-# 		"suit_rental.tasks.all"
-# 	],
-# 	"daily": [
-# 		"suit_rental.tasks.daily"
-# 	],
-# 	"hourly": [
-# 		"suit_rental.tasks.hourly"
-# 	],
-# 	"weekly": [
-# 		"suit_rental.tasks.weekly"
-# 	],
-# 	"monthly": [
-# 		"suit_rental.tasks.monthly"
-# 	],
-# }
+scheduler_events = {
+	"daily": [
+		"suit_rental.tasks.post_consolidated_income",
+		"suit_rental.tasks.reconcile_branch_daily_summary",
+		"suit_rental.tasks.extend_overdue_reservations",
+	],
+}
 
 # Testing
 # -------
@@ -0,0 +1,5 @@
+from suit_rental.summary import rebuild_branch_summary
+
+
+def execute():
+	rebuild_branch_summary()
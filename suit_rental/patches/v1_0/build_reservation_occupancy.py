@@ -0,0 +1,5 @@
+from suit_rental.availability import rebuild_reservation_occupancy
+
+
+def execute():
+	rebuild_reservation_occupancy()
@@ -0,0 +1,109 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+from dataclasses import asdict, dataclass, field
+
+import frappe
+from frappe import _
+
+# Branch name -> BranchPostingProfile fields, kept in the site cache
+POSTING_PROFILE_CACHE_KEY = "suit_rental:branch_posting_profile"
+
+# (Mode of Payment, Company) -> default account for every Mode of Payment
+MOP_ACCOUNTS_CACHE_KEY = "suit_rental:mode_of_payment_accounts"
+
+
+@dataclass(frozen=True)
+class BranchPostingProfile:
+	"""The posting settings of a Branch, as used by reservation deposit, delivery and return."""
+
+	branch: str
+	company: str | None = None
+	post_income_as: str = "Journal Entry"
+	sales_invoice_status: str = "Submit"
+	journal_entry_status: str = "Submit"
+	income_account: str | None = None
+	receivable_account: str | None = None
+	rent_invoice_item: str | None = None
+	consolidated_voucher_type: str = "Journal Entry"
+	auto_assign_serial_no: bool = False
+	mop_accounts: dict = field(default_factory=dict)
+
+	@property
+	def is_daily_consolidated(self):
+		return self.post_income_as == "Daily Consolidated"
+
+	@property
+	def income_voucher_type(self):
+		"""The voucher income ends up in, whether posted right away or consolidated daily."""
+		return self.consolidated_voucher_type if self.is_daily_consolidated else self.post_income_as
+
+	def get_mop_account(self, mode_of_payment, company=None):
+		return self.mop_accounts.get((mode_of_payment, company or self.company))
+
+
+def get_mop_accounts():
+	def generator():
+		rows = frappe.get_all(
+			"Mode of Payment Account",
+			filters={"parenttype": "Mode of Payment"},
+			fields=["parent", "company", "default_account"],
+		)
+		return {(row.parent, row.company): row.default_account for row in rows if row.default_account}
+
+	return frappe.cache.get_value(MOP_ACCOUNTS_CACHE_KEY, generator)
+
+
+def build_posting_profile(branch):
+	values = frappe.db.get_value(
+		"Branch",
+		branch,
+		[
+			"custom_company",
+			"custom_post_income_as",
+			"custom_sales_invoice_status",
+			"custom_journal_entry_status",
+			"custom_income_account",
+			"custom_receivable_account",
+			"custom_rent_invoice_item",
+			"custom_consolidated_voucher_type",
+			"custom_auto_assign_serial_no",
+		],
+		as_dict=True,
+	)
+	if not values:
+		frappe.throw(_("Branch {0} not found").format(branch), frappe.DoesNotExistError)
+
+	return asdict(
+		BranchPostingProfile(
+			branch=branch,
+			company=values.custom_company,
+			post_income_as=(values.custom_post_income_as or "Journal Entry").strip(),
+			sales_invoice_status=(values.custom_sales_invoice_status or "Submit").strip(),
+			journal_entry_status=(values.custom_journal_entry_status or "Submit").strip(),
+			income_account=values.custom_income_account,
+			receivable_account=values.custom_receivable_account,
+			rent_invoice_item=values.custom_rent_invoice_item,
+			consolidated_voucher_type=values.custom_consolidated_voucher_type or "Journal Entry",
+			auto_assign_serial_no=bool(values.custom_auto_assign_serial_no),
+			mop_accounts=get_mop_accounts(),
+		)
+	)
+
+
+def get_posting_profile(branch):
+	"""Return the cached BranchPostingProfile of a branch."""
+	values = frappe.cache.hget(
+		POSTING_PROFILE_CACHE_KEY, branch, generator=lambda: build_posting_profile(branch)
+	)
+	return BranchPostingProfile(**values)
+
+
+def clear_posting_profiles():
+	frappe.cache.delete_value([POSTING_PROFILE_CACHE_KEY, MOP_ACCOUNTS_CACHE_KEY])
+
+
+def on_posting_settings_change(doc, method=None):
+	"""Branch / Mode of Payment doc event: drop the cached profiles now and once the change is committed."""
+	clear_posting_profiles()
+	frappe.db.after_commit.add(clear_posting_profiles)
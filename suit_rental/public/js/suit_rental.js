@@ -0,0 +1,49 @@
+frappe.provide("suit_rental.report_pagination");
+
+// Keyset paging for script reports built on suit_rental.suit_rental.report.utils.get_reservation_page
+suit_rental.report_pagination = {
+	filters(page_size = 500) {
+		return [
+			{
+				fieldname: "page_size",
+				label: __("Page Size"),
+				fieldtype: "Int",
+				default: page_size,
+				on_change: () => suit_rental.report_pagination.first_page(frappe.query_report),
+			},
+			{
+				fieldname: "cursor",
+				label: __("Cursor"),
+				fieldtype: "Data",
+				hidden: 1,
+			},
+		];
+	},
+
+	setup(report, sort_field) {
+		report.page.add_inner_button(__("First Page"), () => this.first_page(report));
+		report.page.add_inner_button(__("Next Page"), () => this.next_page(report, sort_field));
+	},
+
+	first_page(report) {
+		if (report.get_filter_value("cursor")) {
+			report.set_filter_value("cursor", "");
+		} else {
+			report.refresh();
+		}
+	},
+
+	next_page(report, sort_field) {
+		let data = report.data || [];
+		let page_size = cint(report.get_filter_value("page_size")) || 500;
+
+		if (data.length < page_size) {
+			frappe.show_alert({ message: __("This is the last page"), indicator: "orange" });
+			return;
+		}
+
+		// The next page starts after the last row of this one
+		let last = data[data.length - 1];
+		report.set_filter_value("cursor", JSON.stringify([last[sort_field], last.name]));
+	},
+};
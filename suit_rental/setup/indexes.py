@@ -0,0 +1,167 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import add_days, nowdate
+
+# ----------------------------------------------------
+# Composite indexes for the date-window queries
+# ----------------------------------------------------
+
+INDEXES = {
+	"Suit Reservation": {
+		"branch_status_from_index": ["branch", "docstatus", "reservation_status", "reservation_from"],
+		"branch_to_index": ["branch", "docstatus", "reservation_to"],
+	},
+	"Reservation Item": {
+		"item_parent_index": ["item_code", "parent"],
+		"serial_parent_index": ["serial_no", "parent"],
+	},
+	"Reservation Occupancy": {
+		"item_date_index": ["item_code", "occupancy_date"],
+		"serial_date_index": ["serial_no", "occupancy_date"],
+	},
+	"Branch Daily Summary": {
+		"branch_date_index": ["branch", "summary_date"],
+	},
+	"Pending Income Entry": {
+		"branch_status_date_index": ["branch", "status", "posting_date"],
+	},
+}
+
+
+def get_index_columns(doctype, index_name):
+	"""Return the ordered column list of an index, or [] if it does not exist."""
+	rows = frappe.db.sql(
+		f"SHOW INDEX FROM `tab{doctype}` WHERE Key_name = %s",
+		(index_name,),
+		as_dict=True,
+	)
+	return [r.Column_name for r in sorted(rows, key=lambda r: r.Seq_in_index)]
+
+
+def create_indexes():
+	for doctype, indexes in INDEXES.items():
+		for index_name, columns in indexes.items():
+			frappe.db.add_index(doctype, columns, index_name)
+
+
+def verify_indexes():
+	"""Return a list of (doctype, index_name, expected, found) for every index that is missing or wrong."""
+	problems = []
+
+	for doctype, indexes in INDEXES.items():
+		for index_name, columns in indexes.items():
+			found = get_index_columns(doctype, index_name)
+			if found != columns:
+				problems.append((doctype, index_name, columns, found))
+
+	return problems
+
+
+def setup_suit_rental_indexes():
+	create_indexes()
+
+	for doctype, index_name, expected, found in verify_indexes():
+		print(f"Suit Rental: index {index_name} on {doctype} is {found or 'missing'}, expected {expected}")
+
+
+# ----------------------------------------------------
+# EXPLAIN for the app's hot queries
+# ----------------------------------------------------
+
+
+def get_hot_paths():
+	"""{name: callable} running each hot path of the app with sample values from the site's data."""
+	from suit_rental.api import check_availability
+	from suit_rental.availability import (
+		compute_availability,
+		find_available_items,
+		normalize_availability_rows,
+	)
+	from suit_rental.suit_rental.report.active_reservations import active_reservations
+	from suit_rental.suit_rental.report.deliveries_pending import deliveries_pending
+	from suit_rental.suit_rental.report.returns_pending import returns_pending
+	from suit_rental.suit_rental.report.suit_reservation_statistics import suit_reservation_statistics
+
+	today = nowdate()
+	window_end = add_days(today, 3)
+	branch = frappe.db.get_value("Branch", {}, "name") or ""
+	warehouse = frappe.db.get_value("Branch", branch, "custom_default_warehouse") or ""
+	item_code = frappe.db.get_value("Reservation Item", {}, "item_code") or ""
+	filters = frappe._dict(date=today, branch=branch)
+
+	paths = {
+		"deliveries_pending": lambda: deliveries_pending.execute(filters),
+		"returns_pending": lambda: returns_pending.execute(filters),
+		"active_reservations": lambda: active_reservations.execute(filters),
+		"suit_reservation_statistics": lambda: suit_reservation_statistics.execute(filters),
+	}
+
+	# The availability paths refuse an empty item or warehouse
+	if item_code and warehouse:
+		paths.update(
+			{
+				"availability": lambda: compute_availability(
+					normalize_availability_rows([{"item_code": item_code}], warehouse, today, window_end)
+				),
+				"check_availability": lambda: check_availability(
+					item_code, warehouse=warehouse, start_date=today, end_date=window_end
+				),
+				"search_available_items": lambda: find_available_items(warehouse, today, window_end),
+			}
+		)
+
+	return paths
+
+
+def record_queries(fn):
+	"""
+	Run fn and return the (query, values) of every SELECT it sends to the database,
+	hooking frappe.db.sql the way frappe.recorder does.
+	"""
+	queries = []
+	sql = frappe.db.sql
+
+	def recording_sql(query, values=(), *args, **kwargs):
+		if str(query).lstrip().upper().startswith("SELECT"):
+			queries.append((str(query), values))
+		return sql(query, values, *args, **kwargs)
+
+	frappe.db.sql = recording_sql
+	try:
+		fn()
+	finally:
+		frappe.db.sql = sql
+
+	return queries
+
+
+def get_hot_queries():
+	"""{name: (query, values)} of the SQL the hot paths actually run, several per path where they do."""
+	hot_queries = {}
+
+	for name, fn in get_hot_paths().items():
+		queries = record_queries(fn)
+		for i, query in enumerate(queries, start=1):
+			hot_queries[f"{name} #{i}" if len(queries) > 1 else name] = query
+
+	return hot_queries
+
+
+def explain_hot_queries():
+	"""Return {query_name: [EXPLAIN rows]} for every hot query."""
+	return {
+		name: frappe.db.sql(f"EXPLAIN {query}", params, as_dict=True)
+		for name, (query, params) in get_hot_queries().items()
+	}
+
+
+def print_hot_query_plans():
+	for name, plan in explain_hot_queries().items():
+		print(f"\n== {name}")
+		for row in plan:
+			print(
+				f"  table={row.get('table')} type={row.get('type')} key={row.get('key')} "
+				f"rows={row.get('rows')} extra={row.get('Extra')}"
+			)
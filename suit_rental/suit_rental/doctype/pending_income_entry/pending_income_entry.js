@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Ahmed Yousef and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Pending Income Entry", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,16 @@
+// Copyright (c) 2026, Ahmed Yousef and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("Reservation Workflow Log", {
+	refresh(frm) {
+		if (frm.doc.status === "Failed") {
+			frm.add_custom_button(__("Retry"), () => {
+				frappe
+					.xcall("suit_rental.workflow.retry_workflows", { names: [frm.doc.name] })
+					.then(() => {
+						frappe.show_alert({ message: __("Retry queued"), indicator: "blue" });
+					});
+			});
+		}
+	},
+});
@@ -0,0 +1,28 @@
+frappe.listview_settings["Reservation Workflow Log"] = {
+	add_fields: ["status"],
+	get_indicator: function (doc) {
+		const colors = { Running: "orange", Failed: "red", Completed: "green" };
+		return [__(doc.status), colors[doc.status] || "gray", "status,=," + doc.status];
+	},
+	onload: function (listview) {
+		listview.page.add_action_item(__("Retry"), function () {
+			let names = listview
+				.get_checked_items()
+				.filter((d) => d.status === "Failed")
+				.map((d) => d.name);
+
+			if (!names.length) {
+				frappe.msgprint(__("Select failed workflows to retry"));
+				return;
+			}
+
+			frappe.xcall("suit_rental.workflow.retry_workflows", { names: names }).then((count) => {
+				frappe.show_alert({
+					message: __("{0} workflows queued for retry", [count]),
+					indicator: "blue",
+				});
+				listview.clear_checked_items();
+			});
+		});
+	},
+};
@@ -0,0 +1,9 @@
+# Copyright (c) 2026, Ahmed Yousef and Contributors
+# See license.txt
+
+# import frappe
+from frappe.tests.utils import FrappeTestCase
+
+
+class TestReservationWorkflowLog(FrappeTestCase):
+	pass
@@ -67,9 +67,24 @@ frappe.ui.form.on("Suit Reservation", {
 							default: frm.doc.mode_of_payment,
 							reqd: 1,
 						},
+						{
+							label: __("Post in Background"),
+							fieldname: "run_in_background",
+							fieldtype: "Check",
+							default: 1,
+							description: __(
+								"Queue the stock and accounting entries and follow the progress here"
+							),
+						},
 					],
 					primary_action_label: __("Deliver"),
 					primary_action(values) {
+						if (values.run_in_background) {
+							deliver_in_background(frm, values, idempotency_key);
+							dialog.hide();
+							return;
+						}
+
 						frappe.call({
 							method: "suit_rental.api.deliver_reservation",
 							args: {
@@ -87,6 +102,8 @@ frappe.ui.form.on("Suit Reservation", {
 						dialog.hide();
 					},
 				});
+				// One key per dialog, so double clicks and retries reuse the same job
+				let idempotency_key = frappe.utils.get_random(20);
 				dialog.show();
 			});
 		}
@@ -207,6 +224,7 @@ function check_item_balance(frm, row) {
 		method: "suit_rental.api.check_availability",
 		args: {
 			item_code: row.item_code,
+			serial_no: row.serial_no,
 			branch: frm.doc.branch,
 			warehouse: frm.doc.source_warehouse,
 			start_date: frm.doc.reservation_from,
@@ -245,6 +263,69 @@ function check_item_balance(frm, row) {
 	});
 }
 
+function check_all_items_balance(frm) {
+	const rows = (frm.doc.reservation_items || []).filter((row) => row.item_code);
+	if (!rows.length) {
+		frappe.show_alert({ message: __("Add at least one item first"), indicator: "orange" });
+		return;
+	}
+
+	frappe.show_alert({ message: __("Checking availability..."), indicator: "blue" });
+	frappe.call({
+		method: "suit_rental.api.check_availability_bulk",
+		args: {
+			items: rows.map((row) => ({
+				name: row.name,
+				idx: row.idx,
+				item_code: row.item_code,
+				serial_no: row.serial_no,
+			})),
+			warehouse: frm.doc.source_warehouse,
+			start_date: frm.doc.reservation_from,
+			end_date: frm.doc.reservation_to,
+		},
+		callback: function (r) {
+			if (!r || !r.message) return;
+
+			const unavailable = r.message.filter((m) => m.available_stock <= 0);
+			frappe.msgprint({
+				title: __("Availability"),
+				message: build_bulk_availability_html(r.message),
+				indicator: unavailable.length ? "red" : "green",
+			});
+		},
+	});
+}
+
+function build_bulk_availability_html(rows) {
+	let html = `<div style="max-height:360px; overflow:auto;">
+        <table class="table table-bordered" style="width:100%;border-collapse:collapse;">
+          <thead><tr>
+            <th>#</th>
+            <th>${__("Item")}</th>
+            <th>${__("Serial No")}</th>
+            <th>${__("Total Stock")}</th>
+            <th>${__("Reserved")}</th>
+            <th>${__("Available")}</th>
+            <th>${__("Booked By")}</th>
+          </tr></thead>
+          <tbody>`;
+	rows.forEach(function (m) {
+		const color = m.available_stock > 0 ? "green" : "red";
+		html += `<tr>
+            <td>${m.idx}</td>
+            <td>${m.item_code}</td>
+            <td>${m.serial_no || ""}</td>
+            <td>${m.total_stock}</td>
+            <td>${m.reserved_qty}</td>
+            <td><span class="indicator-pill ${color}">${m.available_stock}</span></td>
+            <td>${(m.conflicts || []).join(", ")}</td>
+        </tr>`;
+	});
+	html += `</tbody></table></div>`;
+	return html;
+}
+
 function build_availability_html(m) {
 	let html = `<div>
         <p><b>${__("Total stock in Sales Warehouse")}:</b> ${m.total_stock}</p>
@@ -295,6 +376,236 @@ function update_total_estimated(frm) {
 	debounced_update_total_estimated(frm);
 }
 
+// Check availability for all rows
+frappe.ui.form.on("Suit Reservation", {
+	refresh(frm) {
+		if (frm.doc.docstatus !== 0 || !frm.fields_dict.reservation_items?.grid) return;
+
+		frm.fields_dict.reservation_items.grid.add_custom_button(
+			__("Check Availability"),
+			function () {
+				if (!frm.doc.reservation_from || !frm.doc.reservation_to || !frm.doc.source_warehouse) {
+					frappe.show_alert({
+						message: __("Select Reserve From, Reserve To, and Source Warehouse first."),
+						indicator: "orange",
+					});
+					return;
+				}
+				check_all_items_balance(frm);
+			}
+		);
+	},
+});
+
+// Availability calendar for the reserved items
+frappe.ui.form.on("Suit Reservation", {
+	refresh(frm) {
+		if (frm.doc.docstatus !== 0) return;
+
+		frm.add_custom_button(__("Availability Calendar"), function () {
+			show_availability_calendar(frm);
+		});
+	},
+});
+
+function show_availability_calendar(frm) {
+	const items = [
+		...new Set((frm.doc.reservation_items || []).map((row) => row.item_code).filter(Boolean)),
+	];
+	if (!items.length || !frm.doc.source_warehouse) {
+		frappe.show_alert({
+			message: __("Select Source Warehouse and add at least one item first."),
+			indicator: "orange",
+		});
+		return;
+	}
+
+	const from_date = frm.doc.reservation_from || frappe.datetime.get_today();
+	const to_date = frm.doc.reservation_to || from_date;
+
+	// A GET, so the browser revalidates its copy with the ETag and gets 304 while nothing changed
+	frappe.call({
+		method: "suit_rental.api.get_availability_calendar",
+		type: "GET",
+		args: {
+			items: JSON.stringify(items.sort()),
+			warehouse: frm.doc.source_warehouse,
+			from_date: frappe.datetime.add_days(from_date, -7),
+			to_date: frappe.datetime.add_days(to_date, 7),
+		},
+		callback: function (r) {
+			if (!r || !r.message) return;
+
+			frappe.msgprint({
+				title: __("Availability Calendar"),
+				message: build_availability_calendar_html(r.message, frm),
+				wide: true,
+			});
+		},
+	});
+}
+
+function build_availability_calendar_html(data, frm) {
+	const in_window = (day) =>
+		frm.doc.reservation_from &&
+		frm.doc.reservation_to &&
+		day >= frm.doc.reservation_from &&
+		day <= frm.doc.reservation_to;
+
+	let html = `<div style="max-height:420px; overflow:auto;">
+        <table class="table table-bordered" style="width:100%;border-collapse:collapse;font-size:11px;">
+          <thead><tr><th>${__("Item")}</th>`;
+	data.dates.forEach(function (day) {
+		const style = in_window(day) ? "background:var(--bg-blue);" : "";
+		html += `<th style="${style}">${frappe.datetime.str_to_user(day).slice(0, 5)}</th>`;
+	});
+	html += `</tr></thead><tbody>`;
+
+	data.items.forEach(function (item_code, i) {
+		html += `<tr><td>${item_code}</td>`;
+		data.matrix[i].forEach(function (free) {
+			const bg = free > 0 ? "var(--bg-green)" : "var(--bg-red)";
+			html += `<td style="background:${bg};text-align:center;">${free}</td>`;
+		});
+		html += `</tr>`;
+	});
+	html += `</tbody></table></div>`;
+	return html;
+}
+
+// Find available suits for the reservation window
+frappe.ui.form.on("Suit Reservation", {
+	refresh(frm) {
+		if (frm.doc.docstatus !== 0) return;
+
+		frm.add_custom_button(__("Find Available Suits"), function () {
+			if (!frm.doc.reservation_from || !frm.doc.reservation_to || !frm.doc.source_warehouse) {
+				frappe.show_alert({
+					message: __("Select Reserve From, Reserve To, and Source Warehouse first."),
+					indicator: "orange",
+				});
+				return;
+			}
+			open_available_suits_dialog(frm);
+		});
+	},
+});
+
+function open_available_suits_dialog(frm) {
+	const state = { items: [], next_after: null, selected: new Set() };
+
+	const dialog = new frappe.ui.Dialog({
+		title: __("Available Suits {0} - {1}", [
+			frappe.datetime.str_to_user(frm.doc.reservation_from),
+			frappe.datetime.str_to_user(frm.doc.reservation_to),
+		]),
+		size: "large",
+		fields: [
+			{ fieldname: "txt", fieldtype: "Data", label: __("Search") },
+			{ fieldname: "item_group", fieldtype: "Link", options: "Item Group", label: __("Item Group") },
+			{ fieldtype: "Column Break" },
+			{ fieldname: "brand", fieldtype: "Link", options: "Brand", label: __("Brand") },
+			{ fieldname: "size", fieldtype: "Data", label: __("Size") },
+			{ fieldtype: "Section Break" },
+			{
+				fieldname: "search",
+				fieldtype: "Button",
+				label: __("Search"),
+				click: () => search(true),
+			},
+			{ fieldname: "results", fieldtype: "HTML" },
+			{
+				fieldname: "load_more",
+				fieldtype: "Button",
+				label: __("Load More"),
+				click: () => search(false),
+			},
+		],
+		primary_action_label: __("Add Selected"),
+		primary_action() {
+			state.selected.forEach((item_code) => {
+				const exists = (frm.doc.reservation_items || []).some((row) => row.item_code === item_code);
+				if (exists) return;
+
+				const row = frm.add_child("reservation_items");
+				frappe.model.set_value(row.doctype, row.name, "item_code", item_code);
+			});
+			frm.refresh_field("reservation_items");
+			dialog.hide();
+		},
+	});
+
+	function search(reset) {
+		const values = dialog.get_values(true);
+		if (reset) {
+			state.items = [];
+			state.next_after = null;
+		}
+
+		frappe.call({
+			method: "suit_rental.api.search_available_items",
+			args: {
+				warehouse: frm.doc.source_warehouse,
+				from_date: frm.doc.reservation_from,
+				to_date: frm.doc.reservation_to,
+				txt: values.txt,
+				item_group: values.item_group,
+				brand: values.brand,
+				size: values.size,
+				after: state.next_after,
+			},
+			callback: function (r) {
+				if (!r || !r.message) return;
+
+				state.items = state.items.concat(r.message.items);
+				state.next_after = r.message.next_after;
+				render();
+			},
+		});
+	}
+
+	function render() {
+		let html = `<div style="max-height:400px; overflow:auto;">
+            <table class="table table-bordered" style="width:100%;border-collapse:collapse;">
+              <thead><tr>
+                <th></th>
+                <th></th>
+                <th>${__("Item")}</th>
+                <th>${__("Rate")}</th>
+                <th>${__("Free Qty")}</th>
+              </tr></thead>
+              <tbody>`;
+		state.items.forEach(function (item) {
+			const checked = state.selected.has(item.item_code) ? "checked" : "";
+			const image = item.image
+				? `<img src="${item.image}" style="max-height:40px;max-width:40px;">`
+				: "";
+			html += `<tr>
+                <td><input type="checkbox" data-item="${item.item_code}" ${checked}></td>
+                <td>${image}</td>
+                <td>${item.item_code}<br><span class="text-muted">${item.item_name || ""}</span></td>
+                <td>${format_currency(item.rate, frm.doc.currency)}</td>
+                <td>${item.free_qty}</td>
+            </tr>`;
+		});
+		if (!state.items.length) {
+			html += `<tr><td colspan="5">${__("No available items found.")}</td></tr>`;
+		}
+		html += `</tbody></table></div>`;
+
+		const $results = dialog.fields_dict.results.$wrapper;
+		$results.html(html);
+		$results.find("input[type=checkbox]").on("change", function () {
+			const item_code = $(this).attr("data-item");
+			this.checked ? state.selected.add(item_code) : state.selected.delete(item_code);
+		});
+		dialog.fields_dict.load_more.$wrapper.toggle(!!state.next_after);
+	}
+
+	dialog.show();
+	search(true);
+}
+
 // Filter Child Table Fields (Serial No)
 frappe.ui.form.on("Suit Reservation", {
 	refresh: function (frm) {
@@ -486,10 +797,60 @@ function validate_and_open_return_dialog(frm) {
 		return;
 	}
 
-	open_return_dialog(frm, total_penalty);
+	get_return_statuses(frm).then((statuses) => {
+		open_return_dialog(frm, total_penalty, statuses);
+	});
+}
+
+// Active return statuses of the branch, loaded once per form from the server cache
+function get_return_statuses(frm) {
+	if (frm.__return_statuses && frm.__return_statuses.branch === frm.doc.branch) {
+		return Promise.resolve(frm.__return_statuses.statuses);
+	}
+
+	return frappe
+		.xcall(
+			"suit_rental.suit_rental.doctype.suit_return_status.suit_return_status.get_return_statuses",
+			{ branch: frm.doc.branch }
+		)
+		.then((statuses) => {
+			frm.__return_statuses = { branch: frm.doc.branch, statuses: statuses || {} };
+			return frm.__return_statuses.statuses;
+		});
+}
+
+function build_return_summary_html(frm, statuses) {
+	const rows = (frm.doc.reservation_items || [])
+		.map((row) => {
+			const status = statuses[row.return_status] || {};
+			const destination =
+				status.type === "Good"
+					? frm.doc.source_warehouse
+					: status.type === "Damage"
+					? status.damage_warehouse || __("Not set")
+					: __("Material Issue");
+
+			return `<tr>
+				<td>${frappe.utils.escape_html(row.item_code || "")}</td>
+				<td>${frappe.utils.escape_html(row.serial_no || "")}</td>
+				<td>${frappe.utils.escape_html(status.status_name || row.return_status)}</td>
+				<td>${__(status.type || "")}</td>
+				<td>${frappe.utils.escape_html(destination || "")}</td>
+				<td class="text-right">${format_currency(row.penalty_amount, frm.doc.currency)}</td>
+			</tr>`;
+		})
+		.join("");
+
+	return `<table class="table table-bordered table-sm">
+		<thead><tr>
+			<th>${__("Item")}</th><th>${__("Serial No")}</th><th>${__("Return Status")}</th>
+			<th>${__("Type")}</th><th>${__("Goes To")}</th><th class="text-right">${__("Penalty")}</th>
+		</tr></thead>
+		<tbody>${rows}</tbody>
+	</table>`;
 }
 
-function open_return_dialog(frm, total_penalty) {
+function open_return_dialog(frm, total_penalty, statuses) {
 	const dialog = new frappe.ui.Dialog({
 		title: __("Confirm Return"),
 		fields: [
@@ -507,6 +868,11 @@ function open_return_dialog(frm, total_penalty) {
 				read_only: 1,
 				default: total_penalty,
 			},
+			{
+				fieldname: "return_summary",
+				fieldtype: "HTML",
+				options: build_return_summary_html(frm, statuses),
+			},
 		],
 
 		primary_action_label: __("Confirm Return"),
@@ -539,3 +905,78 @@ function open_return_dialog(frm, total_penalty) {
 }
 
 
+
+// ----------------------------------------------------
+// Background Delivery
+// ----------------------------------------------------
+function deliver_in_background(frm, values, idempotency_key) {
+	frappe.call({
+		method: "suit_rental.api.deliver_reservation_async",
+		args: {
+			name: frm.doc.name,
+			delivery_date: values.delivery_date,
+			mode_of_payment: values.mode_of_payment,
+			idempotency_key: idempotency_key,
+		},
+		freeze: true,
+		callback: function (r) {
+			if (!r.message) return;
+			follow_delivery_job(frm, r.message.job_id, r.message.status);
+		},
+	});
+}
+
+function follow_delivery_job(frm, job_id, status) {
+	let title = __("Delivering {0}", [frm.doc.name]);
+
+	let show = (data) => {
+		if (!data) return false;
+
+		if (data.status === "Completed") {
+			frappe.hide_progress();
+			frappe.realtime.off("suit_rental_delivery_progress", handler);
+			frappe.show_alert({ message: data.message, indicator: "green" });
+			frm.reload_doc();
+			return true;
+		}
+
+		if (data.status === "Failed") {
+			frappe.hide_progress();
+			frappe.realtime.off("suit_rental_delivery_progress", handler);
+			frappe.msgprint({
+				title: __("Delivery Failed"),
+				message: data.message,
+				indicator: "red",
+			});
+			return true;
+		}
+
+		frappe.show_progress(title, data.progress, 100, data.message);
+		return false;
+	};
+
+	let handler = (data) => {
+		if (data.job_id === job_id) show(data);
+	};
+
+	if (show(status)) return;
+	frappe.realtime.on("suit_rental_delivery_progress", handler);
+}
+
+// Cancellation: reservations with many linked vouchers are cancelled on a worker
+
+frappe.ui.form.on("Suit Reservation", {
+	before_cancel(frm) {
+		return frappe
+			.call({
+				method: "suit_rental.suit_rental.doctype.suit_reservation.suit_reservation.queue_cancellation",
+				args: { name: frm.doc.name },
+			})
+			.then((r) => {
+				if (!r.message) return;
+
+				// The job cancels the vouchers, then the reservation
+				frappe.validated = false;
+			});
+	},
+});
@@ -1,7 +1,22 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import flt, nowdate, get_datetime
+from frappe.utils import flt, get_datetime, nowdate
+
+from suit_rental.availability import (
+    assign_serial_nos,
+    lock_items,
+    sync_reservation_occupancy,
+    validate_no_overbooking,
+)
+from suit_rental.consolidation import (
+    cancel_pending_income,
+    get_shared_income_vouchers,
+    reverse_consolidated_income,
+)
+from suit_rental.posting import get_posting_profile
+from suit_rental.summary import update_branch_summary
+from suit_rental.workflow import check_no_unfinished_workflow, run_step, run_workflow
 
 
 class SuitReservation(Document):
@@ -9,75 +24,23 @@ class SuitReservation(Document):
         """Set reservation_status and create Payment Entry for deposit if applicable."""
         self.reservation_status = "Reserved"
 
-        if self.deposit_amount and self.deposit_amount > 0:
-            if not self.mode_of_payment:
-                frappe.throw(_("Mode of Payment is required for deposit payment"))
-            if not self.company:
-                frappe.throw(_("Company is required for deposit payment"))
-            if not self.currency:
-                frappe.throw(_("Currency is required for deposit payment"))
-            if not self.customer:
-                frappe.throw(_("Customer is required for deposit payment"))
-            if not self.branch:
-                frappe.throw(_("Branch is required for deposit payment"))
-
-            # Load Branch
-            branch = frappe.get_doc("Branch", self.branch)
-
-            # Reservation datetime
-            reservation_dt = get_datetime(self.reservation_date)
-            reservation_date_only = reservation_dt.date()
-
-            # Resolve Mode of Payment Account
-            mop_account = frappe.db.get_value(
-                "Mode of Payment Account",
-                {"parent": self.mode_of_payment, "company": self.company},
-                "default_account",
-            )
+        profile = get_posting_profile(self.branch) if self.branch else None
+        collect_deposit = self.deposit_amount and self.deposit_amount > 0
 
-            if not mop_account:
-                frappe.throw(
-                    _("No account configured in Mode of Payment: {0}").format(
-                        self.mode_of_payment
-                    )
-                )
+        if collect_deposit:
+            mop_account = self.validate_deposit(profile)
 
-            # Create Payment Entry (Deposit)
-            pe = frappe.new_doc("Payment Entry")
-            pe.payment_type = "Receive"
-            pe.party_type = "Customer"
-            pe.party = self.customer
-            pe.company = self.company
-            pe.posting_date = reservation_date_only
-            pe.currency = self.currency
-            pe.paid_to = mop_account
-
-            pe.mode_of_payment = self.mode_of_payment
-            pe.reference_no = self.name
-            pe.reference_date = reservation_date_only
-
-            pe.paid_amount = self.deposit_amount
-            pe.received_amount = self.deposit_amount
-
-            pe.flags.ignore_mandatory = True
-            pe.insert()
-            pe.submit()
-
-            self.append(
-                "reservation_payments",
-                {
-                    "payment_entry": pe.name,
-                    "description": "Deposit Payment",
-                    "payment_mode": pe.mode_of_payment,
-                    "amount": pe.paid_amount,
-                    "type": "Receive",
-                },
-            )
+        # Serialize concurrent submits of the same items until this transaction
+        # ends, then pick serials and check the ledger under that one lock
+        lock_items({row.item_code for row in self.reservation_items if row.item_code})
 
-            self.paid_amount = self.deposit_amount
-            self.outstanding_amount = flt(self.total_estimated_rent) - flt(
-                self.deposit_amount
-            )
+        if profile and profile.auto_assign_serial_no:
+            assign_serial_nos(self)
+
+        validate_no_overbooking(self)
+
+        if collect_deposit:
+            self.make_deposit_payment(mop_account)
 
         frappe.msgprint(
             msg=_(
@@ -87,43 +50,134 @@ class SuitReservation(Document):
             indicator="green",
         )
 
-    def cancel_related_records(self):
-        """Cancel Stock Entries, Payment Entries, Journal Entries, and Sales Invoices."""
-
-        # Cancel Payment Entries
-        if self.reservation_payments:
-            for row in self.reservation_payments:
-                if row.payment_entry:
-                    pe = frappe.get_doc("Payment Entry", row.payment_entry)
-                    if pe.docstatus == 1:
-                        pe.cancel()
-
-        # Cancel Journal Entries
-        if hasattr(self, "reservation_journal_entry"):
-            for row in self.reservation_journal_entry:
-                if row.journal_entry:
-                    je = frappe.get_doc("Journal Entry", row.journal_entry)
-                    if je.docstatus == 1:
-                        je.cancel()
-
-        # Cancel Sales Invoices
-        if hasattr(self, "reservation_sales_invoice"):
-            for row in self.reservation_sales_invoice:
-                if row.sales_invoice:
-                    si = frappe.get_doc("Sales Invoice", row.sales_invoice)
-                    if si.docstatus == 1:
-                        si.cancel()
-
-        # Cancel Stock Entries
-        if hasattr(self, "reservation_stock_entries"):
-            for row in self.reservation_stock_entries:
-                if row.stock_entry:
-                    se = frappe.get_doc("Stock Entry", row.stock_entry)
-                    if se.docstatus == 1:
-                        se.cancel()
+    def validate_deposit(self, profile):
+        """Check everything the deposit Payment Entry needs and return its account."""
+        if not self.mode_of_payment:
+            frappe.throw(_("Mode of Payment is required for deposit payment"))
+        if not self.company:
+            frappe.throw(_("Company is required for deposit payment"))
+        if not self.currency:
+            frappe.throw(_("Currency is required for deposit payment"))
+        if not self.customer:
+            frappe.throw(_("Customer is required for deposit payment"))
+        if not self.branch:
+            frappe.throw(_("Branch is required for deposit payment"))
+
+        # Resolve Mode of Payment Account
+        mop_account = profile.get_mop_account(self.mode_of_payment, self.company)
+
+        if not mop_account:
+            frappe.throw(
+                _("No account configured in Mode of Payment: {0}").format(
+                    self.mode_of_payment
+                )
+            )
+
+        return mop_account
+
+    def make_deposit_payment(self, mop_account):
+        # Reservation datetime
+        reservation_dt = get_datetime(self.reservation_date)
+        reservation_date_only = reservation_dt.date()
+
+        # Create Payment Entry (Deposit)
+        pe = frappe.new_doc("Payment Entry")
+        pe.payment_type = "Receive"
+        pe.party_type = "Customer"
+        pe.party = self.customer
+        pe.company = self.company
+        pe.posting_date = reservation_date_only
+        pe.currency = self.currency
+        pe.paid_to = mop_account
+
+        pe.mode_of_payment = self.mode_of_payment
+        pe.reference_no = self.name
+        pe.reference_date = reservation_date_only
+
+        pe.paid_amount = self.deposit_amount
+        pe.received_amount = self.deposit_amount
+
+        pe.flags.ignore_mandatory = True
+        pe.insert()
+        pe.submit()
+
+        self.append(
+            "reservation_payments",
+            {
+                "payment_entry": pe.name,
+                "description": "Deposit Payment",
+                "payment_mode": pe.mode_of_payment,
+                "amount": pe.paid_amount,
+                "type": "Receive",
+            },
+        )
+
+        self.paid_amount = self.deposit_amount
+        self.outstanding_amount = flt(self.total_estimated_rent) - flt(
+            self.deposit_amount
+        )
+
+    def on_submit(self):
+        """Book the reserved items in the occupancy ledger."""
+        sync_reservation_occupancy(self)
+        update_branch_summary(self)
+
+    def before_update_after_submit(self):
+        """A workflow that failed halfway has vouchers this saved copy does not link yet."""
+        if not self.flags.in_reservation_workflow:
+            check_no_unfinished_workflow(self.name)
+
+    def on_update_after_submit(self):
+        """Keep the occupancy ledger and branch summary in step with delivery / return."""
+        sync_reservation_occupancy(self)
+        update_branch_summary(self)
+
+    def cancel_related_records(self, vouchers=None, workflow=None, progress=None):
+        """
+        Cancel the linked Sales Invoices, Journal Entries, Payment Entries and
+        Stock Entries in dependency order. Stock Entries shared with other
+        reservations (bulk delivery / return) and daily consolidated income
+        vouchers are reversed for this reservation only instead of cancelled.
+        """
+        vouchers = get_vouchers_to_cancel(self) if vouchers is None else vouchers
+
+        for count, voucher in enumerate(vouchers, start=1):
+            if voucher.action == "reverse" and voucher.purpose == "Return":
+                run_step(
+                    workflow,
+                    f"reverse:{voucher.doctype}:{voucher.name}",
+                    lambda: reverse_shared_return(self, voucher.name),
+                )
+            elif voucher.action == "reverse" and voucher.doctype == "Stock Entry":
+                run_step(
+                    workflow,
+                    f"reverse:{voucher.doctype}:{voucher.name}",
+                    lambda: reverse_shared_delivery(self, voucher.name),
+                )
+            elif voucher.action == "reverse":
+                run_step(
+                    workflow,
+                    f"reverse:{voucher.doctype}:{voucher.name}",
+                    lambda: reverse_consolidated_income(
+                        self, voucher.doctype, voucher.name
+                    ),
+                )
+            else:
+                run_step(
+                    workflow,
+                    f"cancel:{voucher.doctype}:{voucher.name}",
+                    lambda: frappe.get_doc(voucher.doctype, voucher.name).cancel(),
+                )
+
+            if progress:
+                progress(count, len(vouchers), voucher)
 
     def before_cancel(self):
         """Update reservation status before cancel."""
+        # Vouchers of a half-done workflow are not linked yet, so they would not be cancelled
+        if not self.flags.in_reservation_workflow:
+            check_no_unfinished_workflow(self.name)
+
         self.reservation_status = "Cancelled"
 
         frappe.msgprint(
@@ -133,5 +187,315 @@ class SuitReservation(Document):
         )
 
     def on_cancel(self):
-        """Cancel all related financial and stock documents."""
-        self.cancel_related_records()
+        """
+        Cancel all related financial and stock documents, unless
+        run_cancellation_job already did before cancelling the reservation.
+        """
+        cancel_pending_income(self.name)
+
+        if not self.flags.linked_vouchers_cancelled:
+            self.cancel_related_records()
+
+        sync_reservation_occupancy(self)
+        update_branch_summary(self)
+
+
+# ----------------------------------------------------
+# Cancellation of linked vouchers
+# ----------------------------------------------------
+
+# Reservations with more linked vouchers than this are cancelled on a worker
+CANCEL_IN_BACKGROUND_THRESHOLD = 8
+
+# Invoices and JEs first so no payment is still allocated when it is cancelled
+CANCEL_ORDER = (
+    ("Sales Invoice", "reservation_sales_invoice", "sales_invoice"),
+    ("Journal Entry", "reservation_journal_entry", "journal_entry"),
+    ("Payment Entry", "reservation_payments", "payment_entry"),
+)
+
+
+def get_vouchers_to_cancel(doc):
+    """
+    Submitted vouchers linked to a reservation, in the order they must be
+    cancelled: invoices / JEs, payments, then return Stock Entries before
+    delivery ones, latest first. Stock Entries carry their purpose (Delivery
+    or Return) from the entry type of their link rows. Docstatus is read with
+    one query per doctype.
+    """
+    vouchers = []
+    consolidated = get_shared_income_vouchers(doc.name)
+
+    for doctype, table, fieldname in CANCEL_ORDER:
+        names = list({row.get(fieldname) for row in doc.get(table) or [] if row.get(fieldname)})
+        if not names:
+            continue
+
+        for name in frappe.get_all(
+            doctype,
+            filters={"name": ["in", names], "docstatus": 1},
+            order_by="creation desc",
+            pluck="name",
+        ):
+            vouchers.append(
+                frappe._dict(
+                    doctype=doctype,
+                    name=name,
+                    action="reverse" if name in consolidated else "cancel",
+                )
+            )
+
+    stock_entries = list(
+        {row.stock_entry for row in doc.reservation_stock_entries if row.stock_entry}
+    )
+    if stock_entries:
+        shared = get_shared_stock_entries(doc.name, stock_entries)
+        returns = {
+            row.stock_entry
+            for row in doc.reservation_stock_entries
+            if (row.entry_type or "").startswith("Return")
+        }
+
+        stock_vouchers = [
+            frappe._dict(
+                doctype="Stock Entry",
+                name=name,
+                action="reverse" if name in shared else "cancel",
+                purpose="Return" if name in returns else "Delivery",
+            )
+            for name in frappe.get_all(
+                "Stock Entry",
+                filters={"name": ["in", stock_entries], "docstatus": 1},
+                order_by="posting_date desc, posting_time desc, creation desc",
+                pluck="name",
+            )
+        ]
+        # Items must be back in customer stock before the delivery is undone
+        stock_vouchers.sort(key=lambda voucher: voucher.purpose != "Return")
+        vouchers.extend(stock_vouchers)
+
+    return vouchers
+
+
+def get_shared_stock_entries(reservation, stock_entries):
+    """
+    Stock Entries that also moved stock for other reservations. Once one of
+    them has been reversed the entry must never be cancelled, so cancelled
+    reservations count too.
+    """
+    return set(
+        frappe.db.sql_list(
+            """
+            SELECT DISTINCT rse.stock_entry
+            FROM `tabReservation Stock Entry` rse
+            JOIN `tabSuit Reservation` sr ON sr.name = rse.parent
+            WHERE rse.parenttype = 'Suit Reservation'
+              AND rse.stock_entry IN %(stock_entries)s
+              AND rse.parent != %(reservation)s
+              AND sr.docstatus > 0
+            """,
+            {"stock_entries": stock_entries, "reservation": reservation},
+        )
+    )
+
+
+def reverse_shared_delivery(doc, stock_entry):
+    """Move this reservation's items back to the branch store without touching the shared entry."""
+    se = frappe.new_doc("Stock Entry")
+    se.stock_entry_type = "Material Transfer"
+    se.company = doc.company
+    se.remarks = _("Reverses {0} for cancelled reservation {1}").format(
+        stock_entry, doc.name
+    )
+
+    for item in doc.reservation_items:
+        row = {
+            "item_code": item.item_code,
+            "qty": 1,
+            "uom": item.uom or "Nos",
+            "s_warehouse": doc.customer_stock_warehouse,
+            "t_warehouse": doc.source_warehouse,
+            "use_serial_batch_fields": 1,
+        }
+
+        if item.serial_no:
+            row["serial_no"] = item.serial_no
+        if item.batch_no:
+            row["batch_no"] = item.batch_no
+
+        se.append("items", row)
+
+    se.flags.ignore_mandatory = True
+    se.insert()
+    se.submit()
+
+
+def get_return_reversal_rows(doc, links, details):
+    """
+    Stock Entry rows that undo this reservation's part of a shared return
+    entry. `links` are the reservation's link rows of the entry and `details`
+    the entry's Stock Entry Detail rows. Transferred items go back from their
+    target warehouse to customer stock, lost (issued) items are received into
+    customer stock again at their valuation rate.
+    """
+    unmatched = list(details)
+    rows = []
+
+    for link in links:
+        if link.serial_no:
+            detail = next(
+                (d for d in unmatched if (d.serial_no or "").strip() == link.serial_no),
+                None,
+            )
+        else:
+            detail = next(
+                (
+                    d
+                    for d in unmatched
+                    if d.item_code == link.item_code and not (d.serial_no or "").strip()
+                ),
+                None,
+            )
+
+        if not detail:
+            frappe.throw(
+                _("Stock Entry {0} has no row for {1} of reservation {2}").format(
+                    link.stock_entry, link.serial_no or link.item_code, doc.name
+                )
+            )
+
+        unmatched.remove(detail)
+        row = {
+            "item_code": detail.item_code,
+            "qty": detail.qty,
+            "uom": detail.uom,
+            "t_warehouse": detail.s_warehouse,
+            "use_serial_batch_fields": 1,
+            "serial_no": detail.serial_no or "",
+            "batch_no": detail.batch_no or "",
+        }
+
+        if detail.t_warehouse:
+            row["s_warehouse"] = detail.t_warehouse
+        else:
+            row["basic_rate"] = detail.valuation_rate
+
+        rows.append(row)
+
+    return rows
+
+
+def reverse_shared_return(doc, stock_entry):
+    """Move this reservation's returned items back to customer stock without touching the shared entry."""
+    purpose = frappe.db.get_value("Stock Entry", stock_entry, "purpose")
+    links = [row for row in doc.reservation_stock_entries if row.stock_entry == stock_entry]
+    details = frappe.get_all(
+        "Stock Entry Detail",
+        filters={"parent": stock_entry, "parenttype": "Stock Entry"},
+        fields=[
+            "item_code",
+            "qty",
+            "uom",
+            "serial_no",
+            "batch_no",
+            "s_warehouse",
+            "t_warehouse",
+            "valuation_rate",
+        ],
+        order_by="idx",
+    )
+
+    se = frappe.new_doc("Stock Entry")
+    se.stock_entry_type = (
+        "Material Receipt" if purpose == "Material Issue" else "Material Transfer"
+    )
+    se.company = doc.company
+    se.remarks = _("Reverses {0} for cancelled reservation {1}").format(
+        stock_entry, doc.name
+    )
+
+    for row in get_return_reversal_rows(doc, links, details):
+        se.append("items", row)
+
+    se.flags.ignore_mandatory = True
+    se.insert()
+    se.submit()
+
+
+@frappe.whitelist()
+def queue_cancellation(name):
+    """
+    Cancel a reservation with more than CANCEL_IN_BACKGROUND_THRESHOLD linked
+    vouchers on a worker. Returns False for smaller reservations, which the
+    caller cancels as usual.
+    """
+    doc = frappe.get_doc("Suit Reservation", name)
+    doc.check_permission("cancel")
+
+    if doc.docstatus != 1:
+        frappe.throw(_("Only submitted reservations can be cancelled"))
+
+    check_no_unfinished_workflow(name)
+
+    vouchers = get_vouchers_to_cancel(doc)
+    if len(vouchers) <= CANCEL_IN_BACKGROUND_THRESHOLD:
+        return False
+
+    frappe.enqueue(
+        "suit_rental.suit_rental.doctype.suit_reservation.suit_reservation.run_cancellation_job",
+        queue="short",
+        timeout=1500,
+        job_id=f"suit-rental-cancellation-{name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        reservation=name,
+    )
+    frappe.msgprint(
+        _(
+            "{0} linked vouchers are being cancelled in the background. The reservation is cancelled once they are done."
+        ).format(len(vouchers)),
+        indicator="blue",
+    )
+
+    return True
+
+
+def cancel_reservation_last(doc):
+    # Nothing linked is left submitted, so on_cancel has no vouchers to cancel
+    doc.flags.linked_vouchers_cancelled = True
+    doc.cancel()
+
+
+def run_cancellation_workflow(doc, params, workflow, progress=None):
+    """Cancel the linked vouchers one step at a time, then the reservation itself."""
+
+    def report(count, total, voucher):
+        if progress:
+            progress(
+                count * 100 / (total + 1),
+                _("{0} {1} cancelled").format(_(voucher.doctype), voucher.name),
+            )
+
+    doc.cancel_related_records(workflow=workflow, progress=report)
+    run_step(workflow, "cancel:Suit Reservation", lambda: cancel_reservation_last(doc))
+
+
+def run_cancellation_job(reservation):
+    def progress(percent, message):
+        frappe.publish_progress(
+            percent,
+            title=_("Cancelling linked vouchers"),
+            doctype="Suit Reservation",
+            docname=reservation,
+            description=message,
+        )
+
+    if frappe.db.get_value("Suit Reservation", reservation, "docstatus") != 1:
+        return
+
+    try:
+        run_workflow("Cancellation", reservation, {}, progress)
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(title=f"Suit Reservation cancellation failed: {reservation}")
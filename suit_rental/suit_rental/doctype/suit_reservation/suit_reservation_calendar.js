@@ -0,0 +1,27 @@
+frappe.views.calendar["Suit Reservation"] = {
+	field_map: {
+		start: "reservation_from",
+		end: "reservation_to",
+		id: "name",
+		title: "customer_name",
+		status: "reservation_status",
+	},
+	gantt: true,
+	order_by: "reservation_from",
+	filters: [
+		{
+			fieldtype: "Link",
+			fieldname: "branch",
+			options: "Branch",
+			label: __("Branch"),
+		},
+		{
+			fieldtype: "Select",
+			fieldname: "reservation_status",
+			options: "\nReserved\nDelivered\nReturned\nCancelled",
+			label: __("Reservation Status"),
+		},
+	],
+	// Reservations, plus the free units of the filtered branch as day backgrounds
+	get_events_method: "suit_rental.api.get_reservation_calendar_events",
+};
@@ -1,5 +1,24 @@
 frappe.listview_settings["Suit Reservation"] = {
 	add_fields: ["reservation_status"],
+	onload: function (listview) {
+		listview.page.add_action_item(__("Deliver"), function () {
+			let names = listview
+				.get_checked_items()
+				.filter((d) => d.docstatus === 1 && d.reservation_status === "Reserved")
+				.map((d) => d.name);
+
+			if (!names.length) {
+				frappe.msgprint(__("Select submitted reservations in Reserved status"));
+				return;
+			}
+
+			bulk_deliver_reservations(listview, names);
+		});
+
+		listview.page.add_menu_item(__("Export with Items"), function () {
+			export_reservations_dialog();
+		});
+	},
 	has_indicator_for_draft: 1, // Optional: Show draft indicator if applicable
 	get_indicator: function (doc) {
 		// Define indicator based on reservation_status
@@ -24,3 +43,199 @@ frappe.listview_settings["Suit Reservation"] = {
 		return [__("No Status"), "gray", "reservation_status,=,No Status"];
 	},
 };
+
+function bulk_deliver_reservations(listview, names) {
+	let dialog = new frappe.ui.Dialog({
+		title: __("Deliver {0} Reservations", [names.length]),
+		fields: [
+			{
+				label: __("Delivery Date"),
+				fieldname: "delivery_date",
+				fieldtype: "Datetime",
+				default: frappe.datetime.now_datetime(),
+				reqd: 1,
+			},
+			{
+				label: __("Mode of Payment"),
+				fieldname: "mode_of_payment",
+				fieldtype: "Link",
+				options: "Mode of Payment",
+				reqd: 1,
+			},
+		],
+		primary_action_label: __("Deliver"),
+		primary_action(values) {
+			dialog.hide();
+			frappe.call({
+				method: "suit_rental.api.deliver_reservations_bulk",
+				args: {
+					names: names,
+					delivery_date: values.delivery_date,
+					mode_of_payment: values.mode_of_payment,
+				},
+				callback: function (r) {
+					if (!r.message) return;
+					listview.clear_checked_items();
+					follow_bulk_delivery_job(listview, r.message.job_id, r.message.status);
+				},
+			});
+		},
+	});
+	dialog.show();
+}
+
+function follow_bulk_delivery_job(listview, job_id, status) {
+	let title = __("Delivering Reservations");
+
+	let show = (data) => {
+		if (!data) return false;
+
+		if (data.status === "Completed") {
+			frappe.hide_progress();
+			frappe.realtime.off("suit_rental_delivery_progress", handler);
+			show_bulk_delivery_results(data.results || {});
+			listview.refresh();
+			return true;
+		}
+
+		if (data.status === "Failed") {
+			frappe.hide_progress();
+			frappe.realtime.off("suit_rental_delivery_progress", handler);
+			frappe.msgprint({
+				title: __("Bulk Delivery Failed"),
+				message: data.message,
+				indicator: "red",
+			});
+			return true;
+		}
+
+		frappe.show_progress(title, data.progress, 100, data.message);
+		return false;
+	};
+
+	let handler = (data) => {
+		if (data.job_id === job_id) show(data);
+	};
+
+	if (show(status)) return;
+	frappe.realtime.on("suit_rental_delivery_progress", handler);
+}
+
+function show_bulk_delivery_results(results) {
+	let rows = Object.entries(results)
+		.map(([name, result]) => {
+			let color = result.status === "Delivered" ? "green" : "red";
+			let detail = result.status === "Delivered" ? result.stock_entry : result.message;
+			return `<tr>
+				<td>${frappe.utils.get_form_link("Suit Reservation", name, true)}</td>
+				<td><span class="indicator-pill ${color}">${__(result.status)}</span></td>
+				<td>${frappe.utils.escape_html(detail || "")}</td>
+			</tr>`;
+		})
+		.join("");
+
+	frappe.msgprint({
+		title: __("Bulk Delivery"),
+		message: `<table class="table table-bordered">
+			<thead><tr>
+				<th>${__("Reservation")}</th><th>${__("Status")}</th><th>${__("Details")}</th>
+			</tr></thead>
+			<tbody>${rows}</tbody>
+		</table>`,
+		wide: true,
+	});
+}
+
+function export_reservations_dialog() {
+	let dialog = new frappe.ui.Dialog({
+		title: __("Export Reservations"),
+		fields: [
+			{
+				label: __("From Date"),
+				fieldname: "from_date",
+				fieldtype: "Date",
+				default: frappe.datetime.month_start(),
+			},
+			{
+				label: __("To Date"),
+				fieldname: "to_date",
+				fieldtype: "Date",
+				default: frappe.datetime.month_end(),
+			},
+			{
+				label: __("Branch"),
+				fieldname: "branch",
+				fieldtype: "Link",
+				options: "Branch",
+			},
+			{
+				label: __("Status"),
+				fieldname: "reservation_status",
+				fieldtype: "Select",
+				options: ["", "Reserved", "Delivered", "Returned", "Cancelled"],
+			},
+			{
+				label: __("Format"),
+				fieldname: "file_format",
+				fieldtype: "Select",
+				options: ["CSV", "Excel"],
+				default: "CSV",
+				reqd: 1,
+			},
+			{
+				label: __("Prepare in Background"),
+				fieldname: "in_background",
+				fieldtype: "Check",
+				description: __("For long periods. You will be notified when the file is ready."),
+			},
+		],
+		primary_action_label: __("Export"),
+		primary_action(values) {
+			dialog.hide();
+			let args = {
+				from_date: values.from_date || "",
+				to_date: values.to_date || "",
+				branch: values.branch || "",
+				reservation_status: values.reservation_status || "",
+				file_format: values.file_format,
+			};
+
+			frappe.realtime.off("suit_rental_export_ready");
+			frappe.realtime.on("suit_rental_export_ready", function (data) {
+				frappe.realtime.off("suit_rental_export_ready");
+				if (data.error) {
+					frappe.msgprint({ title: __("Export Failed"), message: data.error, indicator: "red" });
+					return;
+				}
+				frappe.msgprint({
+					title: __("Export Ready"),
+					message: `<a href="${encodeURI(data.file_url)}" target="_blank">${frappe.utils.escape_html(
+						data.file_name
+					)}</a>`,
+					indicator: "green",
+				});
+			});
+
+			// Large exports are prepared in the background even when not asked to
+			frappe.call({
+				method: "suit_rental.export.start_reservation_export",
+				args: Object.assign({ in_background: values.in_background ? 1 : 0 }, args),
+				callback: function (r) {
+					if (!r.message || !r.message.queued) {
+						frappe.realtime.off("suit_rental_export_ready");
+						// An attachment response downloads without leaving the list
+						window.location.href =
+							"/api/method/suit_rental.export.export_reservations?" + $.param(args);
+						return;
+					}
+
+					frappe.show_alert({
+						message: __("Export queued. You will be notified when it is ready."),
+						indicator: "blue",
+					});
+				},
+			});
+		},
+	});
+	dialog.show();
+}
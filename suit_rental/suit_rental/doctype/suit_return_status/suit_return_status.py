@@ -1,9 +1,70 @@
 # Copyright (c) 2025, Ahmed Yousef and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
+# Every Suit Return Status keyed by name, kept in the site cache
+RETURN_STATUS_CACHE_KEY = "suit_rental:suit_return_status"
+
+RETURN_STATUS_FIELDS = (
+	"name",
+	"status_name",
+	"status_code",
+	"type",
+	"branch",
+	"company",
+	"active",
+	"post_income_as",
+	"allow_edit_penalty",
+	"damage_warehouse",
+	"income_account",
+	"income_item",
+)
+
 
 class SuitReturnStatus(Document):
-	pass
+	def on_update(self):
+		clear_return_status_cache()
+
+	def on_trash(self):
+		clear_return_status_cache()
+
+
+def clear_return_status_cache():
+	frappe.cache.delete_value(RETURN_STATUS_CACHE_KEY)
+	frappe.db.after_commit.add(lambda: frappe.cache.delete_value(RETURN_STATUS_CACHE_KEY))
+
+
+def get_all_return_statuses():
+	def generator():
+		return {
+			row.name: row for row in frappe.get_all("Suit Return Status", fields=list(RETURN_STATUS_FIELDS))
+		}
+
+	return frappe.cache.get_value(RETURN_STATUS_CACHE_KEY, generator)
+
+
+def get_return_status_map(names):
+	"""Return {name: status} for the given Suit Return Status names, from the site cache."""
+	statuses = get_all_return_statuses()
+	missing = [name for name in set(names) if name and name not in statuses]
+
+	if missing:
+		# Created since the cache was built
+		frappe.cache.delete_value(RETURN_STATUS_CACHE_KEY)
+		statuses = get_all_return_statuses()
+
+	return {name: statuses[name] for name in set(names) if name in statuses}
+
+
+@frappe.whitelist()
+def get_return_statuses(branch=None):
+	"""Active return statuses of a branch for the return dialog, keyed by name."""
+	frappe.has_permission("Suit Return Status", "read", throw=True)
+
+	return {
+		name: status
+		for name, status in get_all_return_statuses().items()
+		if status.active and (not branch or status.branch == branch)
+	}
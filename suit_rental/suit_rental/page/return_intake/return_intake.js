@@ -0,0 +1,289 @@
+frappe.pages["return-intake"].on_page_load = function (wrapper) {
+	let page = frappe.ui.make_app_page({
+		parent: wrapper,
+		title: __("Return Intake"),
+		single_column: true,
+	});
+
+	wrapper.return_intake = new ReturnIntake(page);
+};
+
+frappe.pages["return-intake"].on_page_show = function (wrapper) {
+	wrapper.return_intake && wrapper.return_intake.focus();
+};
+
+class ReturnIntake {
+	constructor(page) {
+		this.page = page;
+		// reservation name -> {reservation, items, scanned: {row: {return_status, penalty_amount}}}
+		this.reservations = {};
+		this.statuses = {};
+		this.make();
+	}
+
+	make() {
+		this.branch = this.page.add_field({
+			label: __("Branch"),
+			fieldname: "branch",
+			fieldtype: "Link",
+			options: "Branch",
+			change: () => {
+				if (this.branch.get_value() !== this.statuses_branch) this.load_statuses();
+			},
+		});
+
+		this.return_datetime = this.page.add_field({
+			label: __("Return Date"),
+			fieldname: "return_datetime",
+			fieldtype: "Datetime",
+			default: frappe.datetime.now_datetime(),
+		});
+
+		this.scan = this.page.add_field({
+			label: __("Scan Serial No"),
+			fieldname: "scan",
+			fieldtype: "Data",
+			options: "Barcode",
+		});
+
+		$(this.scan.input).on("keydown", (e) => {
+			if (e.key === "Enter") {
+				e.preventDefault();
+				this.on_scan(this.scan.get_value());
+				this.scan.set_value("");
+			}
+		});
+
+		this.page.set_primary_action(__("Return Complete"), () => this.submit());
+		this.page.set_secondary_action(__("Clear"), () => {
+			this.reservations = {};
+			this.render();
+		});
+
+		this.$body = $(`<div class="return-intake frappe-card p-3"></div>`).appendTo(
+			this.page.main
+		);
+		this.$body.on("change", "select[data-row]", (e) => {
+			let $select = $(e.currentTarget);
+			let entry = this.reservations[$select.attr("data-reservation")];
+			this.set_row_status(entry, $select.attr("data-row"), $select.val());
+			this.render();
+		});
+
+		this.render();
+	}
+
+	focus() {
+		this.scan && this.scan.$input.focus();
+	}
+
+	load_statuses() {
+		let branch = this.branch.get_value();
+		this.statuses_branch = branch;
+		return frappe
+			.xcall(
+				"suit_rental.suit_rental.doctype.suit_return_status.suit_return_status.get_return_statuses",
+				{ branch: branch }
+			)
+			.then((statuses) => {
+				this.statuses = statuses || {};
+				this.render();
+			});
+	}
+
+	default_status() {
+		return Object.values(this.statuses).find((status) => status.type === "Good");
+	}
+
+	on_scan(serial_no) {
+		serial_no = (serial_no || "").trim();
+		if (!serial_no) return;
+
+		let known = this.find_scanned(serial_no);
+		if (known) {
+			frappe.show_alert({ message: __("{0} already scanned", [serial_no]), indicator: "orange" });
+			return;
+		}
+
+		frappe
+			.xcall("suit_rental.api.resolve_return_scan", {
+				serial_no: serial_no,
+				branch: this.branch.get_value(),
+			})
+			.then((reservation) => {
+				if (!this.branch.get_value()) {
+					// Statuses are per branch, take it from the first scan
+					return this.branch
+						.set_value(reservation.branch)
+						.then(() => this.load_statuses())
+						.then(() => reservation);
+				}
+				return reservation;
+			})
+			.then((reservation) => {
+				let entry = this.reservations[reservation.name];
+				if (!entry) {
+					entry = this.reservations[reservation.name] = {
+						reservation: reservation,
+						items: reservation.items,
+						scanned: {},
+					};
+				}
+
+				let status = this.default_status();
+				this.set_row_status(entry, reservation.row, status && status.name);
+				this.render();
+			})
+			.catch(() => frappe.utils.play_sound("error"))
+			.finally(() => this.focus());
+	}
+
+	find_scanned(serial_no) {
+		return Object.values(this.reservations).find((entry) =>
+			entry.items.some((item) => item.serial_no === serial_no && entry.scanned[item.name])
+		);
+	}
+
+	set_row_status(entry, row_name, status_name) {
+		let item = entry.items.find((d) => d.name === row_name);
+		let status = this.statuses[status_name] || {};
+		let penalty = 0;
+
+		if (status.type === "Lost") penalty = flt(item.lost_penalty_amount);
+		if (status.type === "Damage") penalty = flt(item.damage_penalty_amount);
+
+		entry.scanned[row_name] = { return_status: status_name, penalty_amount: penalty };
+	}
+
+	is_complete(entry) {
+		return entry.items.every(
+			(item) => entry.scanned[item.name] && entry.scanned[item.name].return_status
+		);
+	}
+
+	render() {
+		let entries = Object.values(this.reservations);
+		if (!entries.length) {
+			this.$body.html(
+				`<div class="text-muted text-center p-5">${__("Scan a serial number to start")}</div>`
+			);
+			return;
+		}
+
+		let options = Object.values(this.statuses)
+			.map((status) => `<option value="${status.name}">${frappe.utils.escape_html(status.status_name || status.name)}</option>`)
+			.join("");
+
+		this.$body.html(
+			entries
+				.map((entry) => {
+					let reservation = entry.reservation;
+					let complete = this.is_complete(entry);
+					let rows = entry.items
+						.map((item) => {
+							let scan = entry.scanned[item.name];
+							let status_cell = scan
+								? `<select class="form-control input-xs" data-reservation="${reservation.name}" data-row="${item.name}">${options}</select>`
+								: `<span class="text-muted">${__("Not scanned")}</span>`;
+
+							return `<tr>
+								<td>${frappe.utils.escape_html(item.serial_no || "")}</td>
+								<td>${frappe.utils.escape_html(item.item_name || item.item_code)}</td>
+								<td>${status_cell}</td>
+								<td class="text-right">${scan ? format_currency(scan.penalty_amount, reservation.currency) : ""}</td>
+							</tr>`;
+						})
+						.join("");
+
+					return `<div class="mb-4">
+						<h5>
+							${frappe.utils.get_form_link("Suit Reservation", reservation.name, true)}
+							<span class="text-muted">${frappe.utils.escape_html(reservation.customer_name || reservation.customer)}</span>
+							<span class="indicator-pill ${complete ? "green" : "orange"}">
+								${complete ? __("Complete") : __("{0} of {1} scanned", [Object.keys(entry.scanned).length, entry.items.length])}
+							</span>
+						</h5>
+						<table class="table table-bordered table-condensed">
+							<thead><tr>
+								<th>${__("Serial No")}</th><th>${__("Item")}</th>
+								<th>${__("Return Status")}</th><th class="text-right">${__("Penalty")}</th>
+							</tr></thead>
+							<tbody>${rows}</tbody>
+						</table>
+					</div>`;
+				})
+				.join("")
+		);
+
+		// Selects are rendered without a selection, set the scanned values
+		this.$body.find("select[data-row]").each((i, select) => {
+			let entry = this.reservations[$(select).attr("data-reservation")];
+			$(select).val(entry.scanned[$(select).attr("data-row")].return_status);
+		});
+	}
+
+	submit() {
+		let complete = Object.values(this.reservations).filter((entry) => this.is_complete(entry));
+		if (!complete.length) {
+			frappe.msgprint(__("No reservation has all of its items scanned yet"));
+			return;
+		}
+
+		let returns = complete.map((entry) => ({
+			reservation: entry.reservation.name,
+			items: Object.entries(entry.scanned).map(([name, scan]) => ({
+				name: name,
+				return_status: scan.return_status,
+				penalty_amount: scan.penalty_amount,
+			})),
+		}));
+
+		frappe.call({
+			method: "suit_rental.api.return_reservations_bulk",
+			args: {
+				returns: returns,
+				actual_return_datetime: this.return_datetime.get_value(),
+			},
+			freeze: true,
+			freeze_message: __("Returning Reservations..."),
+			callback: (r) => {
+				if (!r.message) return;
+
+				Object.entries(r.message).forEach(([name, result]) => {
+					if (result.status === "Returned") delete this.reservations[name];
+				});
+				this.show_results(r.message);
+				this.render();
+				this.focus();
+			},
+		});
+	}
+
+	show_results(results) {
+		let rows = Object.entries(results)
+			.map(([name, result]) => {
+				let color = result.status === "Returned" ? "green" : "red";
+				let detail =
+					result.status === "Returned"
+						? (result.stock_entries || []).join(", ")
+						: result.message;
+				return `<tr>
+					<td>${frappe.utils.get_form_link("Suit Reservation", name, true)}</td>
+					<td><span class="indicator-pill ${color}">${__(result.status)}</span></td>
+					<td>${frappe.utils.escape_html(detail || "")}</td>
+				</tr>`;
+			})
+			.join("");
+
+		frappe.msgprint({
+			title: __("Return Intake"),
+			message: `<table class="table table-bordered">
+				<thead><tr>
+					<th>${__("Reservation")}</th><th>${__("Status")}</th><th>${__("Details")}</th>
+				</tr></thead>
+				<tbody>${rows}</tbody>
+			</table>`,
+			wide: true,
+		});
+	}
+}
@@ -1,6 +1,7 @@
-import frappe
 from frappe import _
 
+from suit_rental.suit_rental.report.utils import count_reservations, get_page_summary, get_reservation_page
+
 
 def execute(filters=None):
 	if not filters:
@@ -22,28 +23,25 @@ def execute(filters=None):
 	# Only active reservations
 	conditions.append("reservation_status = 'Reserved'")
 
-	condition_str = " AND ".join(conditions)
-
-	data = frappe.db.sql(
-		f"""
-        SELECT
-            name,
-            customer_name,
-            mobile_number,
-            reservation_date,
-            reservation_from,
-            reservation_to,
-            reservation_status,
-            total_estimated_rent,
-            deposit_amount,
-            branch
-        FROM `tabSuit Reservation`
-        WHERE {condition_str}
-        ORDER BY reservation_from
-    """,
+	data, has_more = get_reservation_page(
+		filters,
+		[
+			"name",
+			"customer_name",
+			"mobile_number",
+			"reservation_date",
+			"reservation_from",
+			"reservation_to",
+			"reservation_status",
+			"total_estimated_rent",
+			"deposit_amount",
+			"branch",
+		],
+		conditions,
 		params,
-		as_dict=True,
+		"reservation_from",
 	)
+	total = count_reservations(conditions, params)
 
 	columns = [
 		{"label": _("Branch"), "fieldname": "branch", "fieldtype": "Link", "options": "Branch", "width": 180},
@@ -66,4 +64,4 @@ def execute(filters=None):
 		{"label": _("Deposit Amount"), "fieldname": "deposit_amount", "fieldtype": "Currency", "width": 140},
 	]
 
-	return columns, data
+	return columns, data, None, None, get_page_summary(total, data, has_more)
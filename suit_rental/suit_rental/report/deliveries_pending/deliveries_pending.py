@@ -1,6 +1,8 @@
-import frappe
 from frappe import _
 
+from suit_rental.suit_rental.report.utils import count_reservations, get_page_summary, get_reservation_page
+from suit_rental.summary import get_branch_summary
+
 
 def execute(filters=None):
 	if not filters:
@@ -19,28 +21,26 @@ def execute(filters=None):
 		conditions.append("branch = %(branch)s")
 		params["branch"] = branch
 
-	# Exclude already delivered
-	conditions.append("reservation_status != 'Delivered'")
-
-	condition_str = " AND ".join(conditions)
-
-	data = frappe.db.sql(
-		f"""
-        SELECT
-            name,
-            customer_name,
-            reservation_from,
-            reservation_to,
-            reservation_status,
-            branch
-        FROM `tabSuit Reservation`
-        WHERE {condition_str}
-        ORDER BY reservation_from
-    """,
+	# Exclude already delivered (as the statuses left, so the status index is used)
+	conditions.append("reservation_status IN ('Reserved', 'Returned')")
+
+	data, has_more = get_reservation_page(
+		filters,
+		["name", "customer_name", "reservation_from", "reservation_to", "reservation_status", "branch"],
+		conditions,
 		params,
-		as_dict=True,
+		"reservation_from",
 	)
 
+	if date:
+		# Pre-aggregated in the Branch Daily Summary
+		total = sum(
+			row.deliveries_due - row.deliveries_done
+			for row in get_branch_summary(date, date, branch, fields=("deliveries_due", "deliveries_done"))
+		)
+	else:
+		total = count_reservations(conditions, params)
+
 	columns = [
 		{
 			"label": _("Reservation"),
@@ -56,4 +56,4 @@ def execute(filters=None):
 		{"label": _("Branch"), "fieldname": "branch", "fieldtype": "Link", "options": "Branch", "width": 150},
 	]
 
-	return columns, data
+	return columns, data, None, None, get_page_summary(total, data, has_more)
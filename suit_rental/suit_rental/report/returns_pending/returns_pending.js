@@ -5,12 +5,19 @@ frappe.query_reports["Returns Pending"] = {
 			label: __("Date"),
 			fieldtype: "Date",
 			default: frappe.datetime.get_today(),
+			on_change: (report) => suit_rental.report_pagination.first_page(report),
 		},
 		{
 			fieldname: "branch",
 			label: __("Branch"),
 			fieldtype: "Link",
 			options: "Branch",
+			on_change: (report) => suit_rental.report_pagination.first_page(report),
 		},
+		...suit_rental.report_pagination.filters(),
 	],
+
+	onload(report) {
+		suit_rental.report_pagination.setup(report, "reservation_to");
+	},
 };
@@ -1,10 +1,17 @@
 frappe.query_reports["Suit Reservation Statistics"] = {
 	filters: [
 		{
-			fieldname: "date",
-			label: __("Date"),
+			fieldname: "from_date",
+			label: __("From Date"),
 			fieldtype: "Date",
-			default: frappe.datetime.get_today(),
+			default: frappe.route_options?.date || frappe.datetime.get_today(),
+			reqd: 1,
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+			default: frappe.route_options?.date || frappe.datetime.get_today(),
 			reqd: 1,
 		},
 		{
@@ -1,80 +1,48 @@
 import frappe
-from frappe.utils import getdate
+from frappe import _
+from frappe.utils import add_days, date_diff, getdate
+
+from suit_rental.summary import get_branch_summary
+
+# Longest date range the per-day series is computed for
+MAX_DAYS = 366
 
 
 def execute(filters=None):
 	if not filters:
 		filters = {}
 
-	date = getdate(filters.get("date"))
+	from_date, to_date = get_date_range(filters)
 	branch_filter = filters.get("branch")
+	days = [add_days(from_date, i) for i in range(date_diff(to_date, from_date) + 1)]
 
-	data = []
-
-	if branch_filter:
-		branches = [{"name": branch_filter}]
-	else:
-		branches = frappe.get_all("Branch", fields=["name"])
-
-	for b in branches:
-		branch_name = b["name"]
-
-		# Deliveries Due
-		deliveries_due = frappe.db.count(
-			"Suit Reservation", {"branch": branch_name, "reservation_from": date, "docstatus": 1}, cache=False
-		)
-
-		delivered = frappe.db.count(
-			"Suit Reservation",
-			{
-				"branch": branch_name,
-				"reservation_from": date,
-				"reservation_status": "Delivered",
-				"docstatus": 1,
-			},
-			cache=False,
-		)
-
-		deliveries_pending = deliveries_due - delivered
-
-		# Returns Due
-		returns_due = frappe.db.count(
-			"Suit Reservation", {"branch": branch_name, "reservation_to": date, "docstatus": 1}, cache=False
-		)
-
-		returned = frappe.db.count(
-			"Suit Reservation",
-			{"branch": branch_name, "reservation_to": date, "reservation_status": "Returned", "docstatus": 1},
-			cache=False,
-		)
+	rows = get_statistics(days, branch_filter)
+	series = len(days) > 1
 
-		returns_pending = returns_due - returned
+	data = []
+	for row in rows:
+		date = row.day
+		branch_name = row.branch
 
-		# Active Reservations
-		reserved = frappe.db.sql(
-			"""
-            SELECT COUNT(*) FROM `tabSuit Reservation`
-            WHERE branch = %s
-            AND reservation_status = 'Reserved'
-            AND %s BETWEEN reservation_from AND reservation_to
-            AND docstatus = 1
-        """,
-			(branch_name, date),
-		)[0][0]
+		deliveries_pending = int(row.deliveries_due - row.delivered)
+		returns_pending = int(row.returns_due - row.returned)
+		reserved = int(row.reserved)
 
 		# ? Make counts clickable links
 		deliveries_link = f"<a href='/app/query-report/Deliveries%20Pending?date={date}&branch={branch_name}' target='_blank'>{deliveries_pending}</a>"
 		returns_link = f"<a href='/app/query-report/Returns%20Pending?date={date}&branch={branch_name}' target='_blank'>{returns_pending}</a>"
 		active_link = f"<a href='/app/query-report/Active%20Reservations?date={date}&branch={branch_name}' target='_blank'>{reserved}</a>"
 
-		data.append(
-			{
-				"branch": branch_name,
-				"deliveries_pending": deliveries_link,
-				"returns_pending": returns_link,
-				"reserved": active_link,
-			}
-		)
+		entry = {
+			"branch": branch_name,
+			"deliveries_pending": deliveries_link,
+			"returns_pending": returns_link,
+			"reserved": active_link,
+		}
+		if series:
+			entry["date"] = date
+
+		data.append(entry)
 
 	columns = [
 		{"label": "Branch", "fieldname": "branch", "fieldtype": "Data", "width": 150},
@@ -83,4 +51,83 @@ def execute(filters=None):
 		{"label": "Active Reservations", "fieldname": "reserved", "fieldtype": "Data", "width": 150},
 	]
 
-	return columns, data
+	if not series:
+		return columns, data
+
+	columns.insert(0, {"label": "Date", "fieldname": "date", "fieldtype": "Date", "width": 110})
+
+	return columns, data, None, get_chart(days, rows)
+
+
+def get_date_range(filters):
+	"""from_date / to_date, or the single `date` of older links and dashboards."""
+	from_date = getdate(filters.get("from_date") or filters.get("date"))
+	to_date = getdate(filters.get("to_date") or filters.get("date") or from_date)
+
+	if to_date < from_date:
+		frappe.throw(_("To Date cannot be before From Date"))
+
+	if date_diff(to_date, from_date) >= MAX_DAYS:
+		frappe.throw(_("Date range cannot be longer than {0} days").format(MAX_DAYS))
+
+	return from_date, to_date
+
+
+def get_statistics(days, branch=None):
+	"""
+	Counts per day and branch from the Branch Daily Summary, one row for
+	every day of the range and every branch, with zeros where the summary
+	has no row.
+	"""
+	branches = [branch] if branch else frappe.get_all("Branch", order_by="name", pluck="name")
+
+	summary = {
+		(row.branch, getdate(row.summary_date)): row
+		for row in get_branch_summary(
+			days[0],
+			days[-1],
+			branch,
+			fields=("deliveries_due", "deliveries_done", "returns_due", "returns_done", "active_count"),
+		)
+	}
+
+	rows = []
+	for day in days:
+		for branch_name in branches:
+			row = summary.get((branch_name, day)) or {}
+			rows.append(
+				frappe._dict(
+					day=day,
+					branch=branch_name,
+					deliveries_due=row.get("deliveries_due") or 0,
+					delivered=row.get("deliveries_done") or 0,
+					returns_due=row.get("returns_due") or 0,
+					returned=row.get("returns_done") or 0,
+					reserved=row.get("active_count") or 0,
+				)
+			)
+
+	return rows
+
+
+def get_chart(days, rows):
+	"""Per-day totals over all branches."""
+	totals = {day: [0, 0, 0] for day in days}
+
+	for row in rows:
+		total = totals[getdate(row.day)]
+		total[0] += int(row.deliveries_due - row.delivered)
+		total[1] += int(row.returns_due - row.returned)
+		total[2] += int(row.reserved)
+
+	return {
+		"data": {
+			"labels": [frappe.format(day, "Date") for day in days],
+			"datasets": [
+				{"name": _("Deliveries Pending"), "values": [totals[day][0] for day in days]},
+				{"name": _("Returns Pending"), "values": [totals[day][1] for day in days]},
+				{"name": _("Active Reservations"), "values": [totals[day][2] for day in days]},
+			],
+		},
+		"type": "line",
+	}
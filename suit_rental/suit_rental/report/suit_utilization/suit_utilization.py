@@ -0,0 +1,310 @@
+# Copyright (c) 2026, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+from itertools import groupby
+
+import frappe
+from frappe import _
+from frappe.utils import date_diff, flt, getdate
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+
+	from_date = getdate(filters.from_date)
+	to_date = getdate(filters.to_date)
+	if to_date < from_date:
+		frappe.throw(_("To Date cannot be before From Date"))
+
+	by_item = filters.group_by == "Item"
+	data = get_data(filters, from_date, to_date, by_item)
+
+	return get_columns(by_item), data, None, get_chart(data)
+
+
+def get_columns(by_item):
+	columns = [
+		{"label": _("Item"), "fieldname": "item_code", "fieldtype": "Link", "options": "Item", "width": 160},
+		{"label": _("Item Name"), "fieldname": "item_name", "fieldtype": "Data", "width": 180},
+	]
+
+	if by_item:
+		columns.append({"label": _("Units"), "fieldname": "units", "fieldtype": "Float", "width": 80})
+	else:
+		columns.append(
+			{
+				"label": _("Serial No"),
+				"fieldname": "serial_no",
+				"fieldtype": "Link",
+				"options": "Serial No",
+				"width": 150,
+			}
+		)
+
+	columns += [
+		{"label": _("Reservations"), "fieldname": "reservations", "fieldtype": "Int", "width": 110},
+		{"label": _("Booked Days"), "fieldname": "booked_days", "fieldtype": "Int", "width": 110},
+		{"label": _("Utilization %"), "fieldname": "utilization", "fieldtype": "Percent", "width": 120},
+		{"label": _("Rent Revenue"), "fieldname": "rent_revenue", "fieldtype": "Currency", "width": 130},
+		{
+			"label": _("Penalty Revenue"),
+			"fieldname": "penalty_revenue",
+			"fieldtype": "Currency",
+			"width": 130,
+		},
+		{
+			"label": _("Revenue per Unit"),
+			"fieldname": "revenue_per_unit",
+			"fieldtype": "Currency",
+			"width": 140,
+		},
+		{
+			"label": _("Avg Turnaround (Hours)"),
+			"fieldname": "turnaround_hours",
+			"fieldtype": "Float",
+			"width": 170,
+		},
+	]
+
+	return columns
+
+
+def get_bookings(filters, from_date, to_date):
+	"""
+	Every booking of a rental unit overlapping the period, in one query,
+	ordered by unit and start. The booking window is clipped to the period,
+	rent is pro-rated to the clipped days, and the hours from the return of a
+	serial to its next delivery come from a window function.
+	"""
+	conditions = [
+		"sr.docstatus = 1",
+		"sr.reservation_from <= %(to_date)s",
+		"sr.reservation_to >= %(from_date)s",
+	]
+	if filters.branch:
+		conditions.append("sr.branch = %(branch)s")
+	if filters.item_code:
+		conditions.append("ri.item_code = %(item_code)s")
+
+	return frappe.db.sql(
+		f"""
+		SELECT
+			ri.item_code,
+			ri.item_name,
+			IFNULL(ri.serial_no, '') AS serial_no,
+			GREATEST(sr.reservation_from, %(from_date)s) AS start_date,
+			LEAST(sr.reservation_to, %(to_date)s) AS end_date,
+			ri.rate
+				* (DATEDIFF(LEAST(sr.reservation_to, %(to_date)s), GREATEST(sr.reservation_from, %(from_date)s)) + 1)
+				/ (DATEDIFF(sr.reservation_to, sr.reservation_from) + 1) AS rent,
+			CASE
+				WHEN IFNULL(ri.serial_no, '') != '' THEN TIMESTAMPDIFF(
+					MINUTE,
+					sr.actual_return_date,
+					LEAD(sr.actual_delivery_date) OVER (
+						PARTITION BY ri.item_code, ri.serial_no
+						ORDER BY sr.reservation_from, sr.name
+					)
+				) / 60
+			END AS turnaround_hours
+		FROM `tabReservation Item` ri
+		JOIN `tabSuit Reservation` sr ON sr.name = ri.parent
+		WHERE ri.parenttype = 'Suit Reservation'
+			AND {" AND ".join(conditions)}
+		ORDER BY ri.item_code, IFNULL(ri.serial_no, ''), start_date, end_date
+		""",
+		{
+			"from_date": from_date,
+			"to_date": to_date,
+			"branch": filters.branch,
+			"item_code": filters.item_code,
+		},
+		as_dict=True,
+	)
+
+
+def get_penalties(filters, from_date, to_date):
+	"""
+	Damage and loss penalties per unit, by the actual return date. A late return
+	belongs to the period it came back in, wherever the booking window lies.
+	"""
+	conditions = [
+		"sr.docstatus = 1",
+		"sr.reservation_status = 'Returned'",
+		"ri.return_type IN ('Damage', 'Lost')",
+		"DATE(sr.actual_return_date) BETWEEN %(from_date)s AND %(to_date)s",
+	]
+	if filters.branch:
+		conditions.append("sr.branch = %(branch)s")
+	if filters.item_code:
+		conditions.append("ri.item_code = %(item_code)s")
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT
+			ri.item_code,
+			MAX(ri.item_name) AS item_name,
+			IFNULL(ri.serial_no, '') AS serial_no,
+			SUM(IFNULL(ri.penalty_amount, 0)) AS penalty
+		FROM `tabReservation Item` ri
+		JOIN `tabSuit Reservation` sr ON sr.name = ri.parent
+		WHERE ri.parenttype = 'Suit Reservation'
+			AND {" AND ".join(conditions)}
+		GROUP BY ri.item_code, IFNULL(ri.serial_no, '')
+		""",
+		{
+			"from_date": from_date,
+			"to_date": to_date,
+			"branch": filters.branch,
+			"item_code": filters.item_code,
+		},
+		as_dict=True,
+	)
+
+	return {(row.item_code, row.serial_no): row for row in rows}
+
+
+def get_booked_days(bookings, merge):
+	"""
+	Days covered by bookings sorted by start. A serial is only out once on any
+	day, so its overlapping windows are merged; bookings of an item without
+	serials are separate units and add up.
+	"""
+	if not merge:
+		return sum(date_diff(b.end_date, b.start_date) + 1 for b in bookings)
+
+	days = 0
+	start = end = None
+
+	for b in bookings:
+		if end is not None and getdate(b.start_date) <= end:
+			end = max(end, getdate(b.end_date))
+			continue
+
+		if end is not None:
+			days += date_diff(end, start) + 1
+		start, end = getdate(b.start_date), getdate(b.end_date)
+
+	if end is not None:
+		days += date_diff(end, start) + 1
+
+	return days
+
+
+def summarize(unit, bookings, merge, penalty=None):
+	"""A unit's bookings in the period; a unit only returned in it has none but its penalty."""
+	turnarounds = [flt(b.turnaround_hours) for b in bookings if b.turnaround_hours is not None]
+
+	return frappe._dict(
+		item_code=unit.item_code,
+		item_name=unit.item_name,
+		serial_no=unit.serial_no or None,
+		reservations=len(bookings),
+		booked_days=get_booked_days(bookings, merge),
+		rent_revenue=sum(flt(b.rent) for b in bookings),
+		penalty_revenue=flt(penalty.penalty) if penalty else 0,
+		turnarounds=turnarounds,
+	)
+
+
+def get_rental_warehouses(branch=None):
+	"""Stores and customer stock warehouses of the branches, where rental units are kept or out on rent."""
+	warehouses = set()
+
+	for row in frappe.get_all(
+		"Branch",
+		filters={"name": branch} if branch else None,
+		fields=["custom_default_warehouse", "custom_customer_stock_warehouse"],
+	):
+		warehouses.update(w for w in (row.custom_default_warehouse, row.custom_customer_stock_warehouse) if w)
+
+	return list(warehouses)
+
+
+def get_unit_counts(item_codes, warehouses):
+	"""
+	Units owned per item: its stock in the rental warehouses, rented out stock
+	included. Damage and other non-rental warehouses do not count.
+	"""
+	if not item_codes or not warehouses:
+		return {}
+
+	return dict(
+		frappe.db.sql(
+			"""
+			SELECT item_code, SUM(actual_qty)
+			FROM `tabBin`
+			WHERE item_code IN %(item_codes)s
+				AND warehouse IN %(warehouses)s
+			GROUP BY item_code
+			""",
+			{"item_codes": item_codes, "warehouses": warehouses},
+		)
+	)
+
+
+def get_data(filters, from_date, to_date, by_item):
+	period_days = date_diff(to_date, from_date) + 1
+	bookings = get_bookings(filters, from_date, to_date)
+	penalties = get_penalties(filters, from_date, to_date)
+
+	units = []
+	for key, group in groupby(bookings, key=lambda b: (b.item_code, b.serial_no)):
+		group = list(group)
+		units.append(summarize(group[0], group, bool(key[1]), penalties.pop(key, None)))
+
+	# Returned late in the period from a booking that ended before it
+	units += [summarize(penalty, [], True, penalty) for penalty in penalties.values()]
+	units.sort(key=lambda unit: (unit.item_code, unit.serial_no or ""))
+
+	if by_item:
+		unit_counts = get_unit_counts(
+			list({unit.item_code for unit in units}), get_rental_warehouses(filters.branch)
+		)
+		rows = []
+
+		for item_code, group in groupby(units, key=lambda unit: unit.item_code):
+			group = list(group)
+			row = frappe._dict(
+				item_code=item_code,
+				item_name=group[0].item_name,
+				reservations=sum(unit.reservations for unit in group),
+				booked_days=sum(unit.booked_days for unit in group),
+				rent_revenue=sum(unit.rent_revenue for unit in group),
+				penalty_revenue=sum(unit.penalty_revenue for unit in group),
+				turnarounds=[hours for unit in group for hours in unit.turnarounds],
+			)
+			# Units booked in the period when stock does not tell, e.g. all of them lost
+			row.units = max(flt(unit_counts.get(item_code)), len([u for u in group if u.serial_no]), 1)
+			rows.append(row)
+	else:
+		rows = units
+		for row in rows:
+			row.units = 1
+
+	for row in rows:
+		row.utilization = flt(row.booked_days * 100 / (period_days * row.units), 2)
+		row.revenue_per_unit = flt((row.rent_revenue + row.penalty_revenue) / row.units, 2)
+		row.rent_revenue = flt(row.rent_revenue, 2)
+		row.turnaround_hours = (
+			flt(sum(row.turnarounds) / len(row.turnarounds), 1) if row.turnarounds else None
+		)
+		del row["turnarounds"]
+
+	rows.sort(key=lambda row: row.revenue_per_unit, reverse=True)
+	return rows
+
+
+def get_chart(data):
+	if not data:
+		return None
+
+	top = data[:20]
+
+	return {
+		"data": {
+			"labels": [row.serial_no or row.item_code for row in top],
+			"datasets": [{"name": _("Utilization %"), "values": [row.utilization for row in top]}],
+		},
+		"type": "bar",
+	}
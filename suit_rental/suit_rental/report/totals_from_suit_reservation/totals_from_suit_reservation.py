@@ -1,15 +1,35 @@
 import frappe
 from frappe import _
 
+from suit_rental.summary import get_cached_totals, get_totals_cache_field, set_cached_totals
+
 
 def execute(filters=None):
 	filters = filters or {}
 	columns = get_columns()
-	data = get_data(filters)
+	data, cached_at = get_cached_data(filters)
 
 	chart = get_chart(data)
 
-	return columns, data, None, chart
+	if cached_at:
+		message = _("Loaded from cache, computed at {0}").format(frappe.format(cached_at, "Datetime"))
+	else:
+		message = None
+
+	return columns, data, message, chart
+
+
+def get_cached_data(filters):
+	"""Report rows and, when they came from the result cache, when they were computed."""
+	field = get_totals_cache_field(filters.get("from_date"), filters.get("to_date"), filters.get("branch"))
+
+	entry = get_cached_totals(field)
+	if entry:
+		return [frappe._dict(row) for row in entry["data"]], entry["at"]
+
+	data = get_data(filters)
+	set_cached_totals(field, data)
+	return data, None
 
 
 def get_columns():
@@ -46,12 +66,13 @@ def get_columns():
 
 
 def get_data(filters):
-	conditions = ["docstatus = 1"]
+	"""Totals per branch, read from the Branch Daily Summary rather than the reservations."""
+	conditions = ["1 = 1"]
 
 	if filters.get("from_date"):
-		conditions.append("reservation_date >= %(from_date)s")
+		conditions.append("summary_date >= %(from_date)s")
 	if filters.get("to_date"):
-		conditions.append("reservation_date <= %(to_date)s")
+		conditions.append("summary_date <= %(to_date)s")
 	if filters.get("branch"):
 		conditions.append("branch = %(branch)s")
 
@@ -60,14 +81,15 @@ def get_data(filters):
 	query = f"""
         SELECT
             branch,
-            SUM(COALESCE(total_estimated_rent, 0)) AS total_sales,
-            SUM(COALESCE(deposit_amount, 0)) AS deposit_amount_total,
-            SUM(COALESCE(outstanding_amount, 0)) AS outstanding_total,
-            COUNT(*) AS transaction_count
-        FROM `tabSuit Reservation`
+            SUM(rent_booked) AS total_sales,
+            SUM(deposits) AS deposit_amount_total,
+            SUM(outstanding) AS outstanding_total,
+            SUM(reservation_count) AS transaction_count
+        FROM `tabBranch Daily Summary`
         WHERE {condition_str}
         GROUP BY branch
-        ORDER BY SUM(COALESCE(total_estimated_rent, 0)) DESC
+        HAVING SUM(reservation_count) > 0
+        ORDER BY SUM(rent_booked) DESC
     """
 
 	return frappe.db.sql(query, filters, as_dict=True)
@@ -0,0 +1,81 @@
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def get_page_size(filters):
+	page_size = cint(filters.get("page_size")) or DEFAULT_PAGE_SIZE
+	return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def parse_cursor(cursor):
+	"""The [sort value, name] of the last row of the previous page, or None for the first page."""
+	if not cursor:
+		return None
+
+	try:
+		value, name = json.loads(cursor) if isinstance(cursor, str) else cursor
+	except (TypeError, ValueError):
+		frappe.throw(_("Invalid page cursor"))
+
+	return value, name
+
+
+def get_reservation_page(filters, fields, conditions, params, sort_field):
+	"""
+	One page of Suit Reservations ordered by (sort_field, name).
+
+	The page starts after the row in the `cursor` filter (keyset pagination),
+	so every page costs the same whatever its position. Returns the rows and
+	whether more rows follow.
+	"""
+	page_size = get_page_size(filters)
+	conditions = list(conditions)
+	params = dict(params)
+
+	cursor = parse_cursor(filters.get("cursor"))
+	if cursor:
+		conditions.append(
+			f"({sort_field} > %(cursor_value)s OR ({sort_field} = %(cursor_value)s AND name > %(cursor_name)s))"
+		)
+		params.update(cursor_value=cursor[0], cursor_name=cursor[1])
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT {", ".join(fields)}
+		FROM `tabSuit Reservation`
+		WHERE {" AND ".join(conditions)}
+		ORDER BY {sort_field}, name
+		LIMIT %(limit)s
+		""",
+		dict(params, limit=page_size + 1),
+		as_dict=True,
+	)
+
+	has_more = len(rows) > page_size
+	return rows[:page_size], has_more
+
+
+def count_reservations(conditions, params):
+	return frappe.db.sql(
+		f"SELECT COUNT(*) FROM `tabSuit Reservation` WHERE {' AND '.join(conditions)}",
+		params,
+	)[0][0]
+
+
+def get_page_summary(total, rows, has_more):
+	return [
+		{"value": total, "label": _("Total"), "datatype": "Int", "indicator": "Blue"},
+		{"value": len(rows), "label": _("On this Page"), "datatype": "Int"},
+		{
+			"value": _("Yes") if has_more else _("No"),
+			"label": _("More Pages"),
+			"datatype": "Data",
+			"indicator": "Orange" if has_more else "Green",
+		},
+	]
@@ -0,0 +1,405 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+"""
+Branch Daily Summary: pre-aggregated reservation figures per branch and day.
+
+Every submitted reservation contributes to a few (branch, date) rows: its
+start date (deliveries), its end date (returns), every day it is Reserved
+(active count) and the day it was made (rent, deposit, outstanding). When a
+reservation is submitted, updated after submit or cancelled, the difference
+between its contribution before and after the change is added to the
+summary rows. A nightly job reconciles a window around today against the
+reservations, and `bench rebuild-branch-daily-summary` rebuilds everything.
+"""
+
+import time
+from collections import defaultdict
+
+import frappe
+from frappe.utils import add_days, add_months, flt, getdate, now_datetime, nowdate
+
+SUMMARY_DOCTYPE = "Branch Daily Summary"
+
+SUMMARY_FIELDS = (
+	"deliveries_due",
+	"deliveries_done",
+	"returns_due",
+	"returns_done",
+	"active_count",
+	"reservation_count",
+	"rent_booked",
+	"deposits",
+	"outstanding",
+)
+
+RESERVATION_FIELDS = (
+	"name",
+	"docstatus",
+	"branch",
+	"reservation_status",
+	"reservation_date",
+	"reservation_from",
+	"reservation_to",
+	"total_estimated_rent",
+	"deposit_amount",
+	"outstanding_amount",
+)
+
+# Days before / after today the nightly job reconciles
+RECONCILE_DAYS_BEFORE = 30
+RECONCILE_DAYS_AFTER = 90
+
+# "from|to|branch" -> cached Totals from Suit Reservation rows
+TOTALS_CACHE_KEY = "suit_rental:totals_report"
+# "from|to|branch" -> last read time, for LRU eviction
+TOTALS_CACHE_LRU_KEY = "suit_rental:totals_report:lru"
+# Sets of "from|to|branch" per branch ("" for all branches) and month the period
+# covers, or "open" for periods without a from or to date
+TOTALS_CACHE_INDEX_KEY = "suit_rental:totals_report:index"
+TOTALS_CACHE_MAX_ENTRIES = 500
+# Periods that include today are also recomputed after this long
+TOTALS_CACHE_OPEN_TTL = 60 * 60
+
+# Fields of the reservations made on a day, which the totals report sums
+TOTALS_FIELDS = ("reservation_count", "rent_booked", "deposits", "outstanding")
+
+
+def get_contribution(doc):
+	"""{(branch, date): {field: value}} that a reservation adds to the summary."""
+	rows = defaultdict(lambda: defaultdict(float))
+
+	if not doc or doc.docstatus != 1 or not doc.branch:
+		return rows
+
+	if doc.reservation_from:
+		row = rows[(doc.branch, getdate(doc.reservation_from))]
+		row["deliveries_due"] += 1
+		if doc.reservation_status == "Delivered":
+			row["deliveries_done"] += 1
+
+	if doc.reservation_to:
+		row = rows[(doc.branch, getdate(doc.reservation_to))]
+		row["returns_due"] += 1
+		if doc.reservation_status == "Returned":
+			row["returns_done"] += 1
+
+	if doc.reservation_status == "Reserved" and doc.reservation_from and doc.reservation_to:
+		day = getdate(doc.reservation_from)
+		while day <= getdate(doc.reservation_to):
+			rows[(doc.branch, day)]["active_count"] += 1
+			day = add_days(day, 1)
+
+	if doc.reservation_date:
+		row = rows[(doc.branch, getdate(doc.reservation_date))]
+		row["reservation_count"] += 1
+		row["rent_booked"] += flt(doc.total_estimated_rent)
+		row["deposits"] += flt(doc.deposit_amount)
+		row["outstanding"] += flt(doc.outstanding_amount)
+
+	return rows
+
+
+def get_delta(before, after):
+	"""Contribution of `after` minus `before`, without the rows and fields that did not change."""
+	delta = {}
+	old, new = get_contribution(before), get_contribution(after)
+
+	for key in set(old) | set(new):
+		values = {
+			field: new.get(key, {}).get(field, 0) - old.get(key, {}).get(field, 0) for field in SUMMARY_FIELDS
+		}
+		if any(values.values()):
+			delta[key] = values
+
+	return delta
+
+
+def apply_summary_rows(rows, replace=False):
+	"""
+	Upsert {(branch, date): {field: value}} into the summary. Values are added
+	to the existing row, or overwrite it with replace=True.
+	"""
+	if not rows:
+		return
+
+	now = now_datetime()
+	user = frappe.session.user
+	columns = (
+		"name",
+		"creation",
+		"modified",
+		"owner",
+		"modified_by",
+		"branch",
+		"summary_date",
+		*SUMMARY_FIELDS,
+	)
+
+	values = [
+		(
+			f"{branch}-{day}",
+			now,
+			now,
+			user,
+			user,
+			branch,
+			day,
+			*(row.get(field, 0) for field in SUMMARY_FIELDS),
+		)
+		for (branch, day), row in rows.items()
+	]
+
+	if replace:
+		updates = ", ".join(f"`{field}` = VALUES(`{field}`)" for field in SUMMARY_FIELDS)
+	else:
+		updates = ", ".join(f"`{field}` = `{field}` + VALUES(`{field}`)" for field in SUMMARY_FIELDS)
+
+	placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+
+	for i in range(0, len(values), 500):
+		chunk = values[i : i + 500]
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabBranch Daily Summary` ({", ".join(f"`{c}`" for c in columns)})
+			VALUES {", ".join([placeholders] * len(chunk))}
+			ON DUPLICATE KEY UPDATE {updates}, `modified` = VALUES(`modified`)
+			""",
+			[value for row in chunk for value in row],
+		)
+
+
+def update_branch_summary(doc):
+	"""Add the change a save made to a reservation to the summary."""
+	delta = get_delta(doc.get_doc_before_save(), doc)
+	apply_summary_rows(delta)
+
+	changed = [key for key, values in delta.items() if any(values[field] for field in TOTALS_FIELDS)]
+	if changed:
+		frappe.db.after_commit.add(lambda: invalidate_totals_cache(changed))
+
+
+# ----------------------------------------------------
+# Rebuild / Reconcile
+# ----------------------------------------------------
+
+
+def compute_summary(from_date=None, to_date=None, chunk_size=5000):
+	"""Summary rows computed from the submitted reservations, limited to a date window if given."""
+	filters = [["docstatus", "=", 1]]
+	or_filters = None
+
+	if from_date and to_date:
+		# Reservations with any of their dates inside the window
+		filters.append(["reservation_to", ">=", from_date])
+		or_filters = [
+			["reservation_from", "<=", to_date],
+			["reservation_date", "<=", f"{to_date} 23:59:59.999999"],
+		]
+
+	rows = defaultdict(lambda: defaultdict(float))
+	start = 0
+
+	while True:
+		reservations = frappe.get_all(
+			"Suit Reservation",
+			filters=filters,
+			or_filters=or_filters,
+			fields=list(RESERVATION_FIELDS),
+			order_by="name",
+			start=start,
+			page_length=chunk_size,
+		)
+		if not reservations:
+			break
+
+		for reservation in reservations:
+			for key, values in get_contribution(reservation).items():
+				if from_date and not (from_date <= key[1] <= to_date):
+					continue
+				for field, value in values.items():
+					rows[key][field] += value
+
+		start += chunk_size
+
+	return rows
+
+
+def rebuild_branch_summary():
+	"""Rebuild the whole summary from the reservations. Returns the number of rows written."""
+	rows = compute_summary()
+
+	frappe.db.delete(SUMMARY_DOCTYPE)
+	apply_summary_rows(rows)
+	frappe.db.after_commit.add(clear_totals_cache)
+
+	return len(rows)
+
+
+def reconcile_branch_summary(from_date=None, to_date=None):
+	"""
+	Recompute the summary rows of a date window and correct the ones that
+	drifted. Returns the number of rows corrected.
+	"""
+	today = getdate(nowdate())
+	from_date = getdate(from_date or add_days(today, -RECONCILE_DAYS_BEFORE))
+	to_date = getdate(to_date or add_days(today, RECONCILE_DAYS_AFTER))
+
+	expected = compute_summary(from_date, to_date)
+	stored = {
+		(row.branch, getdate(row.summary_date)): row
+		for row in frappe.get_all(
+			SUMMARY_DOCTYPE,
+			filters={"summary_date": ["between", (from_date, to_date)]},
+			fields=["branch", "summary_date", *SUMMARY_FIELDS],
+		)
+	}
+
+	drifted = {}
+	for key in set(expected) | set(stored):
+		values = {field: expected.get(key, {}).get(field, 0) for field in SUMMARY_FIELDS}
+		current = stored.get(key, {})
+
+		if any(flt(values[field], 2) != flt(current.get(field), 2) for field in SUMMARY_FIELDS):
+			drifted[key] = values
+
+	apply_summary_rows(drifted, replace=True)
+	if drifted:
+		frappe.db.after_commit.add(lambda: invalidate_totals_cache(list(drifted)))
+
+	return len(drifted)
+
+
+# ----------------------------------------------------
+# Reads
+# ----------------------------------------------------
+
+
+def get_branch_summary(from_date, to_date, branch=None, fields=SUMMARY_FIELDS):
+	"""Summary rows of a date range, oldest first."""
+	filters = {"summary_date": ["between", (from_date, to_date)]}
+	if branch:
+		filters["branch"] = branch
+
+	return frappe.get_all(
+		SUMMARY_DOCTYPE,
+		filters=filters,
+		fields=["branch", "summary_date", *fields],
+		order_by="summary_date, branch",
+	)
+
+
+# ----------------------------------------------------
+# Totals report cache
+# ----------------------------------------------------
+
+
+def get_totals_cache_field(from_date, to_date, branch):
+	"""Normalized filters: "from|to|branch" with ISO dates and empty parts for missing filters."""
+	from_date = str(getdate(from_date)) if from_date else ""
+	to_date = str(getdate(to_date)) if to_date else ""
+	return f"{from_date}|{to_date}|{branch or ''}"
+
+
+def get_cached_totals(field):
+	"""Cached {"data", "at"} for the filters, or None. Marks the entry as recently used."""
+	entry = frappe.cache.hget(TOTALS_CACHE_KEY, field)
+	if not entry or (entry["expires"] and time.time() > entry["expires"]):
+		return None
+
+	frappe.cache.zadd(frappe.cache.make_key(TOTALS_CACHE_LRU_KEY), {field: time.time()})
+	return entry
+
+
+def get_totals_index_keys(field):
+	"""Index sets a cached period is listed in: one per month it covers, or the "open" set."""
+	from_date, to_date, branch = field.split("|", 2)
+	if not from_date or not to_date:
+		return [f"{TOTALS_CACHE_INDEX_KEY}:{branch}:open"]
+
+	keys = []
+	month, last = getdate(from_date).replace(day=1), getdate(to_date)
+	while month <= last:
+		keys.append(f"{TOTALS_CACHE_INDEX_KEY}:{branch}:{month:%Y-%m}")
+		month = getdate(add_months(month, 1))
+
+	return keys
+
+
+def set_cached_totals(field, data):
+	"""
+	Cache report rows. Periods that ended before today are kept until a
+	reservation made in them changes; periods including today also expire
+	after TOTALS_CACHE_OPEN_TTL. The least recently read entries are evicted
+	beyond TOTALS_CACHE_MAX_ENTRIES.
+	"""
+	to_date = field.split("|")[1]
+	closed = to_date and getdate(to_date) < getdate(nowdate())
+
+	frappe.cache.hset(
+		TOTALS_CACHE_KEY,
+		field,
+		{
+			"data": data,
+			"at": str(now_datetime()),
+			"expires": None if closed else time.time() + TOTALS_CACHE_OPEN_TTL,
+		},
+	)
+	for index_key in get_totals_index_keys(field):
+		frappe.cache.sadd(index_key, field)
+
+	lru_key = frappe.cache.make_key(TOTALS_CACHE_LRU_KEY)
+	frappe.cache.zadd(lru_key, {field: time.time()})
+
+	excess = frappe.cache.zcard(lru_key) - TOTALS_CACHE_MAX_ENTRIES
+	if excess > 0:
+		drop_cached_totals([frappe.safe_decode(f) for f in frappe.cache.zrange(lru_key, 0, excess - 1)])
+
+
+def drop_cached_totals(fields):
+	for field in fields:
+		frappe.cache.hdel(TOTALS_CACHE_KEY, field)
+		for index_key in get_totals_index_keys(field):
+			frappe.cache.srem(index_key, field)
+
+	if fields:
+		frappe.cache.zrem(frappe.cache.make_key(TOTALS_CACHE_LRU_KEY), *fields)
+
+
+def covers(field, key_branch, day):
+	from_date, to_date, branch = field.split("|", 2)
+
+	if branch and branch != key_branch:
+		return False
+	if from_date and getdate(day) < getdate(from_date):
+		return False
+	if to_date and getdate(day) > getdate(to_date):
+		return False
+
+	return True
+
+
+def invalidate_totals_cache(keys):
+	"""
+	Drop the cached totals whose period and branch cover any of the (branch, date)
+	keys. Only the index sets of the keys' branches and months are read.
+	"""
+	index_keys = {
+		f"{TOTALS_CACHE_INDEX_KEY}:{scope}:{part}"
+		for branch, day in keys
+		for scope in (branch, "")
+		for part in (f"{getdate(day):%Y-%m}", "open")
+	}
+
+	candidates = set()
+	for index_key in index_keys:
+		candidates.update(frappe.safe_decode(field) for field in frappe.cache.smembers(index_key))
+
+	drop_cached_totals(
+		[field for field in candidates if any(covers(field, branch, day) for branch, day in keys)]
+	)
+
+
+def clear_totals_cache():
+	frappe.cache.delete_value([TOTALS_CACHE_KEY, TOTALS_CACHE_LRU_KEY])
+	frappe.cache.delete_keys(TOTALS_CACHE_INDEX_KEY)
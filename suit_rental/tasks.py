@@ -0,0 +1,31 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+import frappe
+
+from suit_rental.availability import extend_overdue_occupancy
+from suit_rental.consolidation import post_pending_income
+from suit_rental.summary import reconcile_branch_summary
+
+
+def post_consolidated_income():
+	"""Daily: post the pending income of Daily Consolidated branches for every closed day."""
+	post_pending_income()
+
+
+def reconcile_branch_daily_summary():
+	"""Daily: correct Branch Daily Summary rows around today that drifted from the reservations."""
+	corrected = reconcile_branch_summary()
+	frappe.db.commit()
+
+	if corrected:
+		frappe.logger("suit_rental").info(f"Branch Daily Summary: {corrected} rows reconciled")
+
+
+def extend_overdue_reservations():
+	"""Daily: keep the items of overdue Delivered reservations booked through today."""
+	extended = extend_overdue_occupancy()
+	frappe.db.commit()
+
+	if extended:
+		frappe.logger("suit_rental").info(f"Reservation Occupancy: {extended} overdue reservations extended")
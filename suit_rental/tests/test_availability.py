@@ -0,0 +1,148 @@
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.utils import getdate
+
+from suit_rental import availability
+from suit_rental.availability import (
+	find_booking_conflicts,
+	get_daily_free_totals,
+	get_occupancy_days,
+	get_owned_qty_map,
+	get_reserved_qty,
+	is_rentable_serial,
+	pick_best_fit_serial,
+)
+
+
+def test_reserved_qty_is_daily_peak():
+	daily = {
+		getdate("2025-06-01"): 1,
+		getdate("2025-06-02"): 3,
+		getdate("2025-06-05"): 2,
+	}
+
+	assert get_reserved_qty(daily, getdate("2025-06-01"), getdate("2025-06-03")) == 3
+	assert get_reserved_qty(daily, getdate("2025-06-04"), getdate("2025-06-06")) == 2
+	assert get_reserved_qty(daily, getdate("2025-06-10"), getdate("2025-06-12")) == 0
+
+
+def test_occupancy_days_include_early_delivery():
+	days = get_occupancy_days("2025-06-02", "2025-06-04", delivered_on="2025-06-01 18:00:00")
+
+	assert days[0] == getdate("2025-06-01")
+	assert days[-1] == getdate("2025-06-04")
+	assert len(days) == 4
+
+
+def test_best_fit_prefers_tightest_gap():
+	start, end = getdate("2025-06-10"), getdate("2025-06-12")
+	fit_map = {
+		"SN-A": {"prev_day": getdate("2025-06-01"), "next_day": None, "clashes": 0},
+		"SN-B": {"prev_day": getdate("2025-06-09"), "next_day": getdate("2025-06-13"), "clashes": 0},
+		"SN-C": {"prev_day": None, "next_day": getdate("2025-06-11"), "clashes": 2},
+	}
+
+	assert pick_best_fit_serial(["SN-A", "SN-B", "SN-C", "SN-D"], fit_map, start, end) == "SN-B"
+	assert pick_best_fit_serial(["SN-A", "SN-D"], fit_map, start, end) == "SN-A"
+	assert pick_best_fit_serial(["SN-C"], fit_map, start, end) is None
+
+
+def test_overdue_delivery_stays_booked():
+	days = get_occupancy_days("2025-06-02", "2025-06-04", overdue_until="2025-06-07")
+
+	assert days[-1] == getdate("2025-06-07")
+	assert len(days) == 6
+
+	# Returned in time: the window is not cut short
+	assert get_occupancy_days("2025-06-02", "2025-06-04", overdue_until="2025-06-03")[-1] == getdate(
+		"2025-06-04"
+	)
+
+
+def test_serial_out_on_rental_is_rentable():
+	pool = {"Store - B1", "Customer Stock - B1"}
+	serial = frappe._dict(item_code="SUIT-1", status="Active", warehouse="Customer Stock - B1")
+
+	assert is_rentable_serial(serial, "SUIT-1", pool)
+	assert not is_rentable_serial(serial, "SUIT-2", pool)
+	assert not is_rentable_serial(frappe._dict(serial, warehouse="Damage - B1"), "SUIT-1", pool)
+	assert not is_rentable_serial(frappe._dict(serial, status="Delivered"), "SUIT-1", pool)
+	assert not is_rentable_serial(None, "SUIT-1", pool)
+
+
+def test_daily_free_totals_ignore_overbooked_items():
+	data = {
+		"dates": ["2025-06-01", "2025-06-02"],
+		"stock": [2, 1],
+		"matrix": [[2, 0], [1, -1]],
+	}
+
+	assert get_daily_free_totals(data) == [("2025-06-01", 3, 3), ("2025-06-02", 0, 3)]
+
+
+def booking(reservation, item_code, day, warehouse="Stores - SR", serial_no=None):
+	return frappe._dict(
+		reservation=reservation,
+		item_code=item_code,
+		serial_no=serial_no,
+		warehouse=warehouse,
+		occupancy_date=getdate(day),
+		qty=1,
+	)
+
+
+def test_second_overlapping_reservation_exceeds_stock():
+	rows = [frappe._dict(item_code="SUIT-1", qty=1, serial_no=None)]
+	occupancy = [booking("SR-1", "SUIT-1", "2025-06-01"), booking("SR-1", "SUIT-1", "2025-06-02")]
+
+	assert find_booking_conflicts(rows, occupancy, {"SUIT-1": 1}, "Stores - SR") == [
+		("SUIT-1", None, ["SR-1"])
+	]
+	assert find_booking_conflicts(rows, occupancy, {"SUIT-1": 2}, "Stores - SR") == []
+
+
+def test_bookings_from_other_warehouses_do_not_use_stock():
+	rows = [frappe._dict(item_code="SUIT-1", qty=1, serial_no=None)]
+	occupancy = [booking("SR-1", "SUIT-1", "2025-06-01", warehouse="Other - SR")]
+
+	assert find_booking_conflicts(rows, occupancy, {"SUIT-1": 1}, "Stores - SR") == []
+
+
+def test_serial_clash_across_warehouses():
+	rows = [frappe._dict(item_code="SUIT-1", qty=1, serial_no="SN-1")]
+	occupancy = [booking("SR-1", "SUIT-1", "2025-06-01", warehouse="Other - SR", serial_no="SN-1")]
+
+	assert find_booking_conflicts(rows, occupancy, {"SUIT-1": 5}, "Stores - SR") == [
+		("SUIT-1", "SN-1", ["SR-1"])
+	]
+
+
+def test_delivered_serial_can_be_booked_for_a_later_window():
+	# SN-1 is out with a customer until the 5th: nothing is left in the store Bin,
+	# and its booking does not reach the requested window, so the ledger read is empty
+	rows = [frappe._dict(item_code="SUIT-1", qty=1, serial_no="SN-1")]
+
+	assert find_booking_conflicts(rows, [], {}, "Stores - SR") == []
+
+
+def test_units_out_on_rental_count_towards_owned_stock():
+	pools = {"Stores - SR": {"Stores - SR", "Customer Stock - SR"}}
+	rows = [frappe._dict(item_code="SUIT-1", warehouse="Stores - SR")]
+	fake = MagicMock()
+	fake.get_all.return_value = [
+		frappe._dict(item_code="SUIT-1", warehouse="Stores - SR", actual_qty=1),
+		frappe._dict(item_code="SUIT-1", warehouse="Customer Stock - SR", actual_qty=2),
+	]
+
+	with patch.object(availability, "frappe", fake):
+		assert get_owned_qty_map(rows, pools) == {("SUIT-1", "Stores - SR"): 3}
+
+	# Two of the three units are booked on the 2nd: two more fit outside that day, not on it
+	requested = [frappe._dict(item_code="SUIT-1", qty=2, serial_no=None)]
+	occupancy = [booking("SR-1", "SUIT-1", "2025-06-02"), booking("SR-2", "SUIT-1", "2025-06-02")]
+
+	assert find_booking_conflicts(requested, [], {"SUIT-1": 3}, "Stores - SR") == []
+	assert find_booking_conflicts(requested, occupancy, {"SUIT-1": 3}, "Stores - SR") == [
+		("SUIT-1", None, ["SR-1", "SR-2"])
+	]
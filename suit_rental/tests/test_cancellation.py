@@ -0,0 +1,247 @@
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import frappe
+import pytest
+
+from suit_rental.suit_rental.doctype.suit_reservation import suit_reservation
+
+
+def make_frappe():
+	fake = MagicMock()
+	fake._dict = frappe._dict
+	return fake
+
+
+@contextmanager
+def patched(fake):
+	with (
+		patch.object(suit_reservation, "frappe", fake),
+		patch.object(suit_reservation, "_", lambda message: message),
+	):
+		yield
+
+
+def make_doc(calls):
+	doc = MagicMock()
+	doc.name = "SR-1"
+	doc.flags = frappe._dict()
+	doc.cancel_related_records.side_effect = lambda **kwargs: calls.append("vouchers")
+	doc.cancel.side_effect = lambda: calls.append(("reservation", doc.flags.linked_vouchers_cancelled))
+	return doc
+
+
+def test_job_cancels_vouchers_before_the_reservation():
+	calls = []
+	doc = make_doc(calls)
+
+	with patched(make_frappe()):
+		suit_reservation.run_cancellation_workflow(doc, frappe._dict(), None)
+
+	assert calls == ["vouchers", ("reservation", True)]
+
+
+def test_cancelling_after_the_job_skips_the_vouchers():
+	doc = MagicMock()
+	doc.name = "SR-1"
+	doc.flags = frappe._dict(linked_vouchers_cancelled=True)
+
+	with (
+		patch.object(suit_reservation, "cancel_pending_income"),
+		patch.object(suit_reservation, "sync_reservation_occupancy"),
+		patch.object(suit_reservation, "update_branch_summary"),
+	):
+		suit_reservation.SuitReservation.on_cancel(doc)
+		doc.cancel_related_records.assert_not_called()
+
+		doc.flags.linked_vouchers_cancelled = False
+		suit_reservation.SuitReservation.on_cancel(doc)
+		doc.cancel_related_records.assert_called_once()
+
+
+def test_small_reservation_is_not_queued():
+	fake = make_frappe()
+	fake.get_doc.return_value = MagicMock(docstatus=1)
+
+	with patched(fake), patch.object(suit_reservation, "get_vouchers_to_cancel", return_value=[1, 2]):
+		assert suit_reservation.queue_cancellation("SR-1") is False
+
+	fake.enqueue.assert_not_called()
+
+
+def test_large_reservation_stays_submitted_until_the_job_runs():
+	fake = make_frappe()
+	doc = MagicMock(docstatus=1)
+	fake.get_doc.return_value = doc
+	vouchers = list(range(suit_reservation.CANCEL_IN_BACKGROUND_THRESHOLD + 1))
+
+	with patched(fake), patch.object(suit_reservation, "get_vouchers_to_cancel", return_value=vouchers):
+		assert suit_reservation.queue_cancellation("SR-1") is True
+
+	doc.cancel.assert_not_called()
+	assert fake.enqueue.call_args.kwargs["reservation"] == "SR-1"
+	assert fake.enqueue.call_args.kwargs["enqueue_after_commit"] is True
+
+
+def test_job_skips_a_reservation_that_is_no_longer_submitted():
+	fake = make_frappe()
+	fake.db.get_value.return_value = 2
+
+	with patched(fake), patch.object(suit_reservation, "run_workflow") as run_workflow:
+		suit_reservation.run_cancellation_job("SR-1")
+
+	run_workflow.assert_not_called()
+
+
+def test_vouchers_are_cancelled_in_dependency_order():
+	fake = make_frappe()
+	names = {
+		"Sales Invoice": ["SINV-1"],
+		"Journal Entry": ["JE-1"],
+		"Payment Entry": ["PE-2", "PE-1"],
+		"Stock Entry": ["STE-2", "STE-1"],
+	}
+	fake.get_all.side_effect = lambda doctype, **kwargs: names[doctype]
+
+	doc = frappe._dict(
+		name="SR-1",
+		reservation_sales_invoice=[frappe._dict(sales_invoice="SINV-1")],
+		reservation_journal_entry=[frappe._dict(journal_entry="JE-1")],
+		reservation_payments=[frappe._dict(payment_entry="PE-1"), frappe._dict(payment_entry="PE-2")],
+		reservation_stock_entries=[frappe._dict(stock_entry="STE-1"), frappe._dict(stock_entry="STE-2")],
+	)
+
+	with (
+		patched(fake),
+		patch.object(suit_reservation, "get_shared_income_vouchers", return_value={"JE-1"}),
+		patch.object(suit_reservation, "get_shared_stock_entries", return_value=set()),
+	):
+		vouchers = suit_reservation.get_vouchers_to_cancel(doc)
+
+	assert [(v.doctype, v.name, v.action) for v in vouchers] == [
+		("Sales Invoice", "SINV-1", "cancel"),
+		("Journal Entry", "JE-1", "reverse"),
+		("Payment Entry", "PE-2", "cancel"),
+		("Payment Entry", "PE-1", "cancel"),
+		("Stock Entry", "STE-2", "cancel"),
+		("Stock Entry", "STE-1", "cancel"),
+	]
+
+
+def test_bulk_returned_reservation_reverses_its_return_before_its_delivery():
+	fake = make_frappe()
+	fake.get_all.side_effect = lambda doctype, **kwargs: ["STE-RET", "STE-DEL"]
+
+	doc = frappe._dict(
+		name="SR-1",
+		reservation_stock_entries=[
+			frappe._dict(stock_entry="STE-DEL", entry_type="Delivery"),
+			frappe._dict(stock_entry="STE-RET", entry_type="Return - Good", item_code="SUIT-1"),
+		],
+	)
+
+	with (
+		patched(fake),
+		patch.object(suit_reservation, "get_shared_income_vouchers", return_value=set()),
+		patch.object(suit_reservation, "get_shared_stock_entries", return_value={"STE-RET", "STE-DEL"}),
+	):
+		vouchers = suit_reservation.get_vouchers_to_cancel(doc)
+
+	assert [(v.name, v.action, v.purpose) for v in vouchers] == [
+		("STE-RET", "reverse", "Return"),
+		("STE-DEL", "reverse", "Delivery"),
+	]
+
+	calls = []
+	with (
+		patch.object(suit_reservation, "run_step", lambda workflow, step, fn: fn()),
+		patch.object(
+			suit_reservation, "reverse_shared_return", lambda doc, name: calls.append(("return", name))
+		),
+		patch.object(
+			suit_reservation, "reverse_shared_delivery", lambda doc, name: calls.append(("delivery", name))
+		),
+	):
+		suit_reservation.SuitReservation.cancel_related_records(doc, vouchers)
+
+	assert calls == [("return", "STE-RET"), ("delivery", "STE-DEL")]
+
+
+def test_return_reversal_moves_only_this_reservations_items_back():
+	doc = frappe._dict(name="SR-1")
+	links = [
+		frappe._dict(stock_entry="STE-RET", item_code="SUIT-1", serial_no="SN-2"),
+		frappe._dict(stock_entry="STE-RET", item_code="TIE-1", serial_no=None),
+	]
+	details = [
+		frappe._dict(
+			item_code="SUIT-1",
+			qty=1,
+			uom="Nos",
+			serial_no="SN-1",
+			s_warehouse="Customer",
+			t_warehouse="Store",
+		),
+		frappe._dict(
+			item_code="SUIT-1",
+			qty=1,
+			uom="Nos",
+			serial_no="SN-2",
+			s_warehouse="Customer",
+			t_warehouse="Damage",
+		),
+		frappe._dict(
+			item_code="TIE-1", qty=1, uom="Nos", serial_no="", s_warehouse="Customer", t_warehouse="Store"
+		),
+	]
+
+	rows = suit_reservation.get_return_reversal_rows(doc, links, details)
+
+	assert [(r["item_code"], r["serial_no"], r["s_warehouse"], r["t_warehouse"]) for r in rows] == [
+		("SUIT-1", "SN-2", "Damage", "Customer"),
+		("TIE-1", "", "Store", "Customer"),
+	]
+
+
+def test_lost_item_reversal_is_received_back_into_customer_stock():
+	doc = frappe._dict(name="SR-1")
+	links = [frappe._dict(stock_entry="STE-LOST", item_code="SUIT-1", serial_no="SN-1")]
+	details = [
+		frappe._dict(
+			item_code="SUIT-1",
+			qty=1,
+			uom="Nos",
+			serial_no="SN-1",
+			s_warehouse="Customer",
+			t_warehouse=None,
+			valuation_rate=120,
+		)
+	]
+
+	[row] = suit_reservation.get_return_reversal_rows(doc, links, details)
+
+	assert row["t_warehouse"] == "Customer"
+	assert "s_warehouse" not in row
+	assert row["basic_rate"] == 120
+
+
+def test_reservation_with_an_unfinished_workflow_is_not_cancelled():
+	fake = make_frappe()
+	fake.get_doc.return_value = MagicMock(docstatus=1)
+	refuse = patch.object(suit_reservation, "check_no_unfinished_workflow", side_effect=ValueError("Failed"))
+
+	with patched(fake), refuse, pytest.raises(ValueError):
+		suit_reservation.queue_cancellation("SR-1")
+	fake.enqueue.assert_not_called()
+
+	doc = MagicMock()
+	doc.name = "SR-1"
+	doc.flags = frappe._dict()
+	with patched(fake), refuse, pytest.raises(ValueError):
+		suit_reservation.SuitReservation.before_cancel(doc)
+
+	# The cancellation workflow cancels the reservation while its own log is open
+	doc.flags.in_reservation_workflow = True
+	with patched(fake), refuse:
+		suit_reservation.SuitReservation.before_cancel(doc)
+	assert doc.reservation_status == "Cancelled"
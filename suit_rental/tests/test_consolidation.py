@@ -0,0 +1,213 @@
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from suit_rental import consolidation
+
+
+def matches(row, filters):
+	for field, value in filters.items():
+		if isinstance(value, list):
+			operator, operand = value
+			if operator == "in" and row[field] not in operand:
+				return False
+			if operator == "!=" and row[field] == operand:
+				return False
+		elif row[field] != value:
+			return False
+	return True
+
+
+class Voucher(frappe._dict):
+	def append(self, table, row):
+		self.setdefault(table, []).append(frappe._dict(row))
+
+	def insert(self):
+		self.name = f"{self.doctype}-{len(self.store.vouchers) + 1}"
+		self.store.vouchers.append(self)
+		return self
+
+	def submit(self):
+		self.docstatus = 1
+
+	def cancel(self):
+		self.docstatus = 2
+
+
+class Site:
+	"""In-memory Pending Income Entry rows, vouchers and reservation links."""
+
+	def __init__(self, entries):
+		self.entries = [
+			frappe._dict(entry, status="Pending", voucher_type=None, voucher_no=None) for entry in entries
+		]
+		self.vouchers = []
+		self.links = []
+
+	def get_all(self, doctype, filters=None, fields=None, **kwargs):
+		return [frappe._dict(row) for row in self.entries if matches(row, filters or {})]
+
+	def set_value(self, doctype, filters, field, value=None):
+		values = field if isinstance(field, dict) else {field: value}
+		for row in self.entries:
+			if matches(row, filters):
+				row.update(values)
+
+	def new_doc(self, doctype):
+		voucher = Voucher(doctype=doctype, docstatus=0, flags=frappe._dict())
+		voucher.store = self
+		return voucher
+
+	def get_doc(self, values):
+		link = MagicMock()
+		link.db_insert.side_effect = lambda: self.links.append(frappe._dict(values))
+		return link
+
+	def make_frappe(self):
+		fake = MagicMock()
+		fake._dict = frappe._dict
+		fake.get_all.side_effect = self.get_all
+		fake.new_doc.side_effect = self.new_doc
+		fake.get_doc.side_effect = self.get_doc
+		fake.db.set_value.side_effect = self.set_value
+		fake.db.sql.return_value = [[0]]
+		return fake
+
+
+PROFILE = frappe._dict(
+	branch="Main",
+	consolidated_voucher_type="Journal Entry",
+	journal_entry_status="Submit",
+	receivable_account="Debtors",
+	income_account="Rent Income",
+)
+
+
+@contextmanager
+def patched(site):
+	with (
+		patch.object(consolidation, "frappe", site.make_frappe()),
+		patch.object(consolidation, "_", lambda message: message),
+		patch.object(consolidation, "get_posting_profile", return_value=PROFILE),
+		patch.object(consolidation, "nowdate", lambda: "2025-06-05"),
+	):
+		yield
+
+
+def pending(name, reservation, customer, amount):
+	return dict(
+		name=name,
+		branch="Main",
+		company="Company",
+		posting_date="2025-06-01",
+		reservation=reservation,
+		customer=customer,
+		currency="USD",
+		purpose="Rent",
+		income_item="RENT",
+		amount=amount,
+	)
+
+
+def make_site():
+	return Site([pending("PIE-1", "SR-1", "Ali", 300), pending("PIE-2", "SR-2", "Sara", 200)])
+
+
+def test_two_reservations_share_one_journal_entry():
+	site = make_site()
+
+	with patched(site):
+		consolidation.post_branch_day("Main", "Company", "2025-06-01")
+
+	[je] = site.vouchers
+	assert je.docstatus == 1
+	assert [(row.party, row.debit_in_account_currency) for row in je.accounts[:-1]] == [
+		("Ali", 300),
+		("Sara", 200),
+	]
+	assert je.accounts[-1].credit_in_account_currency == 500
+
+	assert all(entry.status == "Posted" and entry.voucher_no == je.name for entry in site.entries)
+	assert [(link.parent, link.journal_entry, link.amount, link.idx) for link in site.links] == [
+		("SR-1", je.name, 300, 1),
+		("SR-2", je.name, 200, 1),
+	]
+	assert all(link.parentfield == "reservation_journal_entry" for link in site.links)
+
+
+def test_cancelling_one_reservation_reverses_only_its_share():
+	site = make_site()
+	cancelled = frappe._dict(name="SR-1", branch="Main", company="Company", customer="Ali", currency="USD")
+
+	with patched(site):
+		consolidation.post_branch_day("Main", "Company", "2025-06-01")
+		[je] = site.vouchers
+
+		consolidation.cancel_pending_income(cancelled.name)
+		consolidation.reverse_consolidated_income(cancelled, "Journal Entry", je.name)
+
+	original, reversal = site.vouchers
+	assert original.docstatus == 1
+	assert reversal.docstatus == 1
+	assert reversal.cheque_no == "SR-1"
+	assert reversal.accounts == [
+		{"account": "Rent Income", "debit_in_account_currency": 300},
+		{"account": "Debtors", "party_type": "Customer", "party": "Ali", "credit_in_account_currency": 300},
+	]
+
+	# Posted income keeps its status and voucher; the reversal accounts for it
+	assert [entry.status for entry in site.entries] == ["Posted", "Posted"]
+	assert site.entries[0].voucher_no == je.name
+
+
+def test_pending_income_of_a_cancelled_reservation_is_dropped():
+	site = make_site()
+
+	with patched(site):
+		consolidation.cancel_pending_income("SR-1")
+
+	assert [entry.status for entry in site.entries] == ["Cancelled", "Pending"]
+
+
+def test_reversal_stays_draft_like_the_branch_vouchers():
+	site = make_site()
+	cancelled = frappe._dict(name="SR-1", branch="Main", company="Company", customer="Ali", currency="USD")
+
+	with patched(site):
+		consolidation.post_branch_day("Main", "Company", "2025-06-01")
+		[je] = site.vouchers
+
+		with patch.object(
+			consolidation,
+			"get_posting_profile",
+			return_value=frappe._dict(PROFILE, journal_entry_status="Draft"),
+		):
+			consolidation.reverse_consolidated_income(cancelled, "Journal Entry", je.name)
+
+	original, reversal = site.vouchers
+	assert original.docstatus == 1
+	assert reversal.docstatus == 0
+
+
+def test_reversing_a_voucher_without_income_posts_nothing():
+	site = make_site()
+	other = frappe._dict(name="SR-3", branch="Main", company="Company", customer="Omar", currency="USD")
+
+	with patched(site):
+		consolidation.reverse_consolidated_income(other, "Journal Entry", "Journal Entry-1")
+
+	assert site.vouchers == []
+
+
+def test_reservation_with_an_unfinished_workflow_stays_pending():
+	site = make_site()
+	unfinished = {"SR-2": frappe._dict(name="LOG-1", workflow="Delivery", status="Failed")}
+
+	with patched(site), patch.object(consolidation, "get_unfinished_logs", return_value=unfinished):
+		consolidation.post_branch_day("Main", "Company", "2025-06-01")
+
+	[je] = site.vouchers
+	assert [row.party for row in je.accounts[:-1]] == ["Ali"]
+	assert [entry.status for entry in site.entries] == ["Posted", "Pending"]
+	assert [link.parent for link in site.links] == ["SR-1"]
@@ -0,0 +1,154 @@
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from suit_rental import api
+
+
+def make_frappe():
+	"""A frappe stand-in whose cache honours set(..., nx=True) like Redis."""
+	store = {}
+
+	def cache_set(key, value, ex=None, nx=False):
+		if nx and key in store:
+			return False
+		store[key] = value
+		return True
+
+	fake = MagicMock()
+	fake.session.user = "clerk@example.com"
+	fake.cache.make_key.side_effect = lambda key: key
+	fake.cache.set.side_effect = cache_set
+	fake.cache.delete.side_effect = lambda key: store.pop(key, None)
+	fake.cache.get_value.return_value = None
+	return fake, store
+
+
+@contextmanager
+def patched(fake):
+	with (
+		patch.object(api, "frappe", fake),
+		patch.object(api, "_", lambda message: message),
+		patch.object(api, "now_datetime", lambda: "2025-06-01 10:00:00"),
+	):
+		yield
+
+
+def test_same_idempotency_key_enqueues_once():
+	fake, store = make_frappe()
+
+	with patched(fake), patch.object(api, "validate_delivery"):
+		job = api.deliver_reservation_async("SR-1", "2025-06-01", "Cash", idempotency_key="click-1")
+		again = api.deliver_reservation_async("SR-1", "2025-06-01", "Cash", idempotency_key="click-1")
+		new = api.deliver_reservation_async("SR-1", "2025-06-01", "Cash", idempotency_key="click-2")
+
+	assert job["job_id"] == again["job_id"]
+	assert new["job_id"] != job["job_id"]
+	assert fake.enqueue.call_count == 2
+	assert f"suit_rental:delivery_idempotency:{job['job_id']}" in store
+
+
+def test_invalid_delivery_releases_idempotency_key():
+	fake, store = make_frappe()
+
+	with patched(fake), patch.object(api, "validate_delivery", side_effect=ValueError("no stock")):
+		try:
+			api.deliver_reservation_async("SR-1", "2025-06-01", "Cash")
+		except ValueError:
+			pass
+
+	assert store == {}
+	fake.enqueue.assert_not_called()
+
+
+def test_job_skips_delivered_reservation():
+	fake, _store = make_frappe()
+	fake.db.get_value.return_value = "Delivered"
+
+	with patched(fake), patch.object(api, "run_workflow") as run_workflow:
+		api.run_delivery_job("job-1", "SR-1", "2025-06-01", "Cash", "clerk@example.com")
+
+	run_workflow.assert_not_called()
+	assert fake.publish_realtime.call_args.args[1]["status"] == "Completed"
+
+
+def test_failed_job_rolls_back_and_frees_key():
+	fake, store = make_frappe()
+	fake.db.get_value.return_value = "Reserved"
+	store["suit_rental:delivery_idempotency:job-1"] = "SR-1"
+
+	with patched(fake), patch.object(api, "run_workflow", side_effect=ValueError("GL failed")):
+		api.run_delivery_job("job-1", "SR-1", "2025-06-01", "Cash", "clerk@example.com")
+
+	fake.db.rollback.assert_called_once()
+	fake.db.commit.assert_not_called()
+	assert store == {}
+	assert fake.publish_realtime.call_args.args[1]["status"] == "Failed"
+	assert fake.publish_realtime.call_args.args[1]["message"] == "GL failed"
+
+
+def test_bulk_delivery_runs_in_background_once():
+	fake, _store = make_frappe()
+	fake.parse_json.side_effect = lambda value: value
+	statuses = {}
+	fake.cache.get_value.side_effect = statuses.get
+	fake.cache.set_value.side_effect = lambda key, value, expires_in_sec=None: statuses.update({key: value})
+
+	with patched(fake):
+		job = api.deliver_reservations_bulk(["SR-2", "SR-1", "SR-2"], "2025-06-01", "Cash")
+		again = api.deliver_reservations_bulk(["SR-1", "SR-2"], "2025-06-01", "Cash")
+
+	assert job["job_id"] == again["job_id"]
+	assert job["status"]["status"] == "Queued"
+	fake.enqueue.assert_called_once()
+	assert fake.enqueue.call_args.kwargs["names"] == ["SR-2", "SR-1"]
+
+
+def test_bulk_delivery_reports_reservation_with_unfinished_workflow():
+	fake, _store = make_frappe()
+	fake.clear_last_message.return_value = None
+
+	def check(name):
+		if name == "SR-2":
+			raise ValueError("The Delivery of reservation SR-2 is Failed")
+
+	with (
+		patched(fake),
+		patch.object(api, "check_no_unfinished_workflow", side_effect=check),
+		patch.object(api, "load_delivery", return_value=(MagicMock(), MagicMock())) as load_delivery,
+		patch.object(api, "post_delivery_group") as post_delivery_group,
+	):
+		post_delivery_group.side_effect = lambda entries, date, mop, results: results.update(
+			{"SR-1": {"status": "Delivered"}}
+		)
+		results = api.deliver_reservations(["SR-1", "SR-2"], "2025-06-01", "Cash")
+
+	assert results["SR-1"]["status"] == "Delivered"
+	assert results["SR-2"] == {"status": "Failed", "message": "The Delivery of reservation SR-2 is Failed"}
+	load_delivery.assert_called_once_with("SR-1", "2025-06-01", "Cash")
+
+
+def test_bulk_return_reports_reservation_with_unfinished_workflow():
+	fake, _store = make_frappe()
+	fake.parse_json.side_effect = lambda value: value
+
+	def check(name):
+		if name == "SR-2":
+			raise ValueError("The Return of reservation SR-2 is Failed")
+
+	with (
+		patched(fake),
+		patch.object(api, "check_no_unfinished_workflow", side_effect=check),
+		patch.object(api, "load_return", return_value=(MagicMock(), MagicMock())) as load_return,
+		patch.object(api, "post_return_group") as post_return_group,
+	):
+		post_return_group.side_effect = lambda entries, dt, scans, results: results.update(
+			{"SR-1": {"status": "Returned"}}
+		)
+		results = api.return_reservations_bulk(
+			[{"reservation": "SR-1", "items": []}, {"reservation": "SR-2", "items": []}],
+			"2025-06-05 10:00:00",
+		)
+
+	assert results["SR-1"]["status"] == "Returned"
+	assert results["SR-2"] == {"status": "Failed", "message": "The Return of reservation SR-2 is Failed"}
+	load_return.assert_called_once_with("SR-1", [], "2025-06-05 10:00:00")
@@ -0,0 +1,140 @@
+import csv
+import io
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import frappe
+import pytest
+
+from suit_rental import export
+from suit_rental.suit_rental.report import utils
+
+RESERVATIONS = [
+	frappe._dict(name="SR-1", branch="Main", customer="Ali", reservation_from="2025-06-01", paid_amount=300),
+	frappe._dict(name="SR-2", branch="Main", customer="Sara", reservation_from="2025-06-02", paid_amount=0),
+]
+
+CHILD_ROWS = {
+	"Reservation Item": [
+		frappe._dict(parent="SR-1", idx=1, item_code="SUIT-1", serial_no="SN-1", rate=250),
+		frappe._dict(parent="SR-1", idx=2, item_code="TIE-1", serial_no=None, rate=50),
+	],
+	"Reservation Payments": [
+		frappe._dict(parent="SR-1", payment_entry="PE-1", description="Deposit", amount=100),
+		frappe._dict(parent="SR-1", payment_entry="PE-2", description=None, amount=200),
+	],
+	"Reservation Sales Invoice": [],
+	"Reservation Journal Entry": [
+		frappe._dict(parent="SR-1", journal_entry="JE-1", purpose="Rent", amount=300)
+	],
+	"Reservation Stock Entry": [
+		frappe._dict(parent="SR-1", stock_entry="STE-1", entry_type="Delivery"),
+		frappe._dict(parent="SR-1", stock_entry="STE-1", entry_type="Delivery"),
+	],
+}
+
+
+def make_frappe(queries):
+	def sql(query, params, as_dict=False):
+		queries.append(query)
+		rows = RESERVATIONS
+		if "cursor_name" in params:
+			rows = [row for row in rows if row.name > params["cursor_name"]]
+		return rows[: params["limit"]]
+
+	def get_all(doctype, filters, fields, order_by):
+		parents = filters["parent"][1]
+		return [row for row in CHILD_ROWS[doctype] if row.parent in parents]
+
+	fake = MagicMock()
+	fake._dict = frappe._dict
+	fake.db.sql.side_effect = sql
+	fake.get_all.side_effect = get_all
+	return fake
+
+
+@contextmanager
+def patched(fake):
+	with (
+		patch.object(export, "frappe", fake),
+		patch.object(utils, "frappe", fake),
+		patch.object(export, "_", lambda message: message),
+		patch.object(
+			export, "get_permission_conditions", return_value="`tabSuit Reservation`.`branch` in ('Main')"
+		),
+	):
+		yield
+
+
+def export_csv(queries):
+	out = io.BytesIO()
+	with patched(make_frappe(queries)):
+		export.write_csv(frappe._dict(branch="Main"), "test@example.com", out)
+
+	data = out.getvalue()
+	assert data.startswith(b"\xef\xbb\xbf")
+	return list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+
+
+def test_csv_has_one_row_per_item_with_voucher_lists():
+	queries = []
+	header, *rows = export_csv(queries)
+
+	assert header == list(export.EXPORT_COLUMNS)
+	assert all(len(row) == len(header) for row in rows)
+
+	records = [dict(zip(header, row, strict=True)) for row in rows]
+	assert [(r["Reservation"], r["Item Row"], r["Item Code"], r["Serial No"]) for r in records] == [
+		("SR-1", "1", "SUIT-1", "SN-1"),
+		("SR-1", "2", "TIE-1", ""),
+		("SR-2", "", "", ""),
+	]
+	assert records[0]["Payments"] == "PE-1 Deposit 100, PE-2  200"
+	assert records[0]["Journal Entries"] == "JE-1 Rent 300"
+	assert records[0]["Stock Entries"] == "STE-1 Delivery"
+	assert records[0]["Sales Invoices"] == ""
+	assert records[2]["Payments"] == ""
+
+
+def test_only_submitted_reservations_the_user_may_read_are_exported():
+	queries = []
+	export_csv(queries)
+
+	[query] = queries
+	assert "docstatus = 1" in query
+	assert "branch = %(branch)s" in query
+	assert "(`tabSuit Reservation`.`branch` in ('Main'))" in query
+
+
+def test_reservations_are_read_a_page_at_a_time():
+	queries = []
+	with patch.object(export, "EXPORT_CHUNK_SIZE", 1):
+		_header, *rows = export_csv(queries)
+
+	assert [row[0] for row in rows] == ["SR-1", "SR-1", "SR-2"]
+	assert len(queries) == 2
+
+
+def test_large_exports_are_prepared_in_the_background():
+	fake = make_frappe([])
+	fake.throw.side_effect = frappe.ValidationError
+	too_many = export.DIRECT_EXPORT_MAX_RESERVATIONS + 1
+
+	with patched(fake), patch.object(export, "count_export_reservations", return_value=too_many):
+		assert export.start_reservation_export(file_format="CSV") == {"queued": True}
+
+		with pytest.raises(frappe.ValidationError):
+			export.export_reservations(file_format="CSV")
+
+	fake.enqueue.assert_called_once()
+	assert fake.enqueue.call_args.kwargs["user"] == fake.session.user
+
+
+def test_small_exports_are_downloaded_directly():
+	fake = make_frappe([])
+
+	with patched(fake), patch.object(export, "count_export_reservations", return_value=10):
+		assert export.start_reservation_export(file_format="CSV") == {"queued": False}
+		assert export.start_reservation_export(file_format="CSV", in_background=1) == {"queued": True}
+
+	fake.enqueue.assert_called_once()
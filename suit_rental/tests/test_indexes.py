@@ -0,0 +1,27 @@
+from unittest.mock import MagicMock, patch
+
+from suit_rental.setup import indexes
+
+
+def test_hot_queries_are_recorded_from_the_code_paths():
+	fake = MagicMock()
+	original_sql = fake.db.sql
+
+	def report():
+		fake.db.sql("SELECT name FROM `tabSuit Reservation` WHERE branch = %(branch)s", {"branch": "Main"})
+		fake.db.sql("UPDATE `tabSuit Reservation` SET modified = NOW()")
+		fake.db.sql("\n\t\tSELECT COUNT(*) FROM `tabSuit Reservation`", as_dict=True)
+
+	with (
+		patch.object(indexes, "frappe", fake),
+		patch.object(indexes, "get_hot_paths", return_value={"report": report, "idle": lambda: None}),
+	):
+		queries = indexes.get_hot_queries()
+
+	assert queries == {
+		"report #1": ("SELECT name FROM `tabSuit Reservation` WHERE branch = %(branch)s", {"branch": "Main"}),
+		"report #2": ("\n\t\tSELECT COUNT(*) FROM `tabSuit Reservation`", ()),
+	}
+	# Every statement still ran, and frappe.db.sql is restored afterwards
+	assert original_sql.call_count == 3
+	assert fake.db.sql is original_sql
@@ -0,0 +1,124 @@
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.utils import getdate
+
+from suit_rental import summary
+
+
+class FakeCache:
+	"""The hash, sorted set and set commands the totals cache uses, with every read recorded."""
+
+	def __init__(self):
+		self.hashes, self.zsets, self.sets = {}, {}, {}
+		self.reads = []
+
+	def make_key(self, key):
+		return key
+
+	def hset(self, name, field, value):
+		self.hashes.setdefault(name, {})[field] = value
+
+	def hget(self, name, field):
+		return self.hashes.get(name, {}).get(field)
+
+	def hdel(self, name, field):
+		self.hashes.get(name, {}).pop(field, None)
+
+	def hkeys(self, name):
+		raise AssertionError("invalidation must not scan the whole cache")
+
+	def zadd(self, name, mapping):
+		self.zsets.setdefault(name, {}).update(mapping)
+
+	def zcard(self, name):
+		return len(self.zsets.get(name, {}))
+
+	def zrange(self, name, start, end):
+		return sorted(self.zsets.get(name, {}), key=self.zsets[name].get)[start : end + 1]
+
+	def zrem(self, name, *values):
+		for value in values:
+			self.zsets.get(name, {}).pop(value, None)
+
+	def sadd(self, name, *values):
+		self.sets.setdefault(name, set()).update(values)
+
+	def srem(self, name, *values):
+		self.sets.get(name, set()).difference_update(values)
+
+	def smembers(self, name):
+		self.reads.append(name)
+		return set(self.sets.get(name, set()))
+
+
+def make_frappe(cache):
+	fake = MagicMock()
+	fake.cache = cache
+	fake.safe_decode = lambda value: value
+	return fake
+
+
+def cache_periods(cache, fields):
+	with (
+		patch.object(summary, "frappe", make_frappe(cache)),
+		patch.object(summary, "nowdate", lambda: "2025-12-31"),
+		patch.object(summary, "now_datetime", lambda: "2025-12-31 10:00:00"),
+	):
+		for field in fields:
+			summary.set_cached_totals(field, [])
+
+
+def cached(cache):
+	return set(cache.hashes[summary.TOTALS_CACHE_KEY])
+
+
+def test_index_lists_every_month_of_the_period():
+	keys = summary.get_totals_index_keys("2025-01-15|2025-03-02|Main")
+
+	assert keys == [
+		f"{summary.TOTALS_CACHE_INDEX_KEY}:Main:2025-01",
+		f"{summary.TOTALS_CACHE_INDEX_KEY}:Main:2025-02",
+		f"{summary.TOTALS_CACHE_INDEX_KEY}:Main:2025-03",
+	]
+	assert summary.get_totals_index_keys("|2025-03-02|") == [f"{summary.TOTALS_CACHE_INDEX_KEY}::open"]
+
+
+def test_invalidation_drops_only_periods_covering_the_change():
+	cache = FakeCache()
+	cache_periods(
+		cache,
+		[
+			"2025-06-01|2025-06-30|Main",
+			"2025-06-01|2025-06-10|Main",
+			"2025-06-01|2025-06-30|North",
+			"2025-06-01|2025-06-30|",
+			"2025-01-01|2025-01-31|Main",
+			"||Main",
+		],
+	)
+
+	with patch.object(summary, "frappe", make_frappe(cache)):
+		summary.invalidate_totals_cache([("Main", getdate("2025-06-20"))])
+
+	assert cached(cache) == {
+		"2025-06-01|2025-06-10|Main",
+		"2025-06-01|2025-06-30|North",
+		"2025-01-01|2025-01-31|Main",
+	}
+	assert sorted(cache.reads) == sorted(
+		f"{summary.TOTALS_CACHE_INDEX_KEY}:{scope}:{part}"
+		for scope in ("Main", "")
+		for part in ("2025-06", "open")
+	)
+	assert "2025-06-01|2025-06-30|Main" not in cache.sets[f"{summary.TOTALS_CACHE_INDEX_KEY}:Main:2025-06"]
+
+
+def test_evicted_periods_leave_the_index():
+	cache = FakeCache()
+
+	with patch.object(summary, "TOTALS_CACHE_MAX_ENTRIES", 1):
+		cache_periods(cache, ["2025-05-01|2025-05-31|Main", "2025-06-01|2025-06-30|Main"])
+
+	assert cached(cache) == {"2025-06-01|2025-06-30|Main"}
+	assert cache.sets[f"{summary.TOTALS_CACHE_INDEX_KEY}:Main:2025-05"] == set()
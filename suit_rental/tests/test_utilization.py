@@ -0,0 +1,74 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.utils import getdate
+
+from suit_rental.suit_rental.report.suit_utilization import suit_utilization
+from suit_rental.suit_rental.report.suit_utilization.suit_utilization import get_booked_days
+
+
+def booking(start_date, end_date):
+	return frappe._dict(start_date=getdate(start_date), end_date=getdate(end_date))
+
+
+def test_serial_bookings_merge_overlapping_windows():
+	bookings = [
+		booking("2025-06-01", "2025-06-03"),
+		booking("2025-06-02", "2025-06-05"),
+		booking("2025-06-05", "2025-06-06"),
+		booking("2025-06-10", "2025-06-10"),
+	]
+
+	# 1st-6th once, then the 10th
+	assert get_booked_days(bookings, merge=True) == 7
+
+
+def test_contained_window_does_not_shorten_the_interval():
+	bookings = [booking("2025-06-01", "2025-06-10"), booking("2025-06-03", "2025-06-04")]
+
+	assert get_booked_days(bookings, merge=True) == 10
+
+
+def test_back_to_back_windows_count_every_day():
+	bookings = [booking("2025-06-01", "2025-06-02"), booking("2025-06-03", "2025-06-04")]
+
+	assert get_booked_days(bookings, merge=True) == 4
+
+
+def test_bookings_without_serial_add_up():
+	bookings = [booking("2025-06-01", "2025-06-03"), booking("2025-06-02", "2025-06-05")]
+
+	assert get_booked_days(bookings, merge=False) == 7
+	assert get_booked_days([], merge=True) == 0
+
+
+def test_late_return_penalty_counts_in_the_period_of_the_return():
+	# Booked 25th-30th June, returned damaged on 3rd July
+	penalty = frappe._dict(item_code="SUIT-1", item_name="Suit", serial_no="SN-1", penalty=150)
+	june = [
+		frappe._dict(
+			item_code="SUIT-1",
+			item_name="Suit",
+			serial_no="SN-1",
+			start_date=getdate("2025-06-25"),
+			end_date=getdate("2025-06-30"),
+			rent=300,
+			turnaround_hours=None,
+		)
+	]
+	filters = frappe._dict()
+
+	with (
+		patch.object(suit_utilization, "get_bookings", return_value=june),
+		patch.object(suit_utilization, "get_penalties", return_value={}),
+	):
+		[row] = suit_utilization.get_data(filters, getdate("2025-06-01"), getdate("2025-06-30"), False)
+	assert (row.reservations, row.rent_revenue, row.penalty_revenue) == (1, 300, 0)
+
+	with (
+		patch.object(suit_utilization, "get_bookings", return_value=[]),
+		patch.object(suit_utilization, "get_penalties", return_value={("SUIT-1", "SN-1"): penalty}),
+	):
+		[row] = suit_utilization.get_data(filters, getdate("2025-07-01"), getdate("2025-07-31"), False)
+	assert (row.serial_no, row.reservations, row.booked_days) == ("SN-1", 0, 0)
+	assert (row.penalty_revenue, row.revenue_per_unit) == (150, 150)
@@ -0,0 +1,199 @@
+import json
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import frappe
+import pytest
+
+from suit_rental import workflow
+
+
+def throw(message, exc=frappe.ValidationError, **kwargs):
+	raise exc(message)
+
+
+def make_frappe():
+	fake = MagicMock()
+	fake.throw.side_effect = throw
+	fake._dict = frappe._dict
+	fake.as_json = lambda value: json.dumps(value, default=str)
+	fake.flags.suit_rental_no_step_commit = False
+	fake.cache.set.return_value = True
+	return fake
+
+
+@contextmanager
+def patched(fake):
+	with patch.object(workflow, "frappe", fake), patch.object(workflow, "_", lambda message: message):
+		yield
+
+
+def make_doc():
+	doc = MagicMock()
+	doc.name = "SR-1"
+	doc.docstatus = 1
+	doc.as_dict.return_value = {"doctype": "Suit Reservation", "name": "SR-1", "paid_amount": 300}
+	return doc
+
+
+def make_log(completed_steps):
+	return frappe._dict(
+		name="LOG-1",
+		attempts=1,
+		parameters=json.dumps({"delivery_date": "2025-06-01"}),
+		completed_steps=json.dumps(completed_steps),
+		reservation_state=json.dumps({"doctype": "Suit Reservation", "name": "SR-1"}),
+	)
+
+
+def make_runner(ran, fail_on=None):
+	def run(doc, params, runner, progress=None):
+		for step in ("stock", "security", "income"):
+
+			def fn(step=step):
+				if step == fail_on:
+					raise ValueError(f"{step} failed")
+				ran.append(step)
+
+			runner.step(step, fn)
+
+	return run
+
+
+def test_steps_commit_the_log_and_save_the_reservation_once():
+	fake = make_frappe()
+	doc = make_doc()
+
+	with patched(fake):
+		runner = workflow.ReservationWorkflow(doc, "Delivery", {}, log=frappe._dict(name="LOG-1"))
+		runner.step("stock", lambda: None)
+		runner.step("income", lambda: None)
+
+		doc.save.assert_not_called()
+		assert fake.db.commit.call_count == 2
+
+		values = fake.db.set_value.call_args.args[2]
+		assert json.loads(values["completed_steps"]) == ["stock", "income"]
+		assert json.loads(values["reservation_state"])["paid_amount"] == 300
+
+		runner.finish()
+
+	doc.save.assert_called_once()
+	assert fake.db.set_value.call_args.args[2] == {"status": "Completed", "reservation_state": None}
+
+
+def test_resume_after_failure_skips_completed_steps():
+	fake = make_frappe()
+	doc = make_doc()
+	fake.get_doc.return_value = doc
+	ran = []
+	fake.get_attr.return_value = make_runner(ran)
+
+	with patched(fake), patch.object(workflow, "get_open_log", return_value=make_log(["stock"])):
+		assert workflow.run_workflow("Delivery", "SR-1", {}) is doc
+
+	# Restored from the log's reservation state, not reloaded from the database
+	assert fake.get_doc.call_args.args[0] == {"doctype": "Suit Reservation", "name": "SR-1"}
+	assert ran == ["security", "income"]
+	doc.save.assert_called_once()
+	assert fake.db.set_value.call_args_list[0].args[2]["attempts"] == 2
+	fake.cache.delete.assert_called_once()
+
+
+def test_failed_step_marks_the_log_failed():
+	fake = make_frappe()
+	doc = make_doc()
+	fake.get_doc.return_value = doc
+	ran = []
+	fake.get_attr.return_value = make_runner(ran, fail_on="income")
+
+	with (
+		patched(fake),
+		patch.object(workflow, "get_open_log", return_value=make_log([])),
+		pytest.raises(ValueError),
+	):
+		workflow.run_workflow("Delivery", "SR-1", {})
+
+	assert ran == ["stock", "security"]
+	doc.save.assert_not_called()
+	fake.db.rollback.assert_called_once()
+	assert fake.db.set_value.call_args.args[2]["status"] == "Failed"
+	fake.cache.delete.assert_called_once()
+
+
+def test_retry_workflows_queues_failed_logs_only():
+	fake = make_frappe()
+	fake.parse_json.side_effect = json.loads
+	fake.get_all.return_value = ["LOG-1"]
+
+	with patched(fake):
+		assert workflow.retry_workflows('["LOG-1", "LOG-2"]') == 1
+
+	assert fake.get_all.call_args.kwargs["filters"] == {
+		"name": ["in", ["LOG-1", "LOG-2"]],
+		"status": "Failed",
+	}
+	fake.enqueue.assert_called_once()
+	assert fake.enqueue.call_args.kwargs["log_name"] == "LOG-1"
+	assert fake.enqueue.call_args.kwargs["job_id"] == "suit-rental-workflow-retry-LOG-1"
+
+
+def test_retry_workflow_resumes_failed_log():
+	fake = make_frappe()
+	fake.get_doc.return_value = frappe._dict(
+		status="Failed", workflow="Delivery", reservation="SR-1", parameters='{"delivery_date": "2025-06-01"}'
+	)
+
+	with patched(fake), patch.object(workflow, "run_workflow") as run_workflow:
+		workflow.retry_workflow("LOG-1")
+
+	run_workflow.assert_called_once_with("Delivery", "SR-1", {"delivery_date": "2025-06-01"})
+	fake.db.commit.assert_called_once()
+
+
+def test_retry_workflow_ignores_completed_log():
+	fake = make_frappe()
+	fake.get_doc.return_value = frappe._dict(status="Completed")
+
+	with patched(fake), patch.object(workflow, "run_workflow") as run_workflow:
+		workflow.retry_workflow("LOG-1")
+
+	run_workflow.assert_not_called()
+
+
+def test_resume_with_different_params_is_refused():
+	fake = make_frappe()
+
+	with (
+		patched(fake),
+		patch.object(workflow, "get_open_log", return_value=make_log(["stock"])),
+		pytest.raises(workflow.WorkflowInProgressError),
+	):
+		workflow.run_workflow("Delivery", "SR-1", {"delivery_date": "2025-06-03"})
+
+	fake.get_attr.assert_not_called()
+	fake.cache.delete.assert_called_once()
+
+
+def test_unfinished_workflow_blocks_other_workflows_and_changes():
+	fake = make_frappe()
+	fake.get_all.return_value = [
+		frappe._dict(name="LOG-1", reservation="SR-1", workflow="Delivery", status="Failed")
+	]
+	fake.cache.exists.return_value = False
+
+	with patched(fake):
+		with pytest.raises(workflow.WorkflowInProgressError):
+			workflow.run_workflow("Return", "SR-1", {})
+
+		with pytest.raises(workflow.WorkflowInProgressError):
+			workflow.check_no_unfinished_workflow("SR-1")
+
+		fake.get_all.return_value = []
+		workflow.check_no_unfinished_workflow("SR-1")
+
+		fake.cache.exists.return_value = True
+		with pytest.raises(workflow.WorkflowInProgressError):
+			workflow.check_no_unfinished_workflow("SR-1")
+
+	fake.get_attr.assert_not_called()
@@ -0,0 +1,329 @@
+# Copyright (c) 2025, Ahmed Yousef and contributors
+# For license information, please see license.txt
+
+"""
+Step-journaled delivery and return workflows.
+
+Every step (one voucher or a group of vouchers) is committed together with
+a Reservation Workflow Log entry naming the step and holding the reservation
+as the step left it, child table links included. The reservation itself is
+saved once, when the last step is done, so its occupancy ledger and branch
+summary are only synced once per workflow. When a step fails, the log is
+marked Failed. A retry, by the user or an operator re-driving failed logs in
+bulk, restores the reservation from the log and skips the steps already
+recorded, so nothing is posted twice.
+
+Until a workflow is completed, the vouchers of its committed steps are only
+linked in the log, not in the reservation in the database. Every other path
+that changes the reservation (saving the form, bulk delivery and return,
+cancellation, consolidated income) refuses or skips it meanwhile, see
+check_no_unfinished_workflow.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+# Workflow -> runner(doc, params, workflow, progress) that validates and posts it
+WORKFLOW_RUNNERS = {
+	"Delivery": "suit_rental.api.run_delivery_workflow",
+	"Return": "suit_rental.api.run_return_workflow",
+	"Cancellation": "suit_rental.suit_rental.doctype.suit_reservation.suit_reservation.run_cancellation_workflow",
+}
+
+WORKFLOW_LOCK_TTL = 10 * 60
+
+
+class WorkflowInProgressError(frappe.ValidationError):
+	pass
+
+
+class ReservationWorkflow:
+	"""
+	Runs the steps of one workflow attempt.
+
+	With journal=False (bulk delivery, benchmarks), steps simply run inside the
+	caller's transaction and nothing is logged or committed.
+	"""
+
+	def __init__(self, doc, workflow, params, log=None, journal=True):
+		self.doc = doc
+		self.workflow = workflow
+		self.params = params
+		self.log = log
+		self.journal = journal
+		self.completed = json.loads(log.completed_steps or "[]") if log else []
+		# Lets the reservation be saved while its own log is open
+		doc.flags.in_reservation_workflow = True
+
+	def is_done(self, step):
+		return step in self.completed
+
+	def step(self, step, fn):
+		"""Run fn unless `step` already completed in an earlier attempt, then commit it."""
+		if self.is_done(step):
+			return
+
+		if self.journal and not self.log:
+			self.start_log()
+
+		fn()
+		self.completed.append(step)
+
+		if not self.journal:
+			return
+
+		# Only the log is written; the reservation is saved once in finish()
+		frappe.db.set_value(
+			"Reservation Workflow Log",
+			self.log.name,
+			{
+				"completed_steps": json.dumps(self.completed),
+				"last_step": step,
+				"reservation_state": self.get_reservation_state(),
+			},
+		)
+		frappe.db.commit()
+
+	def get_reservation_state(self):
+		# A cancelled reservation has nothing left to save, only the log does
+		if self.doc.docstatus != 1:
+			return None
+
+		return frappe.as_json(self.doc.as_dict(convert_dates_to_str=True))
+
+	def finish(self):
+		"""Save the reservation with the changes of every step and close the log."""
+		if not self.journal:
+			return
+
+		if self.doc.docstatus == 1 and self.completed:
+			self.doc.save(ignore_permissions=True)
+
+		if self.log:
+			frappe.db.set_value(
+				"Reservation Workflow Log",
+				self.log.name,
+				{"status": "Completed", "reservation_state": None},
+			)
+
+	def start_log(self):
+		self.log = frappe.get_doc(
+			{
+				"doctype": "Reservation Workflow Log",
+				"reservation": self.doc.name,
+				"workflow": self.workflow,
+				"branch": self.doc.branch,
+				"status": "Running",
+				"attempts": 1,
+				"parameters": json.dumps(self.params, default=str),
+				"completed_steps": "[]",
+			}
+		).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+
+def run_step(workflow, step, fn):
+	"""Run a posting step through the workflow journal, if there is one."""
+	if workflow:
+		workflow.step(step, fn)
+	else:
+		fn()
+
+
+def get_unfinished_logs(reservations):
+	"""{reservation: log} of the Running or Failed workflow logs of the reservations."""
+	if not reservations:
+		return {}
+
+	return {
+		log.reservation: log
+		for log in frappe.get_all(
+			"Reservation Workflow Log",
+			filters={"reservation": ["in", list(reservations)], "status": ["in", ("Running", "Failed")]},
+			fields=["name", "reservation", "workflow", "status"],
+			order_by="creation",
+		)
+	}
+
+
+def check_no_unfinished_workflow(reservation):
+	"""
+	Refuse to change a reservation while one of its workflows runs, or after one
+	failed halfway: its committed vouchers are not linked in the database yet.
+	"""
+	if frappe.cache.exists(get_lock_key(reservation)):
+		frappe.throw(
+			_("A delivery, return or cancellation of reservation {0} is in progress").format(reservation),
+			WorkflowInProgressError,
+		)
+
+	if log := get_unfinished_logs([reservation]).get(reservation):
+		throw_unfinished_workflow(log)
+
+
+def throw_unfinished_workflow(log):
+	frappe.throw(
+		_("The {0} of reservation {1} is {2} in Reservation Workflow Log {3}. Retry it first.").format(
+			_(log.workflow), log.reservation, _(log.status), log.name
+		),
+		WorkflowInProgressError,
+	)
+
+
+def check_same_params(log, params):
+	"""A failed workflow is resumed with the parameters its committed steps were posted with."""
+	stored = json.loads(log.parameters or "{}")
+	given = json.loads(json.dumps(params or {}, default=str))
+
+	if any(given.get(key) != stored.get(key) for key in given):
+		frappe.throw(
+			_("The {0} of reservation {1} failed halfway and can only be resumed with {2}").format(
+				_(log.workflow),
+				log.reservation,
+				", ".join(f"{key} = {value}" for key, value in stored.items()),
+			),
+			WorkflowInProgressError,
+		)
+
+
+def get_open_log(reservation, workflow):
+	name = frappe.db.get_value(
+		"Reservation Workflow Log",
+		{"reservation": reservation, "workflow": workflow, "status": ["in", ("Running", "Failed")]},
+		"name",
+		order_by="creation desc",
+	)
+	return frappe.get_doc("Reservation Workflow Log", name) if name else None
+
+
+def load_reservation(reservation, log=None):
+	"""The reservation, with the changes of the steps an earlier attempt already committed."""
+	if log and log.reservation_state:
+		return frappe.get_doc(json.loads(log.reservation_state))
+
+	return frappe.get_doc("Suit Reservation", reservation)
+
+
+def get_lock_key(reservation):
+	return frappe.cache.make_key(f"suit_rental:workflow_lock:{reservation}")
+
+
+def run_workflow(workflow, reservation, params, progress=None):
+	"""
+	Run (or resume) a delivery / return workflow for a reservation.
+
+	If an earlier attempt left a Running or Failed log, only the remaining
+	steps run, with the same parameters. Another workflow of the reservation
+	that is still unfinished must be retried first.
+	"""
+	journal = not frappe.flags.suit_rental_no_step_commit
+
+	if not frappe.cache.set(get_lock_key(reservation), 1, ex=WORKFLOW_LOCK_TTL, nx=True):
+		frappe.throw(
+			_("Another {0} of reservation {1} is in progress").format(_(workflow), reservation),
+			WorkflowInProgressError,
+		)
+
+	try:
+		unfinished = get_unfinished_logs([reservation]).get(reservation)
+		if unfinished and unfinished.workflow != workflow:
+			throw_unfinished_workflow(unfinished)
+
+		log = get_open_log(reservation, workflow) if journal else None
+
+		if log:
+			check_same_params(log, params)
+			params = frappe._dict(json.loads(log.parameters or "{}"))
+			frappe.db.set_value(
+				"Reservation Workflow Log",
+				log.name,
+				{"status": "Running", "attempts": cint(log.attempts) + 1, "error": None},
+			)
+			frappe.db.commit()
+
+		doc = load_reservation(reservation, log)
+		runner = ReservationWorkflow(doc, workflow, frappe._dict(params), log, journal)
+
+		try:
+			frappe.get_attr(WORKFLOW_RUNNERS[workflow])(doc, runner.params, runner, progress)
+			runner.finish()
+		except Exception:
+			if runner.journal and runner.log:
+				mark_failed(runner.log.name)
+			raise
+
+		return doc
+
+	finally:
+		frappe.cache.delete(get_lock_key(reservation))
+
+
+def mark_failed(log_name):
+	error = frappe.get_traceback()
+
+	frappe.db.rollback()
+	frappe.db.set_value("Reservation Workflow Log", log_name, {"status": "Failed", "error": error})
+	frappe.db.commit()
+
+
+# ----------------------------------------------------
+# Re-drive failed workflows
+# ----------------------------------------------------
+
+
+@frappe.whitelist()
+def get_failed_workflows(branch=None, workflow=None, limit=100):
+	filters = {"status": "Failed"}
+	if branch:
+		filters["branch"] = branch
+	if workflow:
+		filters["workflow"] = workflow
+
+	return frappe.get_list(
+		"Reservation Workflow Log",
+		filters=filters,
+		fields=["name", "reservation", "workflow", "branch", "attempts", "last_step", "modified"],
+		order_by="modified desc",
+		limit=cint(limit),
+	)
+
+
+@frappe.whitelist()
+def retry_workflows(names):
+	"""Queue failed workflows to resume from their last completed step. Returns how many were queued."""
+	frappe.only_for(("System Manager", "Suit Rental Manager"))
+
+	names = frappe.parse_json(names) if isinstance(names, str) else names
+	failed = frappe.get_all(
+		"Reservation Workflow Log",
+		filters={"name": ["in", names], "status": "Failed"},
+		pluck="name",
+	)
+
+	for name in failed:
+		frappe.enqueue(
+			"suit_rental.workflow.retry_workflow",
+			queue="short",
+			job_id=f"suit-rental-workflow-retry-{name}",
+			deduplicate=True,
+			enqueue_after_commit=True,
+			log_name=name,
+		)
+
+	return len(failed)
+
+
+def retry_workflow(log_name):
+	log = frappe.get_doc("Reservation Workflow Log", log_name)
+	if log.status != "Failed":
+		return
+
+	try:
+		run_workflow(log.workflow, log.reservation, json.loads(log.parameters or "{}"))
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(title=f"Suit Reservation {log.workflow} retry failed: {log.reservation}")